@@ -0,0 +1,247 @@
+"""
+Shared building blocks of the JSON API (``/api/``).
+
+Every endpoint only sees the signed-in owner's rows, pages with cursors,
+returns only the fields listed in ``?fields=a,b`` when given, and has a
+``bulk/`` route that creates (POST) or updates (PATCH) a list of rows with
+``bulk_create``/``bulk_update``. Related ids in a bulk request are resolved
+with one query per relation rather than one per row, and the ledger,
+summary and search updates the save signals would have made are done once
+for the whole batch.
+"""
+from django.db import transaction
+from django.db.models import Q, prefetch_related_objects
+from rest_framework import serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+from properties.models import Property
+from tenants.models import Tenant, Lease, TenantOwnership
+from payments.models import Payment, LateFee
+from expenses.models import Vendor, Expense
+from reports.ledger import schedule_ledger_refresh
+from .search import SEARCH_KINDS, index_objects
+from .summary import schedule_summary_invalidation
+
+# Lookup from each owned model to its owner
+OWNER_LOOKUPS = {
+    Property: 'owner',
+    Lease: 'owner',
+    Payment: 'owner',
+    LateFee: 'payment__owner',
+    Expense: 'owner',
+    Vendor: 'created_by',
+}
+
+def scope_to_owner(queryset, user):
+    """
+    Limit ``queryset`` to the rows ``user`` may see. Rows of models without
+    an owner (categories, property types) are shared.
+    """
+    if queryset.model is Tenant:
+        # Tenants are seen through their leases, or by whoever added them
+        return queryset.filter(
+            Q(pk__in=TenantOwnership.objects.filter(owner=user).values('tenant')) |
+            Q(created_by=user)
+        )
+    if queryset.model in OWNER_LOOKUPS:
+        return queryset.filter(**{OWNER_LOOKUPS[queryset.model]: user})
+    return queryset
+
+class OwnerRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key relation accepting only the requesting owner's rows.
+
+    Bulk requests load the referenced rows up front into
+    ``context['related_rows']`` (keyed by field name), which is then used
+    instead of a query per id.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        return scope_to_owner(queryset, request.user) if request else queryset
+
+    def to_internal_value(self, data):
+        rows = self.context.get('related_rows', {}).get(self.field_name)
+        if rows is None:
+            return super().to_internal_value(data)
+
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return rows[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+class OwnerScopedSerializer(serializers.ModelSerializer):
+    """
+    Model serializer whose relations are limited to the owner's rows and
+    whose reads honour the ``fields`` query parameter.
+    """
+    serializer_related_field = OwnerRelatedField
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Sparse fieldsets only apply to reads, so writes keep every field
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        requested = request.query_params.get('fields')
+        if requested:
+            keep = {'id'} | {name.strip() for name in requested.split(',')}
+            for name in set(self.fields) - keep:
+                self.fields.pop(name)
+
+class OwnerScopedViewSet(viewsets.ModelViewSet):
+    """
+    CRUD endpoints over the owner's rows of ``queryset``, plus ``bulk/``.
+
+    Rows created through the API are recorded under the requesting user in
+    ``owner_field`` (and ``owner`` for models that have one). ``ledger_keys`` names the function returning the ledger
+    cells of a row for models that feed the monthly ledger.
+    """
+    owner_field = 'created_by'
+    ledger_keys = None
+    bulk_max_items = 1000
+    bulk_batch_size = 500
+
+    def get_queryset(self):
+        return scope_to_owner(super().get_queryset(), self.request.user)
+
+    def owner_values(self):
+        values = {self.owner_field: self.request.user}
+        if OWNER_LOOKUPS.get(self.queryset.model) == 'owner':
+            # Related rows are the owner's, so the copied property owner is too
+            values['owner'] = self.request.user
+        return values
+
+    def perform_create(self, serializer):
+        serializer.save(**self.owner_values())
+
+    @action(detail=False, methods=['post', 'patch'], url_path='bulk')
+    def bulk(self, request):
+        """Create (POST) or update (PATCH, with ids) a list of rows at once."""
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError('Expected a non-empty list of objects.')
+        if len(items) > self.bulk_max_items:
+            raise ValidationError(f'At most {self.bulk_max_items} objects can be sent at once.')
+        if not all(isinstance(item, dict) for item in items):
+            raise ValidationError('Expected a list of objects.')
+
+        context = self.get_bulk_serializer_context(items)
+        if request.method == 'POST':
+            rows = self.bulk_create(items, context)
+            response_status = status.HTTP_201_CREATED
+        else:
+            rows = self.bulk_update(items, context)
+            response_status = status.HTTP_200_OK
+        return Response(self.get_serializer(rows, many=True).data, status=response_status)
+
+    def get_bulk_serializer_context(self, items):
+        """Return the serializer context with the related rows of ``items`` preloaded."""
+        context = self.get_serializer_context()
+        related_rows = {}
+        for name, field in self.get_serializer().fields.items():
+            if not isinstance(field, OwnerRelatedField) or field.read_only:
+                continue
+            ids = set()
+            for item in items:
+                try:
+                    ids.add(int(item[name]))
+                except (KeyError, TypeError, ValueError):
+                    pass
+            related_rows[name] = field.get_queryset().in_bulk(ids)
+        context['related_rows'] = related_rows
+        return context
+
+    def bulk_create(self, items, context):
+        """Validate ``items`` and insert them with one query per batch."""
+        serializer = self.get_serializer(data=items, many=True, context=context)
+        serializer.is_valid(raise_exception=True)
+
+        model = self.queryset.model
+        rows = [model(**attrs, **self.owner_values()) for attrs in serializer.validated_data]
+        with transaction.atomic():
+            if hasattr(model, 'history'):
+                rows = bulk_create_with_history(
+                    rows, model, batch_size=self.bulk_batch_size, default_user=self.request.user
+                )
+            else:
+                rows = model.objects.bulk_create(rows, batch_size=self.bulk_batch_size)
+            self.after_bulk_write(rows)
+
+        # Load the reverse relations the response includes in one query each
+        prefetch_related_objects(rows, *self.queryset._prefetch_related_lookups)
+        return rows
+
+    def bulk_update(self, items, context):
+        """Validate the changes in ``items`` and apply them with one query per batch."""
+        ids = []
+        for item in items:
+            try:
+                ids.append(int(item['id']))
+            except (KeyError, TypeError, ValueError):
+                raise ValidationError('Every object needs the id of the row to update.')
+        if len(set(ids)) != len(ids):
+            raise ValidationError('The same row cannot be updated twice in one request.')
+
+        rows = self.get_queryset().in_bulk(ids)
+        missing = [pk for pk in ids if pk not in rows]
+        if missing:
+            raise ValidationError(f'Rows not found: {", ".join(map(str, missing))}.')
+
+        changes, errors = [], []
+        for pk, item in zip(ids, items):
+            serializer = self.get_serializer(rows[pk], data=item, partial=True, context=context)
+            if serializer.is_valid():
+                changes.append((rows[pk], serializer.validated_data))
+                errors.append({})
+            else:
+                errors.append(serializer.errors)
+        if any(errors):
+            raise ValidationError(errors)
+
+        # Ledger cells the rows belonged to before the change also need a refresh
+        previous_keys = set()
+        if self.ledger_keys:
+            for row, _attrs in changes:
+                previous_keys |= self.ledger_keys(row)
+
+        fields = set()
+        for row, attrs in changes:
+            for name, value in attrs.items():
+                setattr(row, name, value)
+                fields.add(name)
+
+        rows = [row for row, _attrs in changes]
+        model = self.queryset.model
+        with transaction.atomic():
+            if fields and hasattr(model, 'history'):
+                bulk_update_with_history(
+                    rows, model, list(fields), batch_size=self.bulk_batch_size, default_user=self.request.user
+                )
+            elif fields:
+                model.objects.bulk_update(rows, list(fields), batch_size=self.bulk_batch_size)
+            self.after_bulk_write(rows, previous_keys)
+        return rows
+
+    def after_bulk_write(self, rows, previous_ledger_keys=()):
+        """Make the updates the save signals would have made for ``rows``."""
+        if self.ledger_keys:
+            keys = set(previous_ledger_keys)
+            for row in rows:
+                keys |= self.ledger_keys(row)
+            schedule_ledger_refresh(keys)
+
+        kind = SEARCH_KINDS.get(self.queryset.model)
+        if kind:
+            index_objects(kind, [row.pk for row in rows])
+
+        schedule_summary_invalidation([self.request.user.pk])
@@ -0,0 +1,285 @@
+"""
+Query-count and latency benchmarks for the rental income manager views.
+
+The harness seeds a fixed-size portfolio, requests every view of the
+benchmarked URL modules with the test client and records the number of
+queries, SQL time, wall time and peak memory of each one. The status and
+query count of every view that responds successfully are compared against
+a JSON baseline, so regressions such as N+1 queries fail the
+``benchmark_views`` command. Timings are machine-specific and are only
+reported, never stored.
+"""
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+from importlib import import_module
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import URLPattern, reverse
+from properties.models import Property
+from tenants.models import Tenant, Lease
+from payments.models import Payment, PaymentCategory, LateFee
+from expenses.models import Expense, ExpenseCategory, Vendor
+from reports.models import ReportExportJob
+from .middleware import QueryTimer
+from .seeding import PortfolioSeeder
+
+# URL modules whose views are benchmarked, plus individual URL names
+BENCHMARK_URLCONFS = ('properties.urls', 'tenants.urls', 'payments.urls', 'expenses.urls', 'reports.urls')
+BENCHMARK_URL_NAMES = ('dashboard',)
+
+# Views that change data on GET or only exist for debugging
+SKIPPED_URL_NAMES = ('mark_payment_as_paid', 'payment_debug', 'payment_emergency_debug')
+
+# Size of the benchmark portfolio; changing it invalidates the baseline
+BENCHMARK_DATASET = {
+    'owners': 3,
+    'properties_per_owner': 10,
+    'years': 2,
+    'seed': 0,
+}
+
+# Model and owner lookup used to pick the ``pk`` of each URL
+URL_OBJECTS = {
+    'property': (Property, 'owner'),
+    'tenant': (Tenant, 'ownerships__owner'),
+    'lease': (Lease, 'owner'),
+    'payment': (Payment, 'owner'),
+    'late_fee': (LateFee, 'payment__owner'),
+    'payment_category': (PaymentCategory, None),
+    'expense': (Expense, 'owner'),
+    'expense_category': (ExpenseCategory, None),
+    'vendor': (Vendor, 'created_by'),
+    'export_job': (ReportExportJob, 'owner'),
+}
+
+# URL names whose ``pk`` refers to an object of a different prefix
+URL_OBJECT_ALIASES = {
+    'add_late_fee': 'payment',
+    'waive_late_fee': 'late_fee',
+    'lease_renew': 'lease',
+    'lease_terminate': 'lease',
+    'add_lease_document': 'lease',
+    'add_property_image': 'property',
+    'add_property_document': 'property',
+    'add_expense_document': 'expense',
+}
+
+# Other URL arguments and the object they refer to
+URL_ARGUMENTS = {
+    'property_id': 'property',
+    'tenant_id': 'tenant',
+}
+
+# Allowed growth over the baseline before a view counts as a regression
+DEFAULT_THRESHOLDS = {
+    'queries': 0,
+}
+
+# Measurements stored in the baseline; the others depend on the machine
+BASELINE_FIELDS = ('status', 'url', 'queries')
+
+def get_thresholds(**overrides):
+    """Return the regression thresholds from settings, with overrides applied."""
+    thresholds = dict(DEFAULT_THRESHOLDS, **getattr(settings, 'BENCHMARK_THRESHOLDS', {}))
+    thresholds.update({name: value for name, value in overrides.items() if value is not None})
+    return thresholds
+
+def get_baseline_path():
+    """Return the location of the JSON baseline."""
+    return getattr(settings, 'BENCHMARK_BASELINE', settings.BASE_DIR / 'benchmarks' / 'baseline.json')
+
+def seed_benchmark_data():
+    """Create the fixed benchmark portfolio and return the owner to log in as."""
+    dataset = dict(BENCHMARK_DATASET)
+    owners = dataset.pop('owners')
+    PortfolioSeeder(prefix='benchmark', **dataset).seed(owners=owners)
+
+    owner = User.objects.filter(username__startswith='benchmark-owner-').order_by('pk').first()
+    ReportExportJob.objects.create(owner=owner, report_type='income', export_format='pdf')
+    return owner
+
+def _object_key(name):
+    """Return the URL_OBJECTS key of the object a URL name operates on."""
+    if name in URL_OBJECT_ALIASES:
+        return URL_OBJECT_ALIASES[name]
+    for key in sorted(URL_OBJECTS, key=len, reverse=True):
+        if name.startswith(f'{key}_'):
+            return key
+    return None
+
+def _sample_pk(key, owner):
+    """Return the primary key of one of the owner's objects, or None."""
+    model, owner_lookup = URL_OBJECTS[key]
+    queryset = model.objects.all()
+    if owner_lookup:
+        queryset = queryset.filter(**{owner_lookup: owner})
+    return queryset.order_by('pk').values_list('pk', flat=True).first()
+
+def benchmark_urls(owner):
+    """
+    Return ``(name, url)`` pairs for every benchmarked view.
+
+    ``url`` is None when no sample object exists for the URL's arguments.
+    """
+    patterns = []
+    for urlconf in BENCHMARK_URLCONFS:
+        patterns.extend(import_module(urlconf).urlpatterns)
+
+    names = [
+        pattern.name for pattern in patterns
+        if isinstance(pattern, URLPattern) and pattern.name and pattern.name not in SKIPPED_URL_NAMES
+    ]
+    names.extend(BENCHMARK_URL_NAMES)
+
+    urls = []
+    for name in names:
+        pattern = next((pattern for pattern in patterns if getattr(pattern, 'name', None) == name), None)
+        arguments = list(pattern.pattern.converters) if pattern else []
+
+        kwargs = {}
+        for argument in arguments:
+            key = URL_ARGUMENTS.get(argument) or _object_key(name)
+            kwargs[argument] = _sample_pk(key, owner) if key else None
+
+        if any(value is None for value in kwargs.values()):
+            urls.append((name, None))
+        else:
+            urls.append((name, reverse(name, kwargs=kwargs)))
+    return urls
+
+def _request(client, url):
+    """
+    Request ``url`` in a savepoint that is rolled back, so views that write
+    do not change the data seen by later requests.
+
+    Returns the response, the query timer and the wall time in ms.
+    """
+    timer = QueryTimer()
+    with connection.execute_wrapper(timer):
+        with transaction.atomic():
+            started = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                for _chunk in response.streaming_content:
+                    pass
+            wall_time = (time.perf_counter() - started) * 1000
+            transaction.set_rollback(True)
+    return response, timer, wall_time
+
+def is_success(status):
+    """Return whether ``status`` is a 2xx or 3xx response."""
+    return 200 <= status < 400
+
+def measure(client, url, repeat=3):
+    """
+    Request ``url`` ``repeat`` times and return its median costs.
+
+    Peak memory is taken from one more request traced with tracemalloc, so
+    the tracing overhead does not distort the timings. Views that fail are
+    only recorded by status code; the cost of an error page is no
+    reference for the view.
+    """
+    wall_times, sql_times = [], []
+    for _ in range(repeat):
+        response, timer, wall_time = _request(client, url)
+        if not is_success(response.status_code):
+            return {'status': response.status_code}
+        wall_times.append(wall_time)
+        sql_times.append(sum(timer.durations))
+
+    tracemalloc.start()
+    try:
+        _request(client, url)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': response.status_code,
+        'queries': len(timer.durations),
+        'sql_time': round(statistics.median(sql_times), 2),
+        'wall_time': round(statistics.median(wall_times), 2),
+        'peak_memory': peak_memory,
+    }
+
+def run_benchmarks(owner, repeat=3):
+    """
+    Benchmark every view as ``owner`` and return the results by URL name.
+
+    Must run inside the test environment (see ``setup_test_environment``)
+    so that the views are measured under the test settings.
+    """
+    # Start from an empty cache; repeated requests then hit the warm cache
+    cache.clear()
+    client = Client(raise_request_exception=False)
+    client.force_login(owner)
+
+    # Failing views are recorded by status code rather than logged
+    request_logger = logging.getLogger('django.request')
+    log_level = request_logger.level
+    request_logger.setLevel(logging.CRITICAL)
+
+    results = {}
+    try:
+        for name, url in benchmark_urls(owner):
+            if url is None:
+                results[name] = {'skipped': 'no sample object for the URL arguments'}
+            else:
+                results[name] = dict(measure(client, url, repeat), url=url)
+    finally:
+        request_logger.setLevel(log_level)
+    return results
+
+def load_baseline(path=None):
+    """Return the stored baseline results, or None if there are none."""
+    path = path or get_baseline_path()
+    try:
+        with open(path) as baseline_file:
+            return json.load(baseline_file)['views']
+    except FileNotFoundError:
+        return None
+
+def baseline_results(results):
+    """
+    Return the part of ``results`` kept as a baseline: the status and query
+    count of the views that responded successfully. Failing views are left
+    out, so they are not compared until they are fixed and recorded.
+    """
+    return {
+        name: {field: result[field] for field in BASELINE_FIELDS}
+        for name, result in results.items()
+        if 'skipped' not in result and is_success(result['status'])
+    }
+
+def save_baseline(results, path=None):
+    """Write the baseline part of ``results`` as the new baseline."""
+    path = path or get_baseline_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as baseline_file:
+        json.dump({'dataset': BENCHMARK_DATASET, 'views': baseline_results(results)}, baseline_file,
+                  indent=2, sort_keys=True, default=str)
+        baseline_file.write('\n')
+
+def find_regressions(results, baseline, thresholds=None):
+    """
+    Return a message for every baseline view whose status changed or whose
+    query count grew past the threshold.
+    """
+    thresholds = thresholds or get_thresholds()
+    regressions = []
+    for name, current in sorted(results.items()):
+        previous = baseline.get(name)
+        if not previous or 'skipped' in current:
+            continue
+
+        if current['status'] != previous['status']:
+            regressions.append(f"{name}: status {current['status']} (baseline {previous['status']})")
+        elif current['queries'] > previous['queries'] + thresholds['queries']:
+            regressions.append(f"{name}: {current['queries']} queries (baseline {previous['queries']})")
+    return regressions
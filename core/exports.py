@@ -0,0 +1,125 @@
+"""
+Streaming export helpers for the rental income manager application.
+"""
+import csv
+import tempfile
+from django.http import StreamingHttpResponse, FileResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
+
+# Number of rows fetched from the database per round-trip while exporting
+EXPORT_CHUNK_SIZE = 2000
+
+# Excel number formats for typed cells
+XLSX_DATE = 'yyyy-mm-dd'
+XLSX_CURRENCY = '#,##0.00'
+XLSX_INTEGER = '0'
+XLSX_PERCENT = '0.0'
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Table style shared by every PDF report
+PDF_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+class Echo:
+    """
+    File-like object that hands back what is written instead of buffering it.
+    """
+    def write(self, value):
+        return value
+
+def stream_csv(filename, header, rows):
+    """
+    Return a StreamingHttpResponse that writes ``rows`` as CSV lazily.
+
+    ``rows`` may be any iterable, typically a generator over a queryset
+    ``iterator()``, so memory use stays constant regardless of export size.
+    """
+    writer = csv.writer(Echo())
+
+    def generate():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(generate(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def stream_xlsx(filename, sheets):
+    """
+    Return a FileResponse streaming an Excel workbook built in write-only mode.
+
+    ``sheets`` is a list of ``(title, header, rows, formats)`` tuples where
+    ``rows`` may be a generator and ``formats`` lists a number format (or
+    None) per column. Rows are written straight to a temporary file, so
+    neither the workbook nor the queryset is held in memory.
+    """
+    wb = Workbook(write_only=True)
+    for title, header, rows, formats in sheets:
+        ws = wb.create_sheet(title=title)
+
+        header_cells = []
+        for value in header:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = Font(bold=True)
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        for row in rows:
+            cells = []
+            for value, number_format in zip(row, formats):
+                if number_format and value is not None and value != '':
+                    cell = WriteOnlyCell(ws, value=value)
+                    cell.number_format = number_format
+                    cells.append(cell)
+                else:
+                    cells.append(value)
+            ws.append(cells)
+
+    output = tempfile.TemporaryFile()
+    wb.save(output)
+    output.seek(0)
+
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+
+def render_pdf(filename, title, summary, tables):
+    """
+    Return a FileResponse with a PDF report built by ReportLab.
+
+    ``summary`` lists the lines shown under the title and ``tables`` is a
+    list of ``(heading, header, rows)`` tuples; ``heading`` may be None. The
+    document is written to a temporary file rather than an in-memory buffer.
+    """
+    styles = getSampleStyleSheet()
+
+    # Container for the 'Flowable' objects
+    elements = [Paragraph(title, styles['Heading1'])]
+    for line in summary:
+        elements.append(Paragraph(line, styles['Heading2']))
+
+    for heading, header, rows in tables:
+        if heading:
+            elements.append(Paragraph(heading, styles['Heading3']))
+        table = Table([header] + [list(row) for row in rows], repeatRows=1)
+        table.setStyle(PDF_TABLE_STYLE)
+        elements.append(table)
+
+    output = tempfile.TemporaryFile()
+    SimpleDocTemplate(output, pagesize=letter).build(elements)
+    output.seek(0)
+
+    return FileResponse(output, as_attachment=True, filename=filename, content_type='application/pdf')
@@ -0,0 +1,41 @@
+"""
+Database expressions shared by the apps' querysets.
+"""
+from django.db.models import DateField, Func, IntegerField, Q, Value
+
+def as_date(value):
+    """Return a date as an expression, leaving expressions and field names as they are."""
+    return value if hasattr(value, 'resolve_expression') or isinstance(value, str) else Value(value, output_field=DateField())
+
+def overdue_condition(today):
+    """Return the condition matching unpaid rows (with ``status`` and ``due_date``) due before ``today``."""
+    return Q(due_date__lt=today) & ~Q(status='paid')
+
+class DaysBetween(Func):
+    """
+    Whole days from ``start`` to ``end``, two dates (field names, dates or
+    expressions), as an integer; negative when ``end`` is earlier.
+    """
+    # PostgreSQL subtracts dates to an integer number of days
+    arg_joiner = ' - '
+    template = '(%(expressions)s)'
+    output_field = IntegerField()
+
+    def __init__(self, end, start, **extra):
+        super().__init__(as_date(end), as_date(start), **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)',
+            arg_joiner=') - julianday(',
+            **extra_context
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='DATEDIFF(%(expressions)s)',
+            arg_joiner=', ',
+            **extra_context
+        )
@@ -0,0 +1,19 @@
+"""
+Forms for the core app.
+"""
+from django import forms
+
+class ImportFileForm(forms.Form):
+    """
+    Form for uploading a CSV or Excel file of payments or expenses.
+    """
+    file = forms.FileField(
+        help_text="A .csv or .xlsx file with a header row.",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        initial=True,
+        label="Check the file without importing",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
@@ -0,0 +1,347 @@
+"""
+Streaming CSV/XLSX import of payments and expenses.
+
+Files are read one row at a time (``csv`` or openpyxl in read-only mode)
+and processed ``batch_size`` rows at a time. Each row is checked against
+lookups of the owner's properties, tenants, leases, categories and vendors
+loaded once per import, and the valid rows of a batch are inserted with one
+``bulk_create``. Only the current batch and the first errors are held in
+memory, so large files import in bounded memory. The column names are those
+written by the CSV exports, so exported files can be imported back.
+"""
+import csv
+import io
+import os
+import re
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from openpyxl import load_workbook
+from simple_history.utils import bulk_create_with_history
+from properties.models import Property
+from tenants.models import Lease
+from payments.models import Payment, PaymentCategory
+from expenses.models import Expense, ExpenseCategory, Vendor
+from reports.ledger import month_start, month_end, rebuild_ledger
+from .search import SEARCH_KINDS, SEARCH_SOURCES, index_objects
+from .summary import schedule_summary_invalidation
+
+# Rows validated and inserted per batch
+IMPORT_BATCH_SIZE = 1000
+
+# Row errors kept for the report; later errors are only counted
+MAX_REPORTED_ERRORS = 500
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+FALSE_VALUES = {'0', 'false', 'no', 'n'}
+
+def normalize(value):
+    """Return a cell value as a lowercase, single-spaced string for matching names."""
+    return ' '.join(str(value).split()).lower() if value is not None else ''
+
+def column_name(value):
+    """Return a header cell as a column name, e.g. 'Due Date' -> 'due_date'."""
+    return re.sub(r'[^a-z0-9]+', '_', normalize(value)).strip('_')
+
+def read_csv(file):
+    """Yield the rows of a binary CSV file as lists."""
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    finally:
+        # Leave the underlying file open for the caller
+        text.detach()
+
+def read_xlsx(file):
+    """Yield the rows of the first sheet of an Excel workbook as tuples."""
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+FILE_READERS = {
+    '.csv': read_csv,
+    '.xlsx': read_xlsx,
+    '.xlsm': read_xlsx,
+}
+
+def read_rows(file, filename):
+    """
+    Yield ``(row number, {column: value})`` for each non-empty row of a CSV
+    or Excel file, using the first row as the header.
+
+    Raises ValueError if the file type is not supported or it has no header.
+    """
+    reader = FILE_READERS.get(os.path.splitext(filename)[1].lower())
+    if reader is None:
+        raise ValueError('Only .csv and .xlsx files can be imported.')
+
+    rows = reader(file)
+    header = next(rows, None)
+    if not header:
+        raise ValueError('The file is empty.')
+    columns = [column_name(value) for value in header]
+
+    for number, values in enumerate(rows, start=2):
+        if any(value not in (None, '') for value in values):
+            yield number, dict(zip(columns, values))
+
+def name_index(rows):
+    """Return ``{normalized name: {ids}}`` for ``(id, name)`` rows."""
+    index = defaultdict(set)
+    for pk, name in rows:
+        index[normalize(name)].add(pk)
+    return index
+
+class OwnerLookups:
+    """
+    The owner's rows referenced by imported files, indexed by name and
+    loaded with a few queries per import instead of queries per row.
+    """
+
+    def __init__(self, owner, kind):
+        self.properties = name_index(Property.objects.filter(owner=owner).values_list('pk', 'name'))
+
+        if kind == 'payments':
+            self.categories = name_index(PaymentCategory.objects.values_list('pk', 'name'))
+            self.tenants = defaultdict(set)
+            # Latest lease of each (property, tenant) pair
+            self.leases = {}
+            leases = Lease.objects.filter(owner=owner).values_list(
+                'pk', 'rental_property_id', 'tenant_id', 'tenant__first_name', 'tenant__last_name', 'tenant__email'
+            ).order_by('start_date', 'pk')
+            for lease_id, property_id, tenant_id, first_name, last_name, email in leases.iterator():
+                self.tenants[normalize(f'{first_name} {last_name}')].add(tenant_id)
+                if email:
+                    self.tenants[normalize(email)].add(tenant_id)
+                self.leases[property_id, tenant_id] = lease_id
+            references = Payment.objects.filter(owner=owner)
+        else:
+            self.categories = name_index(ExpenseCategory.objects.values_list('pk', 'name'))
+            self.vendors = name_index(Vendor.objects.filter(created_by=owner).values_list('pk', 'name'))
+            references = Expense.objects.filter(owner=owner)
+
+        # Reference numbers already recorded, to skip rows imported before
+        self.references = set(
+            normalize(reference)
+            for reference in references.exclude(reference_number__isnull=True).exclude(reference_number='')
+            .values_list('reference_number', flat=True).iterator()
+        )
+
+def find(index, value, label, errors, column, required=True):
+    """Return the id named by ``value`` in ``index``, or record an error."""
+    name = normalize(value)
+    if not name:
+        if required:
+            errors[column] = f'A {label} is required.'
+        return None
+
+    ids = index.get(name, set())
+    if len(ids) == 1:
+        return next(iter(ids))
+    if ids:
+        errors[column] = f'"{value}" matches several {label}s.'
+    else:
+        errors[column] = f'Unknown {label} "{value}".'
+    return None
+
+def clean_value(model, name, value, errors):
+    """Return ``value`` converted and validated by a model field, or record an error."""
+    field = model._meta.get_field(name)
+    if isinstance(value, str):
+        value = value.strip()
+    if value == '':
+        value = None if field.null else ''
+    if value in (None, '') and field.has_default():
+        value = field.get_default()
+
+    if field.choices and value:
+        # Accept the labels written by the exports as well as the stored values
+        choices = {}
+        for choice, label in field.choices:
+            choices[normalize(choice)] = choice
+            choices[normalize(label)] = choice
+        value = choices.get(normalize(value), value)
+    elif field.get_internal_type() == 'DecimalField' and isinstance(value, str):
+        value = value.replace('$', '').replace(',', '')
+    elif field.get_internal_type() == 'DecimalField' and isinstance(value, float):
+        value = Decimal(str(value))
+    elif field.get_internal_type() == 'BooleanField' and value is not None and normalize(value) in TRUE_VALUES | FALSE_VALUES:
+        value = normalize(value) in TRUE_VALUES
+    elif field.get_internal_type() == 'DateField' and isinstance(value, datetime):
+        value = value.date()
+
+    try:
+        return field.clean(value, None)
+    except ValidationError as exc:
+        errors[name] = ' '.join(exc.messages)
+        return None
+
+def check_reference(reference, lookups, errors):
+    """Record an error if a reference number was already imported or appears twice."""
+    if reference:
+        if normalize(reference) in lookups.references:
+            errors['reference_number'] = f'Reference number "{reference}" has already been recorded.'
+        else:
+            lookups.references.add(normalize(reference))
+
+def payment_from_row(row, lookups):
+    """Return an unsaved Payment for a file row; raises ValidationError with the row's errors."""
+    errors = {}
+    property_id = find(lookups.properties, row.get('property'), 'property', errors, 'property')
+    category_id = find(lookups.categories, row.get('category'), 'category', errors, 'category', required=False)
+
+    tenant_ids = lookups.tenants.get(normalize(row.get('tenant')), set())
+    if property_id:
+        # Of tenants sharing a name, only one can lease this property
+        tenant_ids = {tenant_id for tenant_id in tenant_ids if (property_id, tenant_id) in lookups.leases}
+    tenant_id = lease_id = None
+    if not normalize(row.get('tenant')):
+        errors['tenant'] = 'A tenant is required.'
+    elif len(tenant_ids) == 1:
+        tenant_id = next(iter(tenant_ids))
+        lease_id = lookups.leases.get((property_id, tenant_id))
+    elif len(tenant_ids) > 1:
+        errors['tenant'] = f'"{row["tenant"]}" matches several tenants.'
+    elif property_id:
+        errors['tenant'] = f'"{row["tenant"]}" does not have a lease for this property.'
+
+    values = {
+        name: clean_value(Payment, name, row.get(name), errors)
+        for name in ('amount', 'due_date', 'payment_date', 'status', 'payment_method', 'reference_number', 'notes')
+    }
+    if values['status'] == 'paid' and not values['payment_date'] and 'payment_date' not in errors:
+        errors['payment_date'] = 'Payment date is required for paid payments.'
+    check_reference(values['reference_number'], lookups, errors)
+
+    if errors:
+        raise ValidationError(errors)
+    return Payment(
+        rental_property_id=property_id,
+        tenant_id=tenant_id,
+        lease_id=lease_id,
+        category_id=category_id,
+        **values
+    )
+
+def expense_from_row(row, lookups):
+    """Return an unsaved Expense for a file row; raises ValidationError with the row's errors."""
+    errors = {}
+    property_id = find(lookups.properties, row.get('property'), 'property', errors, 'property')
+    category_id = find(lookups.categories, row.get('category'), 'category', errors, 'category', required=False)
+    vendor_id = find(lookups.vendors, row.get('vendor'), 'vendor', errors, 'vendor', required=False)
+
+    values = {
+        name: clean_value(Expense, name, row.get(name), errors)
+        for name in (
+            'amount', 'date', 'due_date', 'payment_date', 'payment_method', 'reference_number',
+            'description', 'status', 'tax_deductible', 'notes'
+        )
+    }
+    check_reference(values['reference_number'], lookups, errors)
+
+    if errors:
+        raise ValidationError(errors)
+    return Expense(
+        rental_property_id=property_id,
+        category_id=category_id,
+        vendor_id=vendor_id,
+        **values
+    )
+
+def payment_dates(payment):
+    return [payment.due_date, payment.payment_date]
+
+def expense_dates(expense):
+    return [expense.date]
+
+# For each kind: the model, the row parser and the dates feeding the ledger
+IMPORTERS = {
+    'payments': (Payment, payment_from_row, payment_dates),
+    'expenses': (Expense, expense_from_row, expense_dates),
+}
+
+def chunked(rows, size):
+    """Yield lists of up to ``size`` items from an iterable."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def import_rows(kind, owner, rows, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import ``(row number, {column: value})`` rows as the owner's payments
+    or expenses.
+
+    Invalid rows are skipped and reported; the valid rows are created in
+    one transaction, ``batch_size`` at a time. With ``dry_run`` nothing is
+    written. Returns a dict with the number of rows read and imported, the
+    number of invalid rows and the errors of the first of them as
+    ``{'row': number, 'errors': {column: message}}``.
+    """
+    model, from_row, row_dates = IMPORTERS[kind]
+    lookups = OwnerLookups(owner, kind)
+    search_kind = SEARCH_KINDS[model]
+    search_fields = SEARCH_SOURCES[search_kind]['fields']
+    result = {'rows': 0, 'imported': 0, 'invalid': 0, 'errors': [], 'dry_run': dry_run}
+    property_ids, dates = set(), set()
+
+    with transaction.atomic():
+        for chunk in chunked(rows, batch_size):
+            objects = []
+            for number, row in chunk:
+                result['rows'] += 1
+                try:
+                    obj = from_row(row, lookups)
+                except ValidationError as exc:
+                    result['invalid'] += 1
+                    if len(result['errors']) < MAX_REPORTED_ERRORS:
+                        result['errors'].append({
+                            'row': number,
+                            'errors': {column: ' '.join(messages) for column, messages in exc.message_dict.items()},
+                        })
+                    continue
+                obj.created_by = obj.owner = owner
+                objects.append(obj)
+
+            result['imported'] += len(objects)
+            if dry_run or not objects:
+                continue
+
+            created = bulk_create_with_history(objects, model, batch_size=batch_size, default_user=owner)
+            index_objects(
+                search_kind,
+                [obj.pk for obj in created if any(getattr(obj, field) for field in search_fields)]
+            )
+            for obj in created:
+                property_ids.add(obj.rental_property_id)
+                dates.update(value for value in row_dates(obj) if value)
+            dates = {min(dates), max(dates)} if dates else dates
+
+        if property_ids and dates:
+            # bulk_create skips the signals that keep the ledger and summaries up to date
+            rebuild_ledger(
+                Property.objects.filter(pk__in=property_ids),
+                batch_size=batch_size,
+                start_date=month_start(min(dates)),
+                end_date=month_end(max(dates))
+            )
+            schedule_summary_invalidation([owner.pk])
+
+    return result
+
+def import_file(kind, owner, file, filename, dry_run=False, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Import a CSV or Excel file of payments or expenses for ``owner``.
+
+    See ``import_rows`` for the result; raises ValueError if the file cannot
+    be read.
+    """
+    return import_rows(kind, owner, read_rows(file, filename), dry_run=dry_run, batch_size=batch_size)
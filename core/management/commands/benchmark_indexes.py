@@ -0,0 +1,140 @@
+"""
+Compare query plans and timings of the main access paths with and without
+the composite indexes declared on Payment, Expense and Lease.
+"""
+import time
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from properties.models import Property
+from tenants.models import Lease
+from payments.models import Payment
+from expenses.models import Expense
+from core.seeding import PortfolioSeeder
+
+# Models whose Meta.indexes are dropped for the "before" measurement
+INDEXED_MODELS = (Payment, Expense, Lease)
+
+class Rollback(Exception):
+    """Raised to discard the benchmark dataset and dropped indexes."""
+
+def access_paths(owner, today):
+    """Return the (name, queryset) pairs measured by the benchmark."""
+    year_start = today.replace(month=1, day=1)
+    month_start = today.replace(day=1)
+    month_end = month_start + relativedelta(months=1) - timedelta(days=1)
+    rental_property = Property.objects.filter(owner=owner).first()
+
+    return [
+        ('Owner income for the year', Payment.objects.filter(
+            owner=owner, status='paid', payment_date__range=[year_start, today])),
+        ('Owner upcoming payments', Payment.objects.filter(
+            owner=owner, status__in=Payment.OPEN_STATUSES, due_date__gte=today).order_by('due_date')[:5]),
+        ('Owner overdue payments', Payment.objects.filter(
+            owner=owner, status__in=Payment.OPEN_STATUSES, due_date__lt=today)),
+        ('Overdue payments (all owners)', Payment.objects.filter(
+            status__in=Payment.OPEN_STATUSES, due_date__lt=today)),
+        ('Owner expenses for the year', Expense.objects.filter(
+            owner=owner, status='paid', date__range=[year_start, today])),
+        ('Property expenses for a month', Expense.objects.filter(
+            rental_property=rental_property, date__range=[month_start, month_end])),
+        ('Owner expiring leases', Lease.objects.filter(
+            owner=owner, status='active', end_date__range=[today, today + timedelta(days=30)])),
+        ('Expiring leases (all owners)', Lease.objects.filter(
+            status='active', end_date__range=[today, today + timedelta(days=30)])),
+        ('Leases starting soon', Lease.objects.filter(
+            status='pending', start_date__range=[today, today + timedelta(days=30)])),
+    ]
+
+class Command(BaseCommand):
+    help = 'Show query plans and timings of owner-scoped date range queries before and after the composite indexes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owners', type=int, default=20, help='Owners to create (default: 20).')
+        parser.add_argument('--properties', type=int, default=10, help='Properties per owner (default: 10).')
+        parser.add_argument('--years', type=int, default=3, help='Years of payment history (default: 3).')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query (default: 5).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0).')
+
+    def explain(self, queryset, phase):
+        """
+        Return the query plan of ``queryset``.
+
+        The SQL is tagged with ``phase`` so the database does not answer
+        from a plan prepared before the indexes were dropped.
+        """
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql} -- {phase}', params)
+            return '\n'.join(' '.join(str(value) for value in row) for row in cursor.fetchall())
+
+    def measure(self, paths, repeat, phase):
+        """Return the plan and best run time in milliseconds of each query."""
+        results = {}
+        for name, queryset in paths:
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = (self.explain(queryset, phase), min(timings))
+        return results
+
+    def analyze(self):
+        """Refresh the planner statistics for the seeded tables."""
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def drop_indexes(self):
+        """Drop the composite indexes declared in the models' Meta.indexes."""
+        schema_editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model in INDEXED_MODELS:
+                for index in model._meta.indexes:
+                    cursor.execute(str(index.remove_sql(model, schema_editor)))
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+
+        try:
+            with transaction.atomic():
+                seeder = PortfolioSeeder(
+                    properties_per_owner=options['properties'],
+                    years=options['years'],
+                    seed=options['seed'],
+                    as_of=today,
+                    prefix='benchmark'
+                )
+                counts = seeder.seed(owners=options['owners'])
+                self.stdout.write(
+                    f"Seeded {counts['payments']} payments, {counts['expenses']} expenses "
+                    f"and {counts['leases']} leases."
+                )
+                owner = User.objects.filter(username__startswith='benchmark-owner-').order_by('pk').first()
+                self.analyze()
+                paths = access_paths(owner, today)
+
+                after = self.measure(paths, options['repeat'], 'after')
+                self.drop_indexes()
+                self.analyze()
+                before = self.measure(paths, options['repeat'], 'before')
+
+                raise Rollback
+        except Rollback:
+            pass
+
+        for name, _ in paths:
+            before_plan, before_time = before[name]
+            after_plan, after_time = after[name]
+            self.stdout.write('')
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f'  before: {before_time:.2f} ms')
+            for line in before_plan.splitlines():
+                self.stdout.write(f'    {line}')
+            self.stdout.write(f'  after:  {after_time:.2f} ms')
+            for line in after_plan.splitlines():
+                self.stdout.write(f'    {line}')
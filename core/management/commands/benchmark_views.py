@@ -0,0 +1,72 @@
+"""
+Benchmark every list, detail and report view against the stored baseline.
+"""
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+from core.benchmarks import (
+    seed_benchmark_data, run_benchmarks, load_baseline, save_baseline,
+    find_regressions, get_thresholds, get_baseline_path
+)
+
+class Rollback(Exception):
+    """Raised to discard the benchmark dataset."""
+
+class Command(BaseCommand):
+    help = ('Record query counts, SQL time, wall time and peak memory of every view and compare the status and '
+            'query count of each to a baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Requests per view (default: 3).')
+        parser.add_argument('--baseline', type=Path, help='Baseline JSON file (default: settings.BENCHMARK_BASELINE).')
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help='Store the results as the new baseline instead of comparing them.'
+        )
+        parser.add_argument('--max-extra-queries', type=int, help='Allowed extra queries per view.')
+
+    def handle(self, *args, **options):
+        path = options['baseline'] or get_baseline_path()
+
+        # Measure under the test settings; the dataset is created and
+        # discarded in one transaction
+        setup_test_environment(debug=False)
+        try:
+            with transaction.atomic():
+                owner = seed_benchmark_data()
+                results = run_benchmarks(owner, repeat=options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(f"{'View':<40} {'Status':>6} {'Queries':>8} {'SQL ms':>9} {'Wall ms':>9} {'Peak KiB':>9}")
+        for name, result in sorted(results.items()):
+            if 'skipped' in result:
+                self.stdout.write(f"{name:<40} skipped: {result['skipped']}")
+                continue
+            if 'queries' not in result:
+                self.stdout.write(f"{name:<40} {result['status']:>6} failed")
+                continue
+            self.stdout.write(
+                f"{name:<40} {result['status']:>6} {result['queries']:>8} {result['sql_time']:>9.2f} "
+                f"{result['wall_time']:>9.2f} {result['peak_memory'] / 1024:>9.0f}"
+            )
+
+        baseline = None if options['update_baseline'] else load_baseline(path)
+        if baseline is None:
+            save_baseline(results, path)
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {path}.'))
+            failed = [result for result in results.values() if 'skipped' not in result and 'queries' not in result]
+            if failed:
+                self.stdout.write(self.style.WARNING(f'{len(failed)} failing views were left out of the baseline.'))
+            return
+
+        thresholds = get_thresholds(queries=options['max_extra_queries'])
+        regressions = find_regressions(results, baseline, thresholds)
+        if regressions:
+            raise CommandError('Benchmark regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
@@ -0,0 +1,48 @@
+"""
+Import payments or expenses from a CSV or Excel file.
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from core.imports import IMPORTERS, IMPORT_BATCH_SIZE, import_file
+
+class Command(BaseCommand):
+    help = 'Import payments or expenses for an owner from a .csv or .xlsx file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS), help='What the file contains.')
+        parser.add_argument('path', help='Path of the .csv or .xlsx file.')
+        parser.add_argument('--owner', required=True, help='Username of the owner to import for.')
+        parser.add_argument('--dry-run', action='store_true', help='Check the file without importing it.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help=f'Rows inserted per query (default: {IMPORT_BATCH_SIZE}).'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named '{options['owner']}'.")
+
+        try:
+            with open(options['path'], 'rb') as file:
+                result = import_file(
+                    options['kind'], owner, file, options['path'],
+                    dry_run=options['dry_run'],
+                    batch_size=options['batch_size']
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for row in result['errors']:
+            for column, message in row['errors'].items():
+                self.stderr.write(f"Row {row['row']}, {column}: {message}")
+        if result['invalid'] > len(result['errors']):
+            self.stderr.write(f"... and {result['invalid'] - len(result['errors'])} more rows with errors.")
+
+        verb = 'Would import' if result['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result['imported']} of {result['rows']} {options['kind']} ({result['invalid']} rows with errors)."
+        ))
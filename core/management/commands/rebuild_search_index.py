@@ -0,0 +1,23 @@
+"""
+Rebuild the full-text search documents of every owner.
+"""
+from django.core.management.base import BaseCommand
+from core.search import rebuild_search_index
+
+class Command(BaseCommand):
+    help = 'Rebuild the search index of properties, tenants, vendors, expenses and payments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows indexed per query (default: 1000).'
+        )
+
+    def handle(self, *args, **options):
+        counts = rebuild_search_index(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            'Indexed ' + ', '.join(f'{count} {kind} documents' for kind, count in counts.items()) + '.'
+        ))
@@ -0,0 +1,46 @@
+"""
+Populate the database with synthetic portfolios for load testing.
+"""
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from core.seeding import PortfolioSeeder
+
+class Command(BaseCommand):
+    help = 'Bulk-create owners with properties, tenants, leases, payments, late fees, expenses and vendors.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owners', type=int, default=10, help='Owners to create (default: 10).')
+        parser.add_argument('--properties', type=int, default=10, help='Properties per owner (default: 10).')
+        parser.add_argument('--years', type=int, default=3, help='Years of lease and payment history (default: 3).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0).')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows inserted per query (default: 1000).'
+        )
+        parser.add_argument('--as-of', help='Date the history runs up to, as YYYY-MM-DD (default: today).')
+        parser.add_argument('--prefix', default='seed', help='Username prefix of the created owners (default: seed).')
+        parser.add_argument('--password', help='Password of the created owners (default: unusable).')
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['as_of']:
+            try:
+                as_of = datetime.strptime(options['as_of'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid date '{options['as_of']}', expected YYYY-MM-DD.")
+
+        seeder = PortfolioSeeder(
+            properties_per_owner=options['properties'],
+            years=options['years'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            as_of=as_of,
+            prefix=options['prefix'],
+            password=options['password']
+        )
+        counts = seeder.seed(owners=options['owners'])
+
+        summary = ', '.join(f'{count} {name.replace("_", " ")}' for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Created {summary}.'))
@@ -0,0 +1,133 @@
+"""
+Per-request SQL and timing instrumentation.
+
+When ``QUERY_INSTRUMENTATION_ENABLED`` is set, a sample of requests is
+timed: the number of queries, the time spent in the database and any SQL
+repeated often enough to suggest an N+1 query are reported in a
+``Server-Timing`` header and a structured log line. Streaming responses
+are measured until they are closed and only logged.
+"""
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('core.instrumentation')
+
+class QueryTimer:
+    """
+    Database execute wrapper that records the SQL and duration in ms of
+    every query.
+
+    Savepoint statements are ignored.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if 'SAVEPOINT' not in sql:
+                self.queries.append((sql, (time.perf_counter() - started) * 1000))
+
+    @property
+    def durations(self):
+        return [duration for _sql, duration in self.queries]
+
+    def repeated_queries(self, threshold):
+        """Return ``(sql, count)`` pairs for SQL run at least ``threshold`` times."""
+        counts = Counter(sql for sql, _duration in self.queries)
+        return [(sql, count) for sql, count in counts.most_common() if count >= threshold]
+
+class QueryInstrumentationMiddleware:
+    """
+    Count the queries and database time of sampled requests.
+
+    Settings:
+        QUERY_INSTRUMENTATION_ENABLED: turn the middleware on.
+        QUERY_INSTRUMENTATION_SAMPLE_RATE: share of requests to instrument (0-1).
+        QUERY_INSTRUMENTATION_REPEAT_THRESHOLD: executions of the same SQL
+            reported as a repeated (N+1) query.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION_ENABLED', False):
+            raise MiddlewareNotUsed
+
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'QUERY_INSTRUMENTATION_SAMPLE_RATE', 1.0)
+        self.repeat_threshold = getattr(settings, 'QUERY_INSTRUMENTATION_REPEAT_THRESHOLD', 5)
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+
+            if response.streaming:
+                # The body of a streaming response (e.g. a CSV export) is
+                # produced, and its queries run, after the headers are sent,
+                # so it gets no Server-Timing header; the measurement ends
+                # and is logged when the server closes the response
+                wrappers = stack.pop_all()
+                close = response.close
+
+                def close_and_report():
+                    wrappers.close()
+                    try:
+                        close()
+                    finally:
+                        self.report(request, response, timer, started)
+
+                response.close = close_and_report
+                return response
+
+        db_time, total_time = self.report(request, response, timer, started)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_time:.2f};desc="{len(timer.queries)} queries"',
+            f'app;dur={total_time - db_time:.2f}',
+            f'total;dur={total_time:.2f}',
+        ])
+        return response
+
+    def report(self, request, response, timer, started):
+        """Log the measurement of a request and return its database and total time in ms."""
+        total_time = (time.perf_counter() - started) * 1000
+        db_time = sum(timer.durations)
+        repeated = timer.repeated_queries(self.repeat_threshold)
+
+        # Name the view for grouping; unresolved URLs keep their path
+        match = request.resolver_match
+        view = match.view_name if match else request.path
+
+        logger.info(
+            'request view=%s method=%s status=%s queries=%d db_ms=%.2f total_ms=%.2f repeated=%d',
+            view, request.method, response.status_code, len(timer.queries), db_time, total_time,
+            len(repeated),
+            extra={
+                'view': view,
+                'path': request.path,
+                'method': request.method,
+                'status': response.status_code,
+                'queries': len(timer.queries),
+                'db_time': round(db_time, 2),
+                'total_time': round(total_time, 2),
+                'repeated_queries': [{'sql': sql, 'count': count} for sql, count in repeated],
+            }
+        )
+        for sql, count in repeated:
+            logger.warning('Repeated query in %s (%d times): %s', view, count, sql)
+
+        return db_time, total_time
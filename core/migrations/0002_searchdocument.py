@@ -0,0 +1,79 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# FTS5 index mirroring core_searchdocument, kept in step by triggers
+FTS_TABLE_SQL = [
+    """
+    CREATE VIRTUAL TABLE core_searchindex USING fts5(
+        title, body,
+        content='core_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER core_searchdocument_ai AFTER INSERT ON core_searchdocument BEGIN
+        INSERT INTO core_searchindex(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER core_searchdocument_ad AFTER DELETE ON core_searchdocument BEGIN
+        INSERT INTO core_searchindex(core_searchindex, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER core_searchdocument_au AFTER UPDATE ON core_searchdocument BEGIN
+        INSERT INTO core_searchindex(core_searchindex, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO core_searchindex(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+DROP_FTS_TABLE_SQL = [
+    'DROP TRIGGER IF EXISTS core_searchdocument_ai',
+    'DROP TRIGGER IF EXISTS core_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS core_searchdocument_au',
+    'DROP TABLE IF EXISTS core_searchindex',
+]
+
+def create_fts_index(apps, schema_editor):
+    """Create the FTS5 search index on SQLite; other databases search the documents directly."""
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in FTS_TABLE_SQL:
+            schema_editor.execute(sql)
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_FTS_TABLE_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('property', 'Property'), ('tenant', 'Tenant'), ('vendor', 'Vendor'), ('expense', 'Expense'), ('payment', 'Payment')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'kind'], name='searchdoc_owner_kind_idx')],
+                'unique_together': {('kind', 'object_id', 'owner')},
+            },
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
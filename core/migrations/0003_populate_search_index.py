@@ -0,0 +1,63 @@
+from django.db import migrations
+
+# The searchable rows as of this migration: for each kind, the model, the
+# lookup from a row to the owners who may see it and the indexed fields
+SEARCH_SOURCES = {
+    'property': ('properties', 'Property', 'owner',
+                 ['name', 'address', 'city', 'state', 'zip_code', 'description', 'amenities', 'notes']),
+    'tenant': ('tenants', 'Tenant', 'ownerships__owner',
+               ['first_name', 'last_name', 'email', 'phone', 'employer', 'emergency_contact_name', 'notes']),
+    'vendor': ('expenses', 'Vendor', 'created_by', ['name', 'contact_person', 'email', 'phone', 'address', 'notes']),
+    'expense': ('expenses', 'Expense', 'owner', ['description', 'reference_number', 'notes']),
+    'payment': ('payments', 'Payment', 'owner', ['reference_number', 'notes']),
+}
+
+
+def document_title(kind, row):
+    if kind == 'tenant':
+        return f'{row.first_name} {row.last_name}'
+    if kind == 'expense':
+        return row.description
+    if kind == 'payment':
+        return f'Payment {row.reference_number}' if row.reference_number else f'Payment due {row.due_date}'
+    return row.name
+
+
+def populate_search_index(apps, schema_editor):
+    """Index the rows recorded before the search index existed."""
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+
+    for kind, (app_label, model_name, owner, fields) in SEARCH_SOURCES.items():
+        model = apps.get_model(app_label, model_name)
+        owners = {}
+        for object_id, owner_id in model.objects.filter(
+            **{f'{owner}__isnull': False}
+        ).values_list('pk', owner).distinct().iterator():
+            owners.setdefault(object_id, []).append(owner_id)
+
+        documents = []
+        for row in model.objects.filter(pk__in=owners).iterator():
+            body = '\n'.join(str(value) for value in (getattr(row, field) for field in fields) if value)
+            if not body:
+                continue
+            title = document_title(kind, row)[:255]
+            documents.extend(
+                SearchDocument(owner_id=owner_id, kind=kind, object_id=row.pk, title=title, body=body)
+                for owner_id in owners[row.pk]
+            )
+        SearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_searchdocument'),
+        ('properties', '0001_initial'),
+        ('tenants', '0006_tenantownership'),
+        ('payments', '0005_backfill_payment_owner'),
+        ('expenses', '0004_backfill_expense_owner'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
@@ -44,3 +44,31 @@ class Notification(models.Model):
     
     def __str__(self):
         return self.title
+
+class SearchDocument(models.Model):
+    """
+    Searchable text of one property, tenant, vendor, expense or payment as
+    seen by one owner (see core.search).
+    """
+    KINDS = (
+        ('property', 'Property'),
+        ('tenant', 'Tenant'),
+        ('vendor', 'Vendor'),
+        ('expense', 'Expense'),
+        ('payment', 'Payment'),
+    )
+    
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='search_documents')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    object_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    
+    class Meta:
+        unique_together = ('kind', 'object_id', 'owner')
+        indexes = [
+            models.Index(fields=['owner', 'kind'], name='searchdoc_owner_kind_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
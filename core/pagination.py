@@ -0,0 +1,194 @@
+"""
+Keyset (cursor) pagination for long, frequently paged lists.
+
+Pages are selected with a ``WHERE (sort column, id) < (last row)``
+condition instead of an OFFSET, so every page costs the same however deep
+it is, and no COUNT(*) runs unless the list asks for one. The position is
+passed between requests as an opaque ``cursor`` query parameter.
+The JSON API uses DRF's cursor pagination, configured here.
+"""
+import base64
+import binascii
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.http import Http404
+from rest_framework.pagination import CursorPagination
+
+# Rows counted at most by an approximate count
+APPROXIMATE_COUNT_LIMIT = 1000
+
+def encode_cursor(value, pk, direction):
+    """Return an opaque cursor for the row with sort ``value`` and ``pk``."""
+    data = json.dumps([value, pk, direction], cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return the ``(value, pk, direction)`` encoded in ``cursor``, or raise ValueError."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, pk, direction = json.loads(data)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError(f'Invalid cursor {cursor!r}')
+    if direction not in ('next', 'previous') or not isinstance(pk, int):
+        raise ValueError(f'Invalid cursor {cursor!r}')
+    return value, pk, direction
+
+class KeysetPage:
+    """One page of a KeysetPaginator, with cursors to its neighbours."""
+
+    def __init__(self, paginator, object_list, has_next, has_previous):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    @property
+    def next_cursor(self):
+        if not self.has_next_page:
+            return None
+        return self.paginator.cursor_for(self.object_list[-1], 'next')
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous_page:
+            return None
+        return self.paginator.cursor_for(self.object_list[0], 'previous')
+
+class KeysetPaginator:
+    """
+    Paginate a queryset ordered by one field, using the primary key as a
+    tie-breaker.
+
+    ``count`` selects how the total is reported: None skips counting,
+    'exact' runs a COUNT(*), and 'approximate' counts at most
+    APPROXIMATE_COUNT_LIMIT rows (``count_is_exact`` tells which applies).
+    Rows with a NULL sort value are listed last in either direction.
+    """
+
+    def __init__(self, queryset, per_page, count='approximate'):
+        ordering = list(queryset.query.order_by) or [queryset.model._meta.pk.name]
+        self.field = ordering[0].lstrip('-')
+        self.descending = ordering[0].startswith('-')
+        self.queryset = queryset.annotate(_keyset_value=F(self.field))
+        self.per_page = per_page
+        self.count_mode = count
+        self._count = None
+
+    def _sort_field(self):
+        """Return the model field (or annotation output field) the list is sorted by."""
+        if self.field in self.queryset.query.annotations:
+            return self.queryset.query.annotations[self.field].output_field
+        model = self.queryset.model
+        *relations, name = self.field.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(name)
+
+    def _ordered(self, reverse=False):
+        """Return the queryset in page order, or in reverse for previous pages."""
+        descending = self.descending != reverse
+        nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+        if descending:
+            return self.queryset.order_by(F('_keyset_value').desc(**nulls), '-pk')
+        return self.queryset.order_by(F('_keyset_value').asc(**nulls), 'pk')
+
+    def _after(self, value, pk, reverse=False):
+        """Return the condition selecting rows after (value, pk) in the given order."""
+        descending = self.descending != reverse
+        beyond = 'lt' if descending else 'gt'
+
+        if value is None:
+            # NULLs are last: going forward only other NULLs can follow, going
+            # back every non-NULL row precedes them
+            condition = Q(_keyset_value__isnull=True, **{f'pk__{beyond}': pk})
+            if reverse:
+                condition |= Q(_keyset_value__isnull=False)
+            return condition
+
+        condition = (
+            Q(**{f'_keyset_value__{beyond}': value}) |
+            Q(_keyset_value=value, **{f'pk__{beyond}': pk})
+        )
+        if not reverse:
+            condition |= Q(_keyset_value__isnull=True)
+        return condition
+
+    def cursor_for(self, obj, direction):
+        """Return the cursor of the page next to or before ``obj``."""
+        return encode_cursor(obj._keyset_value, obj.pk, direction)
+
+    def page(self, cursor=None):
+        """Return the page starting after ``cursor`` (the first page if None)."""
+        if not cursor:
+            rows = list(self._ordered()[:self.per_page + 1])
+            return KeysetPage(self, rows[:self.per_page], len(rows) > self.per_page, False)
+
+        value, pk, direction = decode_cursor(cursor)
+        if value is not None:
+            value = self._sort_field().to_python(value)
+
+        if direction == 'next':
+            rows = list(self._ordered().filter(self._after(value, pk))[:self.per_page + 1])
+            return KeysetPage(self, rows[:self.per_page], len(rows) > self.per_page, True)
+
+        rows = list(self._ordered(reverse=True).filter(self._after(value, pk, reverse=True))[:self.per_page + 1])
+        object_list = rows[:self.per_page][::-1]
+        return KeysetPage(self, object_list, True, len(rows) > self.per_page)
+
+    @property
+    def count(self):
+        """Return the number of rows, or None when counting is disabled."""
+        if self.count_mode is None:
+            return None
+        if self._count is None:
+            queryset = self.queryset.order_by()
+            if self.count_mode == 'approximate':
+                queryset = queryset.values('pk')[:APPROXIMATE_COUNT_LIMIT + 1]
+            self._count = queryset.count()
+        return min(self._count, APPROXIMATE_COUNT_LIMIT) if self.count_mode == 'approximate' else self._count
+
+    @property
+    def count_is_exact(self):
+        count = self.count
+        return self.count_mode == 'exact' or (count is not None and self._count <= APPROXIMATE_COUNT_LIMIT)
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin replacing offset pagination with keyset pagination.
+
+    The list keeps ``paginate_by`` and the ordering of ``get_queryset``;
+    the page is chosen by the ``cursor`` query parameter.
+    """
+    cursor_kwarg = 'cursor'
+    paginate_count = 'approximate'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, count=self.paginate_count)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except ValueError:
+            raise Http404('Invalid page cursor.')
+        return paginator, page, page.object_list, page.has_other_pages()
+
+class APICursorPagination(CursorPagination):
+    """Cursor pagination of the JSON API: newest rows first, paged by id."""
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
@@ -0,0 +1,54 @@
+"""
+Monthly income and expense rollups for the rental income manager application.
+"""
+from datetime import date
+from django.db.models import Sum
+from django.utils import timezone
+from reports.models import MonthlyPropertyLedger
+
+def monthly_rollup(owner, year=None, as_of=None):
+    """
+    Compute income, expenses and net income for every month of ``year``.
+
+    Figures are read from the precomputed monthly property ledger, so the
+    cost depends on the number of months rather than the number of payments
+    and expenses. The result holds one entry per month plus the year-to-date
+    totals through the month of ``as_of`` (defaults to today).
+    """
+    as_of = as_of or timezone.now().date()
+    year = year or as_of.year
+
+    rows = MonthlyPropertyLedger.objects.filter(
+        rental_property__owner=owner,
+        month__year=year
+    ).values('month').annotate(
+        income=Sum('income'),
+        expenses=Sum('expenses')
+    ).order_by()
+    totals = {row['month'].month: row for row in rows}
+
+    months = []
+    income_to_date = 0
+    expenses_to_date = 0
+    for month in range(1, 13):
+        row = totals.get(month, {})
+        month_income = row.get('income') or 0
+        month_expenses = row.get('expenses') or 0
+        months.append({
+            'month': date(year, month, 1),
+            'income': month_income,
+            'expenses': month_expenses,
+            'net': month_income - month_expenses,
+        })
+
+        if date(year, month, 1) <= as_of:
+            income_to_date += month_income
+            expenses_to_date += month_expenses
+
+    return {
+        'year': year,
+        'months': months,
+        'income_to_date': income_to_date,
+        'expenses_to_date': expenses_to_date,
+        'net_to_date': income_to_date - expenses_to_date,
+    }
@@ -0,0 +1,237 @@
+"""
+Owner-scoped full-text search over properties, tenants, vendors, expenses
+and payments.
+
+Each searchable row is copied into a SearchDocument for every owner allowed
+to see it, and the handlers in ``core.signals`` keep those documents in step
+with the rows. Searching is delegated to the backend named by the
+``SEARCH_BACKEND`` setting: on SQLite the documents are mirrored into an
+FTS5 table by triggers, so a search is a single ranked MATCH query.
+"""
+import re
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from properties.models import Property
+from tenants.models import Tenant
+from expenses.models import Vendor, Expense
+from payments.models import Payment
+from .models import SearchDocument
+
+# For each kind: the model, the lookup from a row to the owners who may
+# see it, how to title a hit and the fields whose text is indexed
+SEARCH_SOURCES = {
+    'property': {
+        'model': Property,
+        'owner': 'owner',
+        'title': lambda row: row.name,
+        'fields': ['name', 'address', 'city', 'state', 'zip_code', 'description', 'amenities', 'notes'],
+    },
+    'tenant': {
+        'model': Tenant,
+        'owner': 'ownerships__owner',
+        'title': lambda row: f'{row.first_name} {row.last_name}',
+        'fields': ['first_name', 'last_name', 'email', 'phone', 'employer', 'emergency_contact_name', 'notes'],
+    },
+    'vendor': {
+        'model': Vendor,
+        'owner': 'created_by',
+        'title': lambda row: row.name,
+        'fields': ['name', 'contact_person', 'email', 'phone', 'address', 'notes'],
+    },
+    'expense': {
+        'model': Expense,
+        'owner': 'owner',
+        'title': lambda row: row.description,
+        'fields': ['description', 'reference_number', 'notes'],
+    },
+    'payment': {
+        'model': Payment,
+        'owner': 'owner',
+        'title': lambda row: f'Payment {row.reference_number}' if row.reference_number else f'Payment due {row.due_date}',
+        'fields': ['reference_number', 'notes'],
+    },
+}
+
+SEARCH_KINDS = {source['model']: kind for kind, source in SEARCH_SOURCES.items()}
+
+def document_owners(kind, object_ids):
+    """Return the ids of the owners allowed to see each row, keyed by row id."""
+    owner = SEARCH_SOURCES[kind]['owner']
+    rows = SEARCH_SOURCES[kind]['model'].objects.filter(
+        pk__in=object_ids,
+        **{f'{owner}__isnull': False}
+    ).values_list('pk', owner).distinct()
+
+    owners = defaultdict(set)
+    for object_id, owner_id in rows:
+        owners[object_id].add(owner_id)
+    return owners
+
+def build_documents(kind, object_ids):
+    """Return unsaved SearchDocuments for the rows of ``kind`` with the given ids."""
+    source = SEARCH_SOURCES[kind]
+    owners = document_owners(kind, object_ids)
+
+    documents = []
+    for row in source['model'].objects.filter(pk__in=owners):
+        body = '\n'.join(str(value) for value in (getattr(row, field) for field in source['fields']) if value)
+        if not body:
+            # Rows without searchable text (e.g. generated rent payments) are not indexed
+            continue
+        title = source['title'](row)[:255]
+        documents.extend(
+            SearchDocument(owner_id=owner_id, kind=kind, object_id=row.pk, title=title, body=body)
+            for owner_id in owners[row.pk]
+        )
+    return documents
+
+def index_objects(kind, object_ids, batch_size=1000):
+    """Replace the search documents of the rows of ``kind`` with the given ids."""
+    object_ids = list(object_ids)
+    documents = build_documents(kind, object_ids)
+    with transaction.atomic():
+        SearchDocument.objects.filter(kind=kind, object_id__in=object_ids).delete()
+        SearchDocument.objects.bulk_create(documents, batch_size=batch_size)
+    return documents
+
+def remove_objects(kind, object_ids):
+    """Drop the search documents of the rows of ``kind`` with the given ids."""
+    SearchDocument.objects.filter(kind=kind, object_id__in=list(object_ids)).delete()
+
+def reindex_property_rows(property_id):
+    """Reindex the tenants, expenses and payments of a property, e.g. after it changes owner."""
+    index_objects('tenant', Tenant.objects.filter(leases__rental_property=property_id).values_list('pk', flat=True).distinct())
+    index_objects('expense', Expense.objects.filter(rental_property=property_id).values_list('pk', flat=True))
+    index_objects('payment', Payment.objects.filter(rental_property=property_id).values_list('pk', flat=True))
+
+def rebuild_search_index(batch_size=1000):
+    """
+    Rebuild every search document from scratch, ``batch_size`` rows at a
+    time. Returns the number of documents per kind.
+    """
+    counts = {}
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        for kind, source in SEARCH_SOURCES.items():
+            counts[kind] = 0
+            object_ids = source['model'].objects.order_by('pk').values_list('pk', flat=True)
+            last_pk = 0
+            while True:
+                chunk = list(object_ids.filter(pk__gt=last_pk)[:batch_size])
+                if not chunk:
+                    break
+                counts[kind] += len(index_objects(kind, chunk, batch_size=batch_size))
+                last_pk = chunk[-1]
+        get_search_backend().optimize()
+    return counts
+
+def search_terms(query):
+    """Return the words of a search query."""
+    return re.findall(r'\w+', query or '')
+
+class DatabaseSearchBackend:
+    """
+    Search the documents with LIKE on any database. Every term must appear
+    in the title or body; hits are not ranked.
+    """
+
+    def documents(self, owner, query, kinds=None):
+        """Return the unordered queryset of ``owner``'s documents matching ``query``."""
+        terms = search_terms(query)
+        if not terms:
+            return SearchDocument.objects.none()
+
+        documents = SearchDocument.objects.filter(owner=owner)
+        for term in terms:
+            documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+        if kinds:
+            documents = documents.filter(kind__in=kinds)
+        return documents
+
+    def search(self, owner, query, kinds=None, limit=20):
+        documents = self.documents(owner, query, kinds).order_by('kind', 'title', 'pk')
+        return list(documents[:limit] if limit else documents)
+
+    def optimize(self):
+        pass
+
+class SQLiteFTSBackend:
+    """
+    Search the FTS5 index created by the core migrations, ranking hits by
+    bm25 with title matches weighted above body matches. Every term is
+    matched as a prefix, so partial words find their rows.
+    """
+    title_weight = 5.0
+
+    def match_expression(self, query):
+        return ' '.join(f'"{term}"*' for term in search_terms(query))
+
+    def documents(self, owner, query, kinds=None):
+        """Return the unordered queryset of ``owner``'s documents matching ``query``."""
+        match = self.match_expression(query)
+        if not match:
+            return SearchDocument.objects.none()
+
+        documents = SearchDocument.objects.filter(
+            owner=owner,
+            id__in=RawSQL('SELECT rowid FROM core_searchindex WHERE core_searchindex MATCH %s', [match])
+        )
+        if kinds:
+            documents = documents.filter(kind__in=kinds)
+        return documents
+
+    def search(self, owner, query, kinds=None, limit=20):
+        match = self.match_expression(query)
+        if not match:
+            return []
+
+        sql = [
+            'SELECT document.*, bm25(core_searchindex, %s, 1.0) AS rank',
+            'FROM core_searchindex',
+            'JOIN core_searchdocument document ON document.id = core_searchindex.rowid',
+            'WHERE core_searchindex MATCH %s AND document.owner_id = %s',
+        ]
+        params = [self.title_weight, match, owner.pk]
+        if kinds:
+            sql.append(f'AND document.kind IN ({", ".join(["%s"] * len(kinds))})')
+            params.extend(kinds)
+        sql.append('ORDER BY rank, document.id')
+        if limit:
+            sql.append('LIMIT %s')
+            params.append(limit)
+        return list(SearchDocument.objects.raw(' '.join(sql), params))
+
+    def optimize(self):
+        """Merge the index segments after a rebuild."""
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO core_searchindex(core_searchindex) VALUES ('optimize')")
+
+def get_search_backend():
+    """Return an instance of the backend named by the SEARCH_BACKEND setting."""
+    return import_string(getattr(settings, 'SEARCH_BACKEND', 'core.search.SQLiteFTSBackend'))()
+
+def search(owner, query, kinds=None, limit=20):
+    """Return the best SearchDocuments of ``owner`` matching ``query``, best first."""
+    return get_search_backend().search(owner, query, kinds=kinds, limit=limit)
+
+def search_object_ids(owner, kind, query):
+    """
+    Return the ids of every row of ``kind`` visible to ``owner`` matching
+    ``query``, as a subquery to filter the rows with.
+    """
+    return get_search_backend().documents(owner, query, kinds=[kind]).values('object_id')
+
+def search_result(document):
+    """Return a search hit as a JSON-serializable dict."""
+    return {
+        'type': document.kind,
+        'id': document.object_id,
+        'title': document.title,
+        'url': reverse(f'{document.kind}_detail', args=[document.object_id]),
+        'rank': getattr(document, 'rank', None),
+    }
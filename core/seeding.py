@@ -0,0 +1,328 @@
+"""
+Synthetic portfolio generator for load testing the rental income manager.
+
+Rows are inserted with ``bulk_create`` one owner at a time, so memory use
+stays bounded by the size of a single portfolio. Model signals and history
+records are skipped; the monthly ledger is rebuilt once at the end.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from properties.models import Property, PropertyType
+from tenants.models import Tenant, Lease
+from tenants.ownership import sync_tenant_ownership
+from payments.models import Payment, PaymentCategory, LateFee
+from expenses.models import Expense, ExpenseCategory, Vendor
+from reports.ledger import rebuild_ledger
+from .search import SEARCH_SOURCES, index_objects
+from .models import Profile
+
+FIRST_NAMES = [
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+    'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Carlos', 'Maria',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+    'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Lee',
+]
+STREETS = ['Oak', 'Maple', 'Cedar', 'Pine', 'Elm', 'Birch', 'Willow', 'Lake', 'Hill', 'Park']
+CITIES = [('Austin', 'TX'), ('Denver', 'CO'), ('Portland', 'OR'), ('Columbus', 'OH'), ('Raleigh', 'NC')]
+PROPERTY_TYPES = ['Apartment', 'House', 'Condo', 'Townhouse']
+EXPENSE_CATEGORIES = ['Repairs', 'Utilities', 'Insurance', 'Property Tax', 'Landscaping', 'Cleaning']
+VENDOR_TRADES = ['Plumbing', 'Electric', 'Roofing', 'Lawn Care', 'Cleaning', 'HVAC']
+PAYMENT_METHODS = ['bank_transfer', 'check', 'zelle', 'venmo', 'cash']
+
+# Outcome of a rent payment that is already due, with its probability
+PAYMENT_OUTCOMES = [
+    ('on_time', 0.80),
+    ('paid_late', 0.11),
+    ('partial', 0.03),
+    ('late', 0.03),
+    ('pending', 0.03),
+]
+
+def _outcome(rng):
+    """Pick a payment outcome according to PAYMENT_OUTCOMES."""
+    roll = rng.random()
+    for outcome, probability in PAYMENT_OUTCOMES:
+        roll -= probability
+        if roll < 0:
+            return outcome
+    return PAYMENT_OUTCOMES[0][0]
+
+def _money(value):
+    return Decimal(value).quantize(Decimal('0.01'))
+
+class PortfolioSeeder:
+    """
+    Bulk-create owners with properties, tenants, leases, payments, late fees,
+    expenses and vendors.
+
+    The same ``seed`` and ``as_of`` date always produce the same data.
+    """
+
+    def __init__(self, properties_per_owner=10, years=3, seed=0, batch_size=1000,
+                 as_of=None, prefix='seed', password=None):
+        self.properties_per_owner = properties_per_owner
+        self.years = years
+        self.batch_size = batch_size
+        self.as_of = as_of or timezone.now().date()
+        self.prefix = prefix
+        self.password = make_password(password)
+        self.rng = random.Random(seed)
+        self.counts = dict.fromkeys(
+            ['owners', 'properties', 'tenants', 'leases', 'payments', 'late_fees', 'expenses', 'vendors'], 0
+        )
+
+    def bulk_create(self, model, rows, name):
+        """Insert ``rows`` in batches and count them under ``name``."""
+        created = model.objects.bulk_create(rows, batch_size=self.batch_size)
+        self.counts[name] += len(created)
+        return created
+
+    def load_lookups(self):
+        """Create the shared property types and categories if missing."""
+        self.property_types = [PropertyType.objects.get_or_create(name=name)[0] for name in PROPERTY_TYPES]
+        self.expense_categories = [ExpenseCategory.objects.get_or_create(name=name)[0] for name in EXPENSE_CATEGORIES]
+        self.rent_category = PaymentCategory.objects.get_or_create(name='Rent')[0]
+
+    def seed(self, owners=10):
+        """Create ``owners`` portfolios and return the number of rows created per model."""
+        self.load_lookups()
+
+        first = User.objects.filter(username__startswith=f'{self.prefix}-owner-').count()
+        for index in range(first, first + owners):
+            with transaction.atomic():
+                self.seed_owner(index)
+
+        owners = User.objects.filter(username__startswith=f'{self.prefix}-owner-')
+        rebuild_ledger(Property.objects.filter(owner__in=owners), batch_size=self.batch_size)
+        self.index_search(owners)
+        return self.counts
+
+    def index_search(self, owners):
+        """Index the seeded rows, which bulk_create kept out of the search signals."""
+        for kind, source in SEARCH_SOURCES.items():
+            object_ids = source['model'].objects.filter(
+                **{f"{source['owner']}__in": owners}
+            ).values_list('pk', flat=True).distinct()
+            index_objects(kind, object_ids, batch_size=self.batch_size)
+
+    def seed_owner(self, index):
+        """Create the portfolio of one owner."""
+        rng = self.rng
+        owner = self.bulk_create(User, [User(
+            username=f'{self.prefix}-owner-{index}',
+            email=f'{self.prefix}-owner-{index}@example.com',
+            first_name=rng.choice(FIRST_NAMES),
+            last_name=rng.choice(LAST_NAMES),
+            password=self.password
+        )], 'owners')[0]
+        # bulk_create skips the post_save handler that creates profiles
+        Profile.objects.create(user=owner)
+
+        vendors = self.bulk_create(Vendor, [
+            Vendor(name=f'{rng.choice(LAST_NAMES)} {trade}', phone=self.phone(), created_by=owner)
+            for trade in rng.sample(VENDOR_TRADES, 4)
+        ], 'vendors')
+
+        properties = []
+        for number in range(self.properties_per_owner):
+            city, state = rng.choice(CITIES)
+            rent = _money(rng.randrange(800, 3500, 25))
+            properties.append(Property(
+                owner=owner,
+                property_type=rng.choice(self.property_types),
+                name=f'{rng.choice(STREETS)} {rng.choice(["Court", "House", "Flats", "Place"])} {index}-{number}',
+                address=f'{rng.randrange(1, 9999)} {rng.choice(STREETS)} St',
+                city=city,
+                state=state,
+                zip_code=f'{rng.randrange(10000, 99999)}',
+                bedrooms=rng.randrange(1, 5),
+                monthly_rent=rent,
+                security_deposit=rent,
+                status='rented',
+                acquisition_price=_money(rent * rng.randrange(120, 200))
+            ))
+        properties = self.bulk_create(Property, properties, 'properties')
+
+        leases = []
+        for rental_property in properties:
+            leases.extend(self.property_leases(owner, rental_property))
+
+        # Tenants first; renewals share the same unsaved Tenant instance
+        tenants = {id(lease.tenant): lease.tenant for lease in leases}
+        self.bulk_create(Tenant, list(tenants.values()), 'tenants')
+        self.bulk_create(Lease, leases, 'leases')
+        # bulk_create skips the lease signals that record tenant ownership
+        sync_tenant_ownership(owner_ids=[owner.pk])
+
+        payments = []
+        for lease in leases:
+            payments.extend(self.lease_payments(owner, lease))
+        payments = self.bulk_create(Payment, payments, 'payments')
+
+        self.bulk_create(LateFee, [
+            LateFee(
+                payment=payment,
+                amount=_money(payment.lease.late_fee),
+                date_applied=payment.due_date + timedelta(days=payment.lease.grace_period + 1),
+                reason='Rent received after the grace period',
+                created_by=owner
+            )
+            for payment in payments
+            if payment.status in ('late', 'paid') and self.is_late(payment)
+        ], 'late_fees')
+
+        expenses = []
+        for rental_property in properties:
+            expenses.extend(self.property_expenses(owner, rental_property, vendors))
+        self.bulk_create(Expense, expenses, 'expenses')
+
+    def phone(self):
+        return f'555-{self.rng.randrange(100, 999)}-{self.rng.randrange(1000, 9999)}'
+
+    def new_tenant(self, owner):
+        first_name = self.rng.choice(FIRST_NAMES)
+        last_name = self.rng.choice(LAST_NAMES)
+        return Tenant(
+            first_name=first_name,
+            last_name=last_name,
+            email=f'{first_name}.{last_name}.{self.rng.randrange(10 ** 6)}@example.com'.lower(),
+            phone=self.phone(),
+            employment_status='Employed',
+            income=_money(self.rng.randrange(30000, 150000, 1000)),
+            created_by=owner
+        )
+
+    def property_leases(self, owner, rental_property):
+        """
+        Return unsaved back-to-back leases covering the seeded history.
+
+        Renewals keep the tenant and sometimes start before the previous
+        lease ends, so leases of a property can overlap.
+        """
+        rng = self.rng
+        start = self.as_of.replace(day=1) - relativedelta(years=self.years) + relativedelta(months=rng.randrange(0, 6))
+        rent = rental_property.monthly_rent
+        tenant = self.new_tenant(owner)
+
+        leases = []
+        while start <= self.as_of:
+            end = start + relativedelta(months=rng.choice([6, 12, 12, 12, 24])) - timedelta(days=1)
+            if end < self.as_of:
+                status = 'completed'
+            elif start > self.as_of:
+                status = 'pending'
+            else:
+                status = 'active'
+
+            leases.append(Lease(
+                rental_property=rental_property,
+                tenant=tenant,
+                start_date=start,
+                end_date=end,
+                rent_amount=rent,
+                security_deposit=rental_property.security_deposit,
+                status=status,
+                payment_day=1,
+                late_fee=_money(rent * Decimal('0.05')),
+                grace_period=5,
+                is_security_deposit_paid=True,
+                created_by=owner,
+                owner=owner
+            ))
+
+            if rng.random() < 0.6:
+                # Renewal, occasionally signed to start before the current term ends
+                leases[-1].status = 'renewed' if status == 'completed' else status
+                rent = _money(rent * Decimal('1.03'))
+                start = end + timedelta(days=1) - timedelta(days=rng.choice([0, 0, 0, 15]))
+            else:
+                # Move-out, a vacancy of up to two months and a new tenant
+                tenant = self.new_tenant(owner)
+                start = end + timedelta(days=1) + relativedelta(months=rng.randrange(0, 3))
+
+        return leases
+
+    def is_late(self, payment):
+        if payment.payment_date is None:
+            return payment.status == 'late'
+        return payment.payment_date > payment.due_date + timedelta(days=payment.lease.grace_period)
+
+    def lease_payments(self, owner, lease):
+        """Return unsaved monthly rent payments for a lease up to next month."""
+        rng = self.rng
+        payments = []
+        horizon = self.as_of + relativedelta(months=1)
+        due_date = lease.start_date.replace(day=lease.payment_day)
+        if due_date < lease.start_date:
+            due_date += relativedelta(months=1)
+
+        while due_date <= min(lease.end_date, horizon):
+            outcome = _outcome(rng) if due_date <= self.as_of else 'upcoming'
+            payment = Payment(
+                rental_property=lease.rental_property,
+                tenant=lease.tenant,
+                lease=lease,
+                category=self.rent_category,
+                amount=lease.rent_amount,
+                due_date=due_date,
+                status='pending',
+                created_by=owner,
+                owner=owner
+            )
+
+            if outcome == 'on_time':
+                payment.status = 'paid'
+                payment.payment_date = due_date - timedelta(days=rng.randrange(0, 4))
+            elif outcome == 'paid_late':
+                payment.status = 'paid'
+                payment.payment_date = due_date + timedelta(days=rng.randrange(6, 25))
+            elif outcome == 'partial':
+                payment.status = 'partial'
+                payment.payment_date = due_date + timedelta(days=rng.randrange(0, 10))
+                payment.amount = _money(lease.rent_amount * Decimal(rng.choice(['0.25', '0.5', '0.75'])))
+            elif outcome == 'late':
+                payment.status = 'late'
+
+            if payment.payment_date and payment.payment_date > self.as_of:
+                payment.payment_date = self.as_of
+            if payment.payment_date:
+                payment.payment_method = rng.choice(PAYMENT_METHODS)
+
+            payments.append(payment)
+            due_date += relativedelta(months=1)
+
+        return payments
+
+    def property_expenses(self, owner, rental_property, vendors):
+        """Return unsaved expenses of a property, zero to three per month."""
+        rng = self.rng
+        expenses = []
+        month = self.as_of.replace(day=1) - relativedelta(years=self.years)
+        while month <= self.as_of:
+            for _ in range(rng.choice([0, 1, 1, 2, 3])):
+                date = month + timedelta(days=rng.randrange(0, 28))
+                if date > self.as_of:
+                    continue
+                expenses.append(Expense(
+                    rental_property=rental_property,
+                    category=rng.choice(self.expense_categories),
+                    vendor=rng.choice(vendors) if rng.random() < 0.7 else None,
+                    amount=_money(rng.randrange(40, 1500)),
+                    date=date,
+                    payment_date=date,
+                    payment_method=rng.choice(PAYMENT_METHODS),
+                    description=rng.choice(['Routine maintenance', 'Repair call', 'Monthly service', 'Supplies']),
+                    status='paid' if rng.random() < 0.92 else 'pending',
+                    created_by=owner,
+                    owner=owner
+                ))
+            month += relativedelta(months=1)
+        return expenses
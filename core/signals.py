@@ -1,10 +1,17 @@
 """
 Signal handlers for the core app.
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.contrib.auth.models import User
 from django.dispatch import receiver
+from properties.models import Property
+from tenants.models import Tenant, Lease
+from tenants.ownership import sync_tenant_ownership
+from payments.models import Payment
+from expenses.models import Expense, Vendor
 from .models import Profile
+from .summary import schedule_summary_invalidation
+from .search import SEARCH_KINDS, index_objects, remove_objects, reindex_property_rows
 
 @receiver(post_save, sender=User)
 def create_profile(sender, instance, created, **kwargs):
@@ -16,3 +23,105 @@ def create_profile(sender, instance, created, **kwargs):
 def save_profile(sender, instance, **kwargs):
     """Save the Profile whenever the User is saved."""
     instance.profile.save()
+
+@receiver(pre_save, sender=Payment)
+@receiver(pre_save, sender=Expense)
+@receiver(pre_save, sender=Lease)
+def copy_property_owner(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Copy the owner of the property onto a payment, expense or lease being saved."""
+    if raw or not instance.rental_property_id:
+        return
+    if update_fields is not None and 'rental_property' not in update_fields:
+        return
+    instance.owner_id = instance.rental_property.owner_id
+
+@receiver(pre_save, sender=Property)
+def remember_property_owner(sender, instance, raw=False, **kwargs):
+    """Note the owner a property had before this save."""
+    instance._previous_owner_id = None
+    if not raw and instance.pk:
+        instance._previous_owner_id = Property.objects.filter(pk=instance.pk).values_list('owner_id', flat=True).first()
+
+@receiver(post_save, sender=Property)
+def move_property_rows(sender, instance, created, raw=False, **kwargs):
+    """Move the leases, payments and expenses of a property that changed owner to the new owner."""
+    previous_owner_id = getattr(instance, '_previous_owner_id', None)
+    if raw or created or previous_owner_id in (None, instance.owner_id):
+        return
+
+    for model in (Lease, Payment, Expense):
+        model.objects.filter(rental_property=instance).update(owner_id=instance.owner_id)
+    sync_tenant_ownership(tenant_ids=Lease.objects.filter(rental_property=instance).values_list('tenant_id', flat=True))
+    schedule_summary_invalidation([previous_owner_id])
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def invalidate_property_owner_summary(sender, instance, raw=False, **kwargs):
+    """Drop the cached summaries of the owner of a changed property."""
+    if not raw:
+        schedule_summary_invalidation([instance.owner_id])
+
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Lease)
+@receiver(post_delete, sender=Payment)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Lease)
+def invalidate_owner_summary(sender, instance, raw=False, **kwargs):
+    """Drop the cached summaries of the owner of a changed payment, expense or lease."""
+    if not raw and instance.owner_id:
+        schedule_summary_invalidation([instance.owner_id])
+
+@receiver(post_save, sender=Property)
+@receiver(post_save, sender=Tenant)
+@receiver(post_save, sender=Vendor)
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Payment)
+def index_search_documents(sender, instance, created=False, raw=False, **kwargs):
+    """Reindex the search documents of a saved row."""
+    if raw:
+        return
+
+    kind = SEARCH_KINDS[sender]
+    # Rows of a property that changed owner move to the new owner's results
+    moved = kind == 'property' and getattr(instance, '_previous_owner_id', None) not in (None, instance.owner_id)
+
+    index_objects(kind, [instance.pk])
+    if moved:
+        reindex_property_rows(instance.pk)
+
+@receiver(post_delete, sender=Property)
+@receiver(post_delete, sender=Tenant)
+@receiver(post_delete, sender=Vendor)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Payment)
+def remove_search_documents(sender, instance, **kwargs):
+    """Drop the search documents of a deleted row."""
+    remove_objects(SEARCH_KINDS[sender], [instance.pk])
+
+@receiver(pre_save, sender=Lease)
+def remember_lease_parties(sender, instance, raw=False, **kwargs):
+    """Note the tenant and owner a lease had before this save."""
+    instance._previous_parties = None
+    if not raw and instance.pk:
+        instance._previous_parties = Lease.objects.filter(pk=instance.pk).values_list('tenant_id', 'owner_id').first()
+
+@receiver(post_save, sender=Lease)
+@receiver(post_delete, sender=Lease)
+def update_tenant_ownership(sender, instance, created=None, raw=False, **kwargs):
+    """Add or drop the tenant ownership rows of a lease that was created, deleted or moved."""
+    if raw:
+        return
+
+    # created is None on delete; updates that keep the tenant and owner change nothing
+    previous = getattr(instance, '_previous_parties', None)
+    if created is False and previous == (instance.tenant_id, instance.owner_id):
+        return
+    sync_tenant_ownership(tenant_ids={instance.tenant_id, previous[0] if previous else None})
+
+@receiver(post_save, sender=Lease)
+@receiver(post_delete, sender=Lease)
+def index_lease_tenant(sender, instance, raw=False, **kwargs):
+    """Reindex a tenant whose leases, and so the owners who see them, changed."""
+    if not raw and instance.tenant_id:
+        index_objects('tenant', [instance.tenant_id])
@@ -0,0 +1,132 @@
+"""
+Cached owner-wide portfolio summaries for the list views.
+
+The totals shown above the payment, expense, tenant, lease and property
+lists do not depend on the page or filters, so they are computed once per
+owner and kept in Django's cache until a payment, expense, lease or
+property of the owner changes (see ``core.signals``). Cache keys include
+the current date so figures relative to today roll over at midnight.
+"""
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum, Count, Q
+from django.utils import timezone
+from properties.models import Property
+from tenants.models import Lease, TenantOwnership
+from payments.models import Payment
+from expenses.models import Expense
+
+def payment_summary(owner, today):
+    """Return the owner's collected, pending, overdue and monthly payment totals."""
+    start_of_month = today.replace(day=1)
+    end_of_month = (start_of_month + relativedelta(months=1)) - timedelta(days=1)
+    overdue = Q(status__in=Payment.OPEN_STATUSES, due_date__lt=today)
+
+    totals = Payment.objects.filter(owner=owner).aggregate(
+        total_collected=Sum('amount', filter=Q(status='paid')),
+        pending_amount=Sum('amount', filter=Q(status__in=Payment.OPEN_STATUSES)),
+        overdue_payments=Count('id', filter=overdue),
+        overdue_amount=Sum('amount', filter=overdue),
+        month_income=Sum('amount', filter=Q(status='paid', payment_date__range=[start_of_month, end_of_month]))
+    )
+    return {name: value or 0 for name, value in totals.items()}
+
+def expense_summary(owner, today):
+    """Return the owner's paid expense total and its breakdown by category."""
+    expenses = Expense.objects.filter(owner=owner, status='paid')
+    return {
+        'total_expenses': expenses.aggregate(total=Sum('amount'))['total'] or 0,
+        'expenses_by_category': list(
+            expenses.values('category__name').annotate(total=Sum('amount')).order_by('-total')
+        ),
+    }
+
+def tenant_summary(owner, today):
+    """Return the owner's tenant counts and leases expiring in 30 days."""
+    return {
+        'total_tenants': TenantOwnership.objects.filter(owner=owner).count(),
+        'active_tenants': TenantOwnership.objects.filter(
+            owner=owner,
+            tenant__in=Lease.objects.filter(owner=owner, status='active').values('tenant')
+        ).count(),
+        'expiring_leases': Lease.objects.filter(
+            owner=owner,
+            status='active',
+            end_date__range=[today, today + timedelta(days=30)]
+        ).count(),
+    }
+
+def lease_summary(owner, today):
+    """Return the owner's active, expiring and recently started leases and their rent."""
+    # advance_leases keeps 'active' limited to leases running today
+    running = Q(status='active')
+    totals = Lease.objects.filter(owner=owner).aggregate(
+        active_leases=Count('id', filter=running),
+        expiring_soon=Count('id', filter=Q(status='active', end_date__range=[today, today + timedelta(days=30)])),
+        recently_started=Count('id', filter=Q(start_date__range=[today - timedelta(days=30), today])),
+        monthly_rent=Sum('rent_amount', filter=running)
+    )
+    totals['monthly_rent'] = totals['monthly_rent'] or 0
+    return totals
+
+def property_summary(owner, today):
+    """Return the owner's property counts, rent roll and cities."""
+    properties = Property.objects.filter(owner=owner)
+    totals = properties.aggregate(
+        rented_count=Count('id', filter=Q(status='rented')),
+        available_count=Count('id', filter=Q(status='available')),
+        monthly_income=Sum('monthly_rent', filter=Q(status='rented'))
+    )
+    totals['monthly_income'] = totals['monthly_income'] or 0
+    totals['cities'] = list(properties.values_list('city', flat=True).distinct().order_by('city'))
+    return totals
+
+SUMMARY_BUILDERS = {
+    'payments': payment_summary,
+    'expenses': expense_summary,
+    'tenants': tenant_summary,
+    'leases': lease_summary,
+    'properties': property_summary,
+}
+
+def summary_cache_key(owner_id, section, today):
+    """Return the cache key of one summary section of an owner."""
+    return f'owner-summary:{owner_id}:{section}:{today.isoformat()}'
+
+def get_owner_summary(owner, section):
+    """Return a summary section of ``owner``, from the cache when possible."""
+    today = timezone.now().date()
+    key = summary_cache_key(owner.pk, section, today)
+
+    summary = cache.get(key)
+    if summary is None:
+        summary = SUMMARY_BUILDERS[section](owner, today)
+        cache.set(key, summary, getattr(settings, 'OWNER_SUMMARY_CACHE_TIMEOUT', 15 * 60))
+    return summary
+
+def invalidate_owner_summaries(owner_ids):
+    """Drop the cached summaries of the given owners."""
+    today = timezone.now().date()
+    cache.delete_many([
+        summary_cache_key(owner_id, section, today)
+        for owner_id in set(owner_ids) if owner_id is not None
+        for section in SUMMARY_BUILDERS
+    ])
+
+def schedule_summary_invalidation(owner_ids):
+    """
+    Drop the cached summaries of the given owners now and again once the
+    current transaction commits, so a summary cached from uncommitted or
+    not yet visible data does not survive the change.
+    """
+    owner_ids = set(owner_ids)
+    if owner_ids:
+        invalidate_owner_summaries(owner_ids)
+        transaction.on_commit(lambda: invalidate_owner_summaries(owner_ids))
+
+def property_owner_ids(properties):
+    """Return the owner ids of ``properties`` (a queryset or list of ids)."""
+    return set(Property.objects.filter(pk__in=properties).values_list('owner_id', flat=True))
@@ -0,0 +1,1138 @@
+"""
+Tests for the core app.
+"""
+import csv
+import json
+import tempfile
+from io import BytesIO, StringIO
+from django.test import TestCase, Client, override_settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.db.models import Sum, Count, F
+from django.contrib.auth.models import User
+from datetime import date, datetime
+from openpyxl import Workbook
+from decimal import Decimal
+from properties.models import Property, PropertyType
+from tenants.models import Tenant, Lease
+from payments.models import Payment, PaymentCategory
+from expenses.models import Expense, ExpenseCategory, Vendor
+from reports.models import MonthlyPropertyLedger
+from properties.owners import backfill_owners
+from payments.recurring import generate_rent_roll
+from .benchmarks import (
+    seed_benchmark_data, benchmark_urls, measure, baseline_results, find_regressions
+)
+from .middleware import QueryTimer
+from .summary import get_owner_summary
+from .rollups import monthly_rollup
+from .pagination import KeysetPaginator, encode_cursor
+from .models import SearchDocument
+from .search import search, rebuild_search_index, search_object_ids
+from .imports import import_file
+from . import imports
+from . import pagination
+
+class MonthlyRollupTests(TestCase):
+    """Tests for the monthly income and expense rollup."""
+
+    def setUp(self):
+        # Create a user
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+
+        # Create a property
+        self.property = Property.objects.create(
+            owner=self.user,
+            property_type=PropertyType.objects.create(name='Apartment'),
+            name='Test Property',
+            address='123 Test St',
+            city='Test City',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00')
+        )
+
+        # Create a tenant
+        self.tenant = Tenant.objects.create(
+            first_name='John',
+            last_name='Doe',
+            phone='555-123-4567',
+            created_by=self.user
+        )
+
+        # Two payments in March, one in June, one in the following year
+        with self.captureOnCommitCallbacks(execute=True):
+            for payment_date, amount in [
+                (date(2024, 3, 1), '1000.00'),
+                (date(2024, 3, 20), '50.00'),
+                (date(2024, 6, 1), '1000.00'),
+                (date(2025, 1, 1), '1000.00'),
+            ]:
+                Payment.objects.create(
+                    rental_property=self.property,
+                    tenant=self.tenant,
+                    amount=Decimal(amount),
+                    due_date=payment_date,
+                    payment_date=payment_date,
+                    status='paid',
+                    created_by=self.user
+                )
+
+            Expense.objects.create(
+                rental_property=self.property,
+                amount=Decimal('300.00'),
+                date=date(2024, 3, 15),
+                description='Plumbing repair',
+                status='paid',
+                created_by=self.user
+            )
+
+    def test_monthly_totals(self):
+        """Test that payments and expenses are bucketed per month."""
+        rollup = monthly_rollup(self.user, year=2024, as_of=date(2024, 12, 31))
+
+        self.assertEqual(len(rollup['months']), 12)
+        march = rollup['months'][2]
+        self.assertEqual(march['month'], date(2024, 3, 1))
+        self.assertEqual(march['income'], Decimal('1050.00'))
+        self.assertEqual(march['expenses'], Decimal('300.00'))
+        self.assertEqual(march['net'], Decimal('750.00'))
+        self.assertEqual(rollup['months'][5]['income'], Decimal('1000.00'))
+        self.assertEqual(rollup['months'][0]['income'], 0)
+
+    def test_year_to_date_totals(self):
+        """Test that year-to-date totals stop at the month of the as_of date."""
+        rollup = monthly_rollup(self.user, year=2024, as_of=date(2024, 3, 10))
+
+        self.assertEqual(rollup['income_to_date'], Decimal('1050.00'))
+        self.assertEqual(rollup['expenses_to_date'], Decimal('300.00'))
+        self.assertEqual(rollup['net_to_date'], Decimal('750.00'))
+
+    def test_rollup_query_count(self):
+        """Test that the rollup reads the ledger in a single query."""
+        with self.assertNumQueries(1):
+            monthly_rollup(self.user, year=2024)
+
+    def test_rollup_scoped_to_owner(self):
+        """Test that other owners' payments are not included."""
+        other_user = User.objects.create_user(username='other', password='testpassword')
+        rollup = monthly_rollup(other_user, year=2024)
+
+        self.assertTrue(all(month['income'] == 0 for month in rollup['months']))
+
+class DashboardViewTests(TestCase):
+    """Tests for the dashboard view."""
+
+    def setUp(self):
+        # Create a user and login
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+
+    def test_dashboard_chart_data(self):
+        """Test that the dashboard passes real monthly figures to the chart."""
+        response = self.client.get(reverse('dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.context['monthly_income']), [0.0] * 12)
+        self.assertEqual(json.loads(response.context['monthly_net']), [0.0] * 12)
+
+class BenchmarkIndexesCommandTests(TestCase):
+    """Tests for the benchmark_indexes management command."""
+
+    def test_reports_plans_and_rolls_back(self):
+        """Test that plans use the composite indexes and the dataset is discarded."""
+        out = StringIO()
+        call_command('benchmark_indexes', owners=1, properties=2, years=1, repeat=1, stdout=out)
+
+        output = out.getvalue()
+        self.assertRegex(output, r'Seeded \d+ payments, \d+ expenses and \d+ leases')
+        self.assertIn('payment_owner_status_paid_idx', output)
+        self.assertIn('expense_owner_status_date_idx', output)
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(User.objects.exists())
+
+        # The dropped indexes are restored by the rollback
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Payment._meta.db_table)
+        self.assertIn('payment_status_due_idx', constraints)
+
+class SeedPortfolioCommandTests(TestCase):
+    """Tests for the seed_portfolio management command."""
+
+    def seed(self, prefix):
+        out = StringIO()
+        call_command('seed_portfolio', owners=2, properties=3, years=1, seed=7, as_of='2024-06-30',
+                     prefix=prefix, stdout=out)
+        return out.getvalue()
+
+    def payment_summary(self, prefix):
+        return list(Payment.objects.filter(
+            rental_property__owner__username__startswith=prefix
+        ).values('status').annotate(total=Sum('amount'), count=Count('id')).order_by('status'))
+
+    def test_creates_portfolios(self):
+        """Test that owners get properties, leases, payments and expenses."""
+        output = self.seed('seed')
+
+        self.assertIn('Created 2 owners, 6 properties', output)
+        self.assertEqual(User.objects.filter(username__startswith='seed-owner-').count(), 2)
+        self.assertFalse(User.objects.get(username='seed-owner-0').has_usable_password())
+        self.assertTrue(Payment.objects.filter(status='paid').exists())
+        self.assertTrue(Expense.objects.exists())
+        self.assertFalse(Payment.objects.filter(payment_date__gt=date(2024, 6, 30)).exists())
+
+    def test_rebuilds_ledger(self):
+        """Test that the bulk-created rows are reflected in the ledger."""
+        self.seed('seed')
+
+        paid = Payment.objects.filter(status='paid').aggregate(total=Sum('amount'))['total']
+        self.assertEqual(MonthlyPropertyLedger.objects.aggregate(total=Sum('income'))['total'], paid)
+
+    def test_indexes_search(self):
+        """Test that the bulk-created rows can be searched."""
+        self.seed('seed')
+
+        owner = User.objects.get(username='seed-owner-0')
+        tenant = Tenant.objects.filter(ownerships__owner=owner).first()
+        self.assertIn(tenant, Tenant.objects.filter(pk__in=search_object_ids(owner, 'tenant', tenant.last_name)))
+        self.assertTrue(SearchDocument.objects.filter(owner=owner, kind='property').exists())
+
+    def test_is_deterministic(self):
+        """Test that the same seed produces the same data."""
+        self.seed('first')
+        self.seed('second')
+
+        self.assertEqual(self.payment_summary('first'), self.payment_summary('second'))
+
+class BenchmarkHarnessTests(TestCase):
+    """Tests for the view benchmark harness."""
+
+    def test_benchmark_urls_use_owner_objects(self):
+        """Test that URL arguments are filled with the owner's objects."""
+        owner = seed_benchmark_data()
+        urls = dict(benchmark_urls(owner))
+        payment = Payment.objects.filter(rental_property__owner=owner).order_by('pk').first()
+
+        self.assertEqual(urls['payment_list'], reverse('payment_list'))
+        self.assertEqual(urls['payment_detail'], reverse('payment_detail', args=[payment.pk]))
+        self.assertEqual(urls['dashboard'], reverse('dashboard'))
+        self.assertIsNone(urls['delete_property_image'])
+        self.assertNotIn('mark_payment_as_paid', urls)
+
+    def test_find_regressions(self):
+        """Test that status changes and extra queries are reported, but not timings."""
+        baseline = {
+            'payment_list': {'status': 200, 'url': '/payments/', 'queries': 10},
+            'dashboard': {'status': 200, 'url': '/', 'queries': 5},
+            'expense_detail': {'status': 200, 'url': '/expenses/1/', 'queries': 5},
+        }
+        results = {
+            'payment_list': {'status': 200, 'queries': 11, 'sql_time': 40.0, 'wall_time': 60.0, 'peak_memory': 1000},
+            'dashboard': {'status': 200, 'queries': 5, 'sql_time': 300.0, 'wall_time': 900.0, 'peak_memory': 10 ** 9},
+            'expense_list': {'status': 200, 'queries': 50, 'sql_time': 1.0, 'wall_time': 1.0, 'peak_memory': 1},
+            'expense_detail': {'status': 500},
+            'lease_list': {'status': 500},
+        }
+
+        self.assertEqual(find_regressions(results, baseline), [
+            'expense_detail: status 500 (baseline 200)',
+            'payment_list: 11 queries (baseline 10)',
+        ])
+
+    def test_baseline_keeps_query_counts_of_successful_views(self):
+        """Test that timings and failing views are left out of the baseline."""
+        results = {
+            'payment_list': {'status': 200, 'url': '/payments/', 'queries': 8, 'sql_time': 1.5,
+                             'wall_time': 30.0, 'peak_memory': 1000},
+            'lease_list': {'status': 500, 'url': '/tenants/leases/'},
+            'delete_property_image': {'skipped': 'no sample object for the URL arguments'},
+        }
+
+        self.assertEqual(baseline_results(results), {
+            'payment_list': {'status': 200, 'url': '/payments/', 'queries': 8},
+        })
+
+    def test_failing_views_are_not_measured(self):
+        """Test that views answering with an error are recorded by status only."""
+        owner = seed_benchmark_data()
+        client = Client(raise_request_exception=False)
+        client.force_login(owner)
+
+        self.assertEqual(measure(client, '/no-such-page/'), {'status': 404})
+
+class QueryInstrumentationMiddlewareTests(TestCase):
+    """Tests for the per-request SQL and timing middleware."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+
+    @override_settings(QUERY_INSTRUMENTATION_ENABLED=True, QUERY_INSTRUMENTATION_SAMPLE_RATE=1.0)
+    def test_instrumented_request(self):
+        """Test that sampled requests get a Server-Timing header and a log line."""
+        with self.assertLogs('core.instrumentation', 'INFO') as logs:
+            response = self.client.get(reverse('dashboard'))
+
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+        record = logs.records[0]
+        self.assertEqual(record.view, 'dashboard')
+        self.assertEqual(record.status, 200)
+        self.assertGreater(record.queries, 0)
+
+    @override_settings(QUERY_INSTRUMENTATION_ENABLED=True, QUERY_INSTRUMENTATION_SAMPLE_RATE=1.0)
+    def test_streaming_response(self):
+        """Test that a streamed body is measured until the response is closed."""
+        with self.assertLogs('core.instrumentation', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(reverse('export_payments'))
+                self.assertEqual(logs.records, [])
+                b''.join(response.streaming_content)
+
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(logs.records[0].view, 'export_payments')
+        self.assertEqual(logs.records[0].queries, len(context))
+
+    @override_settings(QUERY_INSTRUMENTATION_ENABLED=True, QUERY_INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_request(self):
+        """Test that requests outside the sample are not instrumented."""
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_disabled(self):
+        """Test that the middleware is skipped unless enabled."""
+        response = self.client.get(reverse('dashboard'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_repeated_queries(self):
+        """Test that SQL run past the threshold is reported as repeated."""
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            for pk in range(3):
+                list(User.objects.filter(pk=pk))
+            list(Property.objects.all())
+
+        self.assertEqual(len(timer.queries), 4)
+        repeated = timer.repeated_queries(threshold=3)
+        self.assertEqual(len(repeated), 1)
+        self.assertIn('auth_user', repeated[0][0])
+        self.assertEqual(repeated[0][1], 3)
+
+class OwnerSummaryCacheTests(TestCase):
+    """Tests for the cached owner summaries of the list views."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+
+        self.property = Property.objects.create(
+            owner=self.user,
+            property_type=PropertyType.objects.create(name='Apartment'),
+            name='Test Property',
+            address='123 Test St',
+            city='Test City',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00'),
+            status='rented'
+        )
+        self.tenant = Tenant.objects.create(
+            first_name='John',
+            last_name='Doe',
+            phone='555-123-4567',
+            created_by=self.user
+        )
+
+    def create_payment(self, amount):
+        return Payment.objects.create(
+            rental_property=self.property,
+            tenant=self.tenant,
+            amount=Decimal(amount),
+            due_date=date(2024, 3, 1),
+            payment_date=date(2024, 3, 1),
+            status='paid',
+            created_by=self.user
+        )
+
+    def test_summary_is_cached(self):
+        """Test that a summary is only computed once."""
+        self.create_payment('1000.00')
+        summary = get_owner_summary(self.user, 'payments')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_owner_summary(self.user, 'payments'), summary)
+        self.assertEqual(summary['total_collected'], Decimal('1000.00'))
+
+    def test_changes_invalidate_summary(self):
+        """Test that saving or deleting an owner's rows drops the cached summary."""
+        payment = self.create_payment('1000.00')
+        get_owner_summary(self.user, 'payments')
+        get_owner_summary(self.user, 'properties')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_payment('500.00')
+        self.assertEqual(get_owner_summary(self.user, 'payments')['total_collected'], Decimal('1500.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.delete()
+        self.assertEqual(get_owner_summary(self.user, 'payments')['total_collected'], Decimal('500.00'))
+
+        self.property.status = 'available'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.save()
+        self.assertEqual(get_owner_summary(self.user, 'properties')['available_count'], 1)
+
+    def test_list_pages_share_summary(self):
+        """Test that paginating a list does not recompute the owner totals."""
+        for _ in range(20):
+            self.create_payment('100.00')
+
+        response = self.client.get(reverse('payment_list'))
+        self.assertEqual(response.context['total_collected'], Decimal('2000.00'))
+        cursor = response.context['page_obj'].next_cursor
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('payment_list'), {'cursor': cursor})
+        self.assertEqual(response.context['total_collected'], Decimal('2000.00'))
+        self.assertFalse(any('SUM' in query['sql'] for query in queries))
+
+class KeysetPaginatorTests(TestCase):
+    """Tests for keyset pagination of the list views."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+
+        self.property = Property.objects.create(
+            owner=self.user,
+            property_type=PropertyType.objects.create(name='Apartment'),
+            name='Test Property',
+            address='123 Test St',
+            city='Test City',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00'),
+            status='rented'
+        )
+        self.tenant = Tenant.objects.create(
+            first_name='John',
+            last_name='Doe',
+            phone='555-123-4567',
+            created_by=self.user
+        )
+
+        # Repeated due dates and unpaid rows exercise the id tie-break and NULLs
+        for day in range(1, 24):
+            Payment.objects.create(
+                rental_property=self.property,
+                tenant=self.tenant,
+                amount=Decimal('100.00'),
+                due_date=date(2024, 3, day // 3 + 1),
+                payment_date=date(2024, 3, day // 2 + 1) if day % 4 else None,
+                status='paid' if day % 4 else 'pending',
+                created_by=self.user
+            )
+
+    def walk(self, ordering):
+        """Page forward then back through all payments; return both id sequences."""
+        paginator = KeysetPaginator(Payment.objects.order_by(ordering), 5, count=None)
+
+        forward, pages = [], []
+        page = paginator.page()
+        while True:
+            pages.append(page)
+            forward.extend(payment.pk for payment in page)
+            if not page.has_next():
+                break
+            page = paginator.page(page.next_cursor)
+
+        backward = [payment.pk for payment in page][::-1]
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            backward.extend(payment.pk for payment in reversed(page.object_list))
+        return forward, backward[::-1], pages
+
+    def test_pages_cover_every_row_once(self):
+        """Test that paging either way visits every row once, in order."""
+        for ordering in ('-due_date', 'due_date', 'amount', '-payment_date', 'payment_date'):
+            expected = list(Payment.objects.order_by(ordering, 'pk').values_list('pk', flat=True))
+            forward, backward, pages = self.walk(ordering)
+
+            self.assertEqual(sorted(forward), sorted(expected), ordering)
+            self.assertEqual(len(forward), len(set(forward)), ordering)
+            self.assertEqual(backward, forward, ordering)
+            self.assertFalse(pages[0].has_previous())
+
+    def test_nulls_are_listed_last(self):
+        """Test that rows without a sort value follow the others in both directions."""
+        for ordering in ('payment_date', '-payment_date'):
+            forward, _backward, _pages = self.walk(ordering)
+            paid = set(Payment.objects.filter(payment_date__isnull=False).values_list('pk', flat=True))
+            self.assertEqual(set(forward[:len(paid)]), paid, ordering)
+
+    def test_page_query_has_no_offset(self):
+        """Test that deep pages are selected without OFFSET or COUNT."""
+        paginator = KeysetPaginator(Payment.objects.order_by('-due_date'), 5, count=None)
+        cursor = paginator.page().next_cursor
+
+        with CaptureQueriesContext(connection) as queries:
+            list(paginator.page(cursor))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+        self.assertNotIn('COUNT', queries[0]['sql'])
+
+    def test_approximate_count(self):
+        """Test that approximate counts stop at the limit."""
+        queryset = Payment.objects.order_by('-due_date')
+        self.assertEqual(KeysetPaginator(queryset, 5).count, 23)
+        self.assertTrue(KeysetPaginator(queryset, 5).count_is_exact)
+
+        limit = pagination.APPROXIMATE_COUNT_LIMIT
+        pagination.APPROXIMATE_COUNT_LIMIT = 10
+        try:
+            paginator = KeysetPaginator(queryset, 5)
+            self.assertEqual(paginator.count, 10)
+            self.assertFalse(paginator.count_is_exact)
+            self.assertEqual(KeysetPaginator(queryset, 5, count='exact').count, 23)
+        finally:
+            pagination.APPROXIMATE_COUNT_LIMIT = limit
+
+    def test_payment_list_cursor(self):
+        """Test that the payment list follows its cursors and keeps the filters."""
+        response = self.client.get(reverse('payment_list'), {'status': 'paid', 'sort_by': 'due_date'})
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertTrue(page.has_next())
+        self.assertContains(response, f'sort_by=due_date&cursor={page.next_cursor}')
+
+        response = self.client.get(reverse('payment_list'), {
+            'status': 'paid', 'sort_by': 'due_date', 'cursor': page.next_cursor
+        })
+        self.assertEqual(response.status_code, 200)
+        second = response.context['page_obj']
+        self.assertTrue(second.has_previous())
+        self.assertFalse(set(second.object_list) & set(page.object_list))
+        self.assertTrue(all(payment.status == 'paid' for payment in second))
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is a 404, not a server error."""
+        for cursor in ('not-a-cursor', encode_cursor('2024-03-01', 'x', 'next'), encode_cursor('x', 1, 'sideways')):
+            response = self.client.get(reverse('payment_list'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+
+class SearchIndexTests(TestCase):
+    """Tests for the owner-scoped full-text search."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.other = User.objects.create_user(username='otheruser', password='testpassword')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+
+        property_type = PropertyType.objects.create(name='Apartment')
+        self.property = self.create_property(self.user, 'Maple Court', property_type)
+        self.other_property = self.create_property(self.other, 'Maple Gardens', property_type)
+
+        self.tenant = Tenant.objects.create(
+            first_name='Jonathan',
+            last_name='Whitaker',
+            email='jwhitaker@example.com',
+            phone='555-123-4567',
+            created_by=self.user
+        )
+        self.lease = Lease.objects.create(
+            rental_property=self.property,
+            tenant=self.tenant,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            rent_amount=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00'),
+            status='active',
+            created_by=self.user
+        )
+
+    def create_property(self, owner, name, property_type):
+        return Property.objects.create(
+            owner=owner,
+            property_type=property_type,
+            name=name,
+            address='123 Test St',
+            city='Springfield',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00')
+        )
+
+    def create_payment(self, reference_number=None, rental_property=None):
+        return Payment.objects.create(
+            rental_property=rental_property or self.property,
+            tenant=self.tenant,
+            amount=Decimal('1000.00'),
+            due_date=date(2024, 3, 1),
+            reference_number=reference_number,
+            status='pending',
+            created_by=self.user
+        )
+
+    def hits(self, query, owner=None, **kwargs):
+        return [(document.kind, document.object_id) for document in search(owner or self.user, query, **kwargs)]
+
+    def test_search_is_owner_scoped(self):
+        """Test that owners only find their own rows."""
+        self.assertEqual(self.hits('maple'), [('property', self.property.pk)])
+        self.assertEqual(self.hits('maple', owner=self.other), [('property', self.other_property.pk)])
+        self.assertEqual(self.hits('whitaker', owner=self.other), [])
+
+    def test_search_across_models(self):
+        """Test that one query finds tenants, vendors, expenses and payments by prefix."""
+        vendor = Vendor.objects.create(name='Whitaker Plumbing', created_by=self.user)
+        expense = Expense.objects.create(
+            rental_property=self.property,
+            amount=Decimal('300.00'),
+            date=date(2024, 3, 15),
+            description='Boiler service by Whitaker',
+            status='paid',
+            created_by=self.user
+        )
+        payment = self.create_payment('CHK-88231')
+        self.create_payment()
+
+        with self.assertNumQueries(1):
+            hits = self.hits('whit')
+        self.assertEqual(set(hits), {
+            ('tenant', self.tenant.pk), ('vendor', vendor.pk), ('expense', expense.pk)
+        })
+
+        # Title matches rank above body matches
+        referred = Vendor.objects.create(name='Acme Heating', notes='Referred by Whitaker', created_by=self.user)
+        self.assertEqual(self.hits('whitaker', kinds=['vendor']), [('vendor', vendor.pk), ('vendor', referred.pk)])
+
+        self.assertEqual(self.hits('88231'), [('payment', payment.pk)])
+        self.assertEqual(self.hits('555 123'), [('tenant', self.tenant.pk)])
+        # Generated payments without a reference are not indexed
+        self.assertFalse(SearchDocument.objects.filter(kind='payment', title__startswith='Payment due').exists())
+
+    def test_index_follows_changes(self):
+        """Test that saving and deleting rows updates the index."""
+        payment = self.create_payment('CHK-100')
+        payment.reference_number = 'WIRE-200'
+        payment.save()
+        self.assertEqual(self.hits('chk'), [])
+        self.assertEqual(self.hits('wire'), [('payment', payment.pk)])
+
+        payment.delete()
+        self.assertEqual(self.hits('wire'), [])
+
+        # Tenants are visible to the owners they lease from
+        self.lease.delete()
+        self.assertEqual(self.hits('whitaker'), [])
+        Lease.objects.create(
+            rental_property=self.other_property,
+            tenant=self.tenant,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            rent_amount=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00'),
+            created_by=self.other
+        )
+        self.assertEqual(self.hits('whitaker', owner=self.other), [('tenant', self.tenant.pk)])
+
+    def test_property_owner_change_moves_rows(self):
+        """Test that a property's rows follow it to a new owner."""
+        payment = self.create_payment('CHK-300')
+        self.property.owner = self.other
+        self.property.save()
+
+        self.assertEqual(self.hits('chk'), [])
+        self.assertEqual(self.hits('chk', owner=self.other), [('payment', payment.pk)])
+
+    def test_rebuild(self):
+        """Test that the rebuild command restores rows written without signals."""
+        payment = self.create_payment('CHK-400')
+        SearchDocument.objects.all().delete()
+        self.assertEqual(self.hits('maple'), [])
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('2 property documents', out.getvalue())
+        self.assertEqual(self.hits('chk'), [('payment', payment.pk)])
+        self.assertEqual(rebuild_search_index()['tenant'], 1)
+
+    @override_settings(SEARCH_BACKEND='core.search.DatabaseSearchBackend')
+    def test_database_backend(self):
+        """Test that the LIKE backend finds the same rows."""
+        self.assertEqual(self.hits('maple court'), [('property', self.property.pk)])
+        self.assertEqual(self.hits('whitaker', owner=self.other), [])
+        response = self.client.get(reverse('tenant_list'), {'search': 'jonath'})
+        self.assertEqual(list(response.context['tenants']), [self.tenant])
+
+    def test_search_view(self):
+        """Test the JSON search endpoint."""
+        response = self.client.get(reverse('search'), {'q': 'maple'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['url'], reverse('property_detail', args=[self.property.pk]))
+
+        response = self.client.get(reverse('search'), {'q': 'whitaker', 'type': 'property'})
+        self.assertEqual(response.json()['results'], [])
+        self.assertEqual(self.client.get(reverse('search'), {'q': '"*'}).json()['results'], [])
+
+    def test_tenant_list_search(self):
+        """Test that the tenant list searches the index."""
+        response = self.client.get(reverse('tenant_list'), {'search': 'jonath'})
+        self.assertEqual(list(response.context['tenants']), [self.tenant])
+
+        response = self.client.get(reverse('tenant_list'), {'search': 'nobody'})
+        self.assertEqual(list(response.context['tenants']), [])
+
+class APITests(TestCase):
+    """Tests for the owner-scoped JSON API."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.other = User.objects.create_user(username='otheruser', password='testpassword')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+
+        property_type = PropertyType.objects.create(name='Apartment')
+        self.property = Property.objects.create(
+            owner=self.user,
+            property_type=property_type,
+            name='Test Property',
+            address='123 Test St',
+            city='Test City',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00')
+        )
+        self.other_property = Property.objects.create(
+            owner=self.other,
+            property_type=property_type,
+            name='Other Property',
+            address='456 Other St',
+            city='Test City',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00')
+        )
+        self.tenant = Tenant.objects.create(
+            first_name='John',
+            last_name='Doe',
+            phone='555-123-4567',
+            created_by=self.user
+        )
+        self.category = PaymentCategory.objects.create(name='Rent')
+
+    def payment_data(self, month, **kwargs):
+        return dict({
+            'rental_property': self.property.pk,
+            'tenant': self.tenant.pk,
+            'category': self.category.pk,
+            'amount': '1000.00',
+            'due_date': f'2024-{month:02d}-01',
+            'status': 'pending',
+        }, **kwargs)
+
+    def send(self, method, url, data):
+        return getattr(self.client, method)(url, json.dumps(data), content_type='application/json')
+
+    def test_requires_login(self):
+        """Test that anonymous requests are refused."""
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('payment-list')).status_code, 403)
+
+    def test_list_is_owner_scoped_and_cursor_paginated(self):
+        """Test that lists only hold the owner's rows and page by cursor."""
+        response = self.send('post', reverse('payment-bulk'), [self.payment_data(month) for month in range(1, 13)])
+        self.assertEqual(response.status_code, 201)
+        Payment.objects.create(
+            rental_property=self.other_property,
+            tenant=self.tenant,
+            amount=Decimal('500.00'),
+            due_date=date(2024, 1, 1),
+            created_by=self.other
+        )
+
+        response = self.client.get(reverse('payment-list'), {'page_size': 5})
+        data = response.json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertIn('cursor=', data['next'])
+
+        seen = [row['id'] for row in data['results']]
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            seen.extend(row['id'] for row in data['results'])
+        self.assertEqual(sorted(seen), sorted(Payment.objects.filter(rental_property=self.property).values_list('pk', flat=True)))
+
+        response = self.client.get(reverse('property-list'))
+        self.assertEqual([row['name'] for row in response.json()['results']], ['Test Property'])
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        """Test that related names and late fees are loaded in bulk."""
+        self.send('post', reverse('payment-bulk'), [self.payment_data(1)])
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('payment-list'))
+
+        self.send('post', reverse('payment-bulk'), [self.payment_data(month) for month in range(2, 13)])
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(reverse('payment-list'))
+        # Inserts are split to fit SQLite's parameter limit, but lookups are not repeated
+        few_selects, many_selects = (
+            [query for query in context.captured_queries if query['sql'].startswith('SELECT')]
+            for context in (few, many)
+        )
+        self.assertEqual(len(many_selects), len(few_selects))
+
+    def test_sparse_fieldsets(self):
+        """Test that ?fields= limits the fields returned."""
+        response = self.client.get(reverse('property-detail', args=[self.property.pk]), {'fields': 'name,city'})
+        self.assertEqual(response.json(), {'id': self.property.pk, 'name': 'Test Property', 'city': 'Test City'})
+
+    def test_create_is_owner_scoped(self):
+        """Test that rows are created for the user and only reference their rows."""
+        response = self.send('post', reverse('payment-list'), self.payment_data(1))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Payment.objects.get(pk=response.json()['id']).created_by, self.user)
+
+        response = self.send('post', reverse('payment-list'), self.payment_data(1, rental_property=self.other_property.pk))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('rental_property', response.json())
+
+    def test_bulk_create(self):
+        """Test that bulk creation costs the same queries for any number of rows."""
+        with CaptureQueriesContext(connection) as few:
+            self.send('post', reverse('payment-bulk'), [self.payment_data(1, reference_number='CHK-1')])
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as many:
+                response = self.send('post', reverse('payment-bulk'), [
+                    self.payment_data(month, reference_number=f'CHK-{month}') for month in range(2, 13)
+                ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()), 11)
+        # Inserts are split to fit SQLite's parameter limit, but lookups are not repeated
+        few_selects, many_selects = (
+            [query for query in context.captured_queries if query['sql'].startswith('SELECT')]
+            for context in (few, many)
+        )
+        self.assertEqual(len(many_selects), len(few_selects))
+
+        self.assertEqual(Payment.objects.filter(created_by=self.user).count(), 12)
+        self.assertEqual(Payment.history.count(), 12)
+        self.assertEqual(len(search(self.user, 'chk', kinds=['payment'], limit=None)), 12)
+        self.assertTrue(MonthlyPropertyLedger.objects.filter(rental_property=self.property, month=date(2024, 12, 1)).exists())
+
+        response = self.send('post', reverse('payment-bulk'), [
+            self.payment_data(1), self.payment_data(2, tenant=999999)
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()[0], {})
+        self.assertIn('tenant', response.json()[1])
+
+    def test_bulk_update(self):
+        """Test that bulk updates apply partial changes to the owner's rows only."""
+        rows = self.send('post', reverse('payment-bulk'), [self.payment_data(month) for month in range(1, 4)]).json()
+
+        response = self.send('patch', reverse('payment-bulk'), [
+            {'id': row['id'], 'status': 'paid', 'payment_date': '2024-05-02'} for row in rows
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(Payment.objects.values_list('status', flat=True)), {'paid'})
+        self.assertEqual(Payment.history.filter(history_type='~').count(), 3)
+
+        other_payment = Payment.objects.create(
+            rental_property=self.other_property,
+            tenant=self.tenant,
+            amount=Decimal('500.00'),
+            created_by=self.other
+        )
+        response = self.send('patch', reverse('payment-bulk'), [{'id': other_payment.pk, 'status': 'paid'}])
+        self.assertEqual(response.status_code, 400)
+        response = self.send('patch', reverse('payment-bulk'), [
+            {'id': rows[0]['id'], 'rental_property': self.other_property.pk}
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Payment.objects.get(pk=rows[0]['id']).rental_property, self.property)
+
+class ImportTests(TestCase):
+    """Tests for the CSV/XLSX import of payments and expenses."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+
+        self.property = Property.objects.create(
+            owner=self.user,
+            property_type=PropertyType.objects.create(name='Apartment'),
+            name='Test Property',
+            address='123 Test St',
+            city='Test City',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00')
+        )
+        self.tenant = Tenant.objects.create(
+            first_name='John',
+            last_name='Doe',
+            email='john@example.com',
+            phone='555-123-4567',
+            created_by=self.user
+        )
+        self.lease = Lease.objects.create(
+            rental_property=self.property,
+            tenant=self.tenant,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            rent_amount=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00'),
+            status='active',
+            created_by=self.user
+        )
+        PaymentCategory.objects.create(name='Rent')
+        ExpenseCategory.objects.create(name='Repairs')
+        Vendor.objects.create(name='Acme Plumbing', created_by=self.user)
+
+    def payments_csv(self, rows):
+        text = StringIO()
+        writer = csv.writer(text)
+        writer.writerow(['Property', 'Tenant', 'Category', 'Amount', 'Due Date', 'Payment Date', 'Status',
+                         'Payment Method', 'Reference Number'])
+        writer.writerows(rows)
+        return BytesIO(text.getvalue().encode())
+
+    def payment_row(self, month, **kwargs):
+        row = dict({
+            'property': 'Test Property', 'tenant': 'John Doe', 'category': 'Rent', 'amount': '$1,000.00',
+            'due_date': f'2024-{month:02d}-01', 'payment_date': f'2024-{month:02d}-03', 'status': 'Paid',
+            'payment_method': 'Bank Transfer', 'reference': f'TX-{month}',
+        }, **kwargs)
+        return list(row.values())
+
+    def test_import_payments_csv(self):
+        """Test that valid rows are imported and invalid rows reported by row number."""
+        file = self.payments_csv([
+            self.payment_row(1),
+            self.payment_row(2, tenant='Jane Roe'),
+            self.payment_row(3, amount='lots', payment_date=''),
+            self.payment_row(4, property='test property', tenant='JOHN@example.com', status='pending',
+                             payment_date='', reference=''),
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_file('payments', self.user, file, 'bank.csv')
+
+        self.assertEqual((result['rows'], result['imported'], result['invalid']), (4, 2, 2))
+        self.assertEqual(result['errors'][0], {
+            'row': 3, 'errors': {'tenant': '"Jane Roe" does not have a lease for this property.'}
+        })
+        self.assertEqual(set(result['errors'][1]['errors']), {'amount', 'payment_date'})
+
+        payment = Payment.objects.get(reference_number='TX-1')
+        self.assertEqual(payment.lease, self.lease)
+        self.assertEqual(payment.amount, Decimal('1000.00'))
+        self.assertEqual((payment.status, payment.payment_method), ('paid', 'bank_transfer'))
+        self.assertEqual(payment.created_by, self.user)
+        self.assertEqual(Payment.history.count(), 2)
+        self.assertEqual(Payment.objects.get(due_date=date(2024, 4, 1)).status, 'pending')
+
+        self.assertEqual(len(search(self.user, 'TX', kinds=['payment'])), 1)
+        ledger = MonthlyPropertyLedger.objects.get(rental_property=self.property, month=date(2024, 1, 1))
+        self.assertEqual(ledger.income, Decimal('1000.00'))
+
+    def test_dry_run_and_duplicates(self):
+        """Test that dry runs write nothing and reference numbers are only imported once."""
+        rows = [self.payment_row(1), self.payment_row(2)]
+
+        result = import_file('payments', self.user, self.payments_csv(rows), 'bank.csv', dry_run=True)
+        self.assertEqual(result['imported'], 2)
+        self.assertFalse(Payment.objects.exists())
+
+        import_file('payments', self.user, self.payments_csv(rows), 'bank.csv')
+        result = import_file('payments', self.user, self.payments_csv(rows + [self.payment_row(3)] * 2), 'bank.csv')
+        self.assertEqual((result['imported'], result['invalid']), (1, 3))
+        self.assertEqual(Payment.objects.count(), 3)
+
+    def test_queries_do_not_grow_with_rows(self):
+        """Test that rows are checked against lookups loaded once per import."""
+        rows = [self.payment_row(month % 12 + 1, reference=f'TX-{month}') for month in range(100, 412)]
+        with CaptureQueriesContext(connection) as few:
+            import_file('payments', self.user, self.payments_csv(rows[300:]), 'bank.csv')
+        rows = rows[:300]
+        with CaptureQueriesContext(connection) as many:
+            result = import_file('payments', self.user, self.payments_csv(rows), 'bank.csv')
+        self.assertEqual(result['imported'], 300)
+        # Inserts are split to fit SQLite's parameter limit, but lookups are not repeated
+        few_selects, many_selects = (
+            [query for query in context.captured_queries if query['sql'].startswith('SELECT')]
+            for context in (few, many)
+        )
+        self.assertEqual(len(many_selects), len(few_selects))
+
+        # Only the first errors are kept
+        limit = imports.MAX_REPORTED_ERRORS
+        imports.MAX_REPORTED_ERRORS = 10
+        try:
+            result = import_file('payments', self.user, self.payments_csv(rows), 'bank.csv', batch_size=50)
+        finally:
+            imports.MAX_REPORTED_ERRORS = limit
+        self.assertEqual((result['invalid'], len(result['errors'])), (300, 10))
+
+    def test_import_expenses_xlsx(self):
+        """Test that expenses are imported from the first sheet of a workbook."""
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(['Property', 'Category', 'Vendor', 'Amount', 'Date', 'Description', 'Status', 'Tax Deductible'])
+        sheet.append(['Test Property', 'Repairs', 'acme plumbing', 250.5, datetime(2024, 3, 15), 'Leak', 'paid', 'no'])
+        sheet.append(['Test Property', 'Gardening', '', 80, datetime(2024, 3, 16), 'Lawn', 'paid', 'yes'])
+        file = BytesIO()
+        workbook.save(file)
+        file.seek(0)
+
+        result = import_file('expenses', self.user, file, 'expenses.xlsx')
+        self.assertEqual((result['imported'], result['invalid']), (1, 1))
+        self.assertEqual(result['errors'][0]['errors'], {'category': 'Unknown category "Gardening".'})
+
+        expense = Expense.objects.get()
+        self.assertEqual(expense.vendor.name, 'Acme Plumbing')
+        self.assertEqual((expense.amount, expense.date, expense.tax_deductible), (Decimal('250.50'), date(2024, 3, 15), False))
+        self.assertEqual([document.object_id for document in search(self.user, 'leak', kinds=['expense'])],
+                         [expense.pk])
+
+    def test_unsupported_file(self):
+        """Test that unreadable files are rejected as a whole."""
+        with self.assertRaises(ValueError):
+            import_file('payments', self.user, BytesIO(b'data'), 'bank.pdf')
+        with self.assertRaises(ValueError):
+            import_file('payments', self.user, BytesIO(b''), 'bank.csv')
+
+    def test_import_view_and_command(self):
+        """Test the upload page and the import_records command."""
+        upload = SimpleUploadedFile('bank.csv', self.payments_csv([self.payment_row(1)]).getvalue())
+        response = self.client.post(reverse('import_payments'), {'file': upload, 'dry_run': 'on'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result']['imported'], 1)
+        self.assertFalse(Payment.objects.exists())
+
+        with tempfile.NamedTemporaryFile(suffix='.csv') as file:
+            file.write(self.payments_csv([self.payment_row(1)]).getvalue())
+            file.flush()
+            out = StringIO()
+            call_command('import_records', 'payments', file.name, owner='testuser', stdout=out)
+        self.assertIn('Imported 1 of 1 payments', out.getvalue())
+        self.assertTrue(Payment.objects.filter(reference_number='TX-1').exists())
+
+class PropertyOwnerCopyTests(TestCase):
+    """Tests for the property owner copied onto leases, payments and expenses."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.other = User.objects.create_user(username='otheruser', password='testpassword')
+        self.client = Client()
+        self.client.login(username='otheruser', password='testpassword')
+
+        property_type = PropertyType.objects.create(name='Apartment')
+        self.property = self.create_property(self.user, 'Maple Court', property_type)
+        self.other_property = self.create_property(self.other, 'Oak House', property_type)
+
+        self.tenant = Tenant.objects.create(first_name='John', last_name='Doe', created_by=self.user)
+        self.lease = Lease.objects.create(
+            rental_property=self.property,
+            tenant=self.tenant,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            rent_amount=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00'),
+            status='active',
+            created_by=self.user
+        )
+        self.payment = Payment.objects.create(
+            rental_property=self.property,
+            tenant=self.tenant,
+            lease=self.lease,
+            amount=Decimal('1000.00'),
+            due_date=date(2024, 3, 1),
+            status='pending',
+            created_by=self.user
+        )
+        self.expense = Expense.objects.create(
+            rental_property=self.property,
+            amount=Decimal('150.00'),
+            date=date(2024, 3, 5),
+            description='Repair',
+            status='paid',
+            created_by=self.user
+        )
+
+    def create_property(self, owner, name, property_type):
+        return Property.objects.create(
+            owner=owner,
+            property_type=property_type,
+            name=name,
+            address='123 Test St',
+            city='Springfield',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00')
+        )
+
+    def owners(self):
+        return [model.objects.get().owner_id for model in (Lease, Payment, Expense)]
+
+    def test_copied_on_save(self):
+        """Test that saved rows take the owner of their property."""
+        self.assertEqual(self.owners(), [self.user.pk] * 3)
+
+        self.payment.rental_property = self.other_property
+        self.payment.save()
+        self.assertEqual(Payment.objects.get().owner, self.other)
+
+    def test_property_owner_change_moves_rows(self):
+        """Test that a property's rows follow it to a new owner."""
+        self.property.owner = self.other
+        self.property.save()
+
+        self.assertEqual(self.owners(), [self.other.pk] * 3)
+        response = self.client.get(reverse('payment_list'))
+        self.assertEqual(list(response.context['payments']), [self.payment])
+
+    def test_backfill(self):
+        """Test that the backfill fills the owner of every row, a batch at a time."""
+        for model in (Lease, Payment, Expense):
+            model.objects.update(owner=None)
+            self.assertEqual(backfill_owners(model, Property, batch_size=1), 1)
+        self.assertEqual(self.owners(), [self.user.pk] * 3)
+
+    def test_set_by_bulk_writes(self):
+        """Test that rows written in bulk, without signals, get their owner."""
+        call_command('seed_portfolio', owners=1, properties=2, years=1, seed=7, as_of='2024-06-30',
+                     prefix='seed', stdout=StringIO())
+        generate_rent_roll(date(2024, 6, 30), since=date(2024, 4, 1))
+
+        for model in (Lease, Payment, Expense):
+            self.assertFalse(model.objects.exclude(owner=F('rental_property__owner')).exists())
+        self.assertEqual(Payment.objects.filter(lease=self.lease).count(), 4)
@@ -3,14 +3,19 @@ Core views for the rental income manager application.
 """
 import json
 from django.shortcuts import render, redirect
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db.models import Sum, Count
+from django.http import JsonResponse
 from django.utils import timezone
-from datetime import timedelta
 from properties.models import Property
-from tenants.models import Tenant
+from tenants.models import TenantOwnership
 from payments.models import Payment
-from expenses.models import Expense
+from .rollups import monthly_rollup
+from .models import SearchDocument
+from .forms import ImportFileForm
+from .imports import import_file
+from .search import search as search_documents, search_result
 
 def home(request):
     """Display the homepage for non-authenticated users."""
@@ -28,39 +33,19 @@ def dashboard(request):
     property_count = properties.count()
     
     # Get tenant information
-    tenant_count = Tenant.objects.filter(leases__rental_property__owner=request.user).distinct().count()
+    tenant_count = TenantOwnership.objects.filter(owner=request.user).count()
     
-    # Date ranges
+    # Current date
     today = timezone.now().date()
-    start_of_month = today.replace(day=1)
-    end_of_month = (today.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
-    start_of_year = today.replace(month=1, day=1)
     
-    # Payment statistics
-    payments_this_month = Payment.objects.filter(
-        rental_property__owner=request.user,
-        payment_date__range=[start_of_month, end_of_month]
-    )
-    income_this_month = payments_this_month.aggregate(total=Sum('amount'))['total'] or 0
+    # Monthly income and expense figures for the current year
+    rollup = monthly_rollup(request.user, year=today.year, as_of=today)
+    current_month = rollup['months'][today.month - 1]
     
-    payments_this_year = Payment.objects.filter(
-        rental_property__owner=request.user,
-        payment_date__range=[start_of_year, today]
-    )
-    income_this_year = payments_this_year.aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Expense statistics
-    expenses_this_month = Expense.objects.filter(
-        rental_property__owner=request.user,
-        date__range=[start_of_month, end_of_month]
-    )
-    expense_this_month = expenses_this_month.aggregate(total=Sum('amount'))['total'] or 0
-    
-    expenses_this_year = Expense.objects.filter(
-        rental_property__owner=request.user,
-        date__range=[start_of_year, today]
-    )
-    expense_this_year = expenses_this_year.aggregate(total=Sum('amount'))['total'] or 0
+    income_this_month = current_month['income']
+    income_this_year = rollup['income_to_date']
+    expense_this_month = current_month['expenses']
+    expense_this_year = rollup['expenses_to_date']
     
     # Net income
     net_income_month = income_this_month - expense_this_month
@@ -68,46 +53,25 @@ def dashboard(request):
     
     # Upcoming payments
     upcoming_payments = Payment.objects.filter(
-        rental_property__owner=request.user,
-        status='pending',
+        owner=request.user,
+        status__in=Payment.OPEN_STATUSES,
         due_date__gte=today
-    ).order_by('due_date')[:5]
+    ).select_related('rental_property', 'tenant').order_by('due_date')[:5]
     
     # Overdue payments
-    overdue_payments = Payment.objects.filter(
-        rental_property__owner=request.user,
-        status='pending',
+    overdue = Payment.objects.filter(
+        owner=request.user,
+        status__in=Payment.OPEN_STATUSES,
         due_date__lt=today
-    ).order_by('due_date')
-    
-    overdue_amount = overdue_payments.aggregate(total=Sum('amount'))['total'] or 0
-    overdue_count = overdue_payments.count()
+    ).aggregate(total=Sum('amount'), count=Count('id'))
     
-    # Monthly income data for chart
-    monthly_income = []
-    monthly_expenses = []
-    monthly_net = []
+    overdue_amount = overdue['total'] or 0
+    overdue_count = overdue['count']
     
-    for month in range(1, 13):
-        month_start = today.replace(month=month, day=1)
-        if month == 12:
-            month_end = month_start.replace(year=month_start.year + 1, month=1, day=1) - timedelta(days=1)
-        else:
-            month_end = month_start.replace(month=month + 1, day=1) - timedelta(days=1)
-        
-        month_income = Payment.objects.filter(
-            rental_property__owner=request.user,
-            payment_date__range=[month_start, month_end]
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        month_expense = Expense.objects.filter(
-            rental_property__owner=request.user,
-            date__range=[month_start, month_end]
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        monthly_income.append(month_income)
-        monthly_expenses.append(month_expense)
-        monthly_net.append(month_income - month_expense)
+    # Monthly data for chart
+    monthly_income = [float(month['income']) for month in rollup['months']]
+    monthly_expenses = [float(month['expenses']) for month in rollup['months']]
+    monthly_net = [float(month['net']) for month in rollup['months']]
     
     context = {
         'property_count': property_count,
@@ -121,9 +85,70 @@ def dashboard(request):
         'upcoming_payments': upcoming_payments,
         'overdue_amount': overdue_amount,
         'overdue_count': overdue_count,
-        'monthly_income': json.dumps([1000, 1200, 1100, 1300, 1400, 1200, 1100, 1300, 1500, 1400, 1200, 1300]),
-        'monthly_expenses': json.dumps([800, 850, 900, 950, 1000, 800, 750, 900, 950, 1000, 900, 950]),
-        'monthly_net': json.dumps([200, 350, 200, 350, 400, 400, 350, 400, 550, 400, 300, 350]),
+        'monthly_income': json.dumps(monthly_income),
+        'monthly_expenses': json.dumps(monthly_expenses),
+        'monthly_net': json.dumps(monthly_net),
     }
     
     return render(request, 'core/dashboard.html', context)
+
+
+@login_required
+def search(request):
+    """
+    Return the user's properties, tenants, vendors, expenses and payments
+    matching the ``q`` parameter as JSON, best match first. Repeat ``type``
+    to limit the kinds searched.
+    """
+    query = request.GET.get('q', '').strip()
+    kinds = [kind for kind in request.GET.getlist('type') if kind in dict(SearchDocument.KINDS)]
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    
+    documents = search_documents(request.user, query, kinds=kinds, limit=limit)
+    return JsonResponse({
+        'query': query,
+        'results': [search_result(document) for document in documents],
+    })
+
+# Columns of the files accepted by import_records, required ones first
+IMPORT_COLUMNS = {
+    'payments': ['Property', 'Tenant', 'Amount', 'Category', 'Due Date', 'Payment Date', 'Status',
+                 'Payment Method', 'Reference Number', 'Notes'],
+    'expenses': ['Property', 'Amount', 'Description', 'Date', 'Category', 'Vendor', 'Due Date',
+                 'Payment Date', 'Status', 'Payment Method', 'Reference Number', 'Tax Deductible', 'Notes'],
+}
+
+@login_required
+def import_records(request, kind):
+    """
+    Import payments or expenses from an uploaded CSV or Excel file, or
+    check the file first with a dry run.
+    """
+    result = None
+    
+    if request.method == 'POST':
+        form = ImportFileForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = import_file(kind, request.user, upload, upload.name, dry_run=form.cleaned_data['dry_run'])
+            except ValueError as exc:
+                form.add_error('file', str(exc))
+            else:
+                if not result['dry_run'] and result['imported']:
+                    messages.success(request, f"Imported {result['imported']} {kind}.")
+    else:
+        form = ImportFileForm()
+    
+    context = {
+        'form': form,
+        'kind': kind,
+        'columns': IMPORT_COLUMNS[kind],
+        'result': result,
+        'list_url': 'payment_list' if kind == 'payments' else 'expense_list',
+    }
+    
+    return render(request, 'core/import.html', context)
@@ -0,0 +1,18 @@
+"""
+API viewsets for the expenses app.
+"""
+from core.api import OwnerScopedViewSet
+from reports.ledger import expense_ledger_keys
+from .models import Expense, Vendor
+from .serializers import ExpenseSerializer, VendorSerializer
+
+class ExpenseViewSet(OwnerScopedViewSet):
+    """Expenses of the owner's properties."""
+    queryset = Expense.objects.select_related('rental_property', 'category', 'vendor')
+    serializer_class = ExpenseSerializer
+    ledger_keys = staticmethod(expense_ledger_keys)
+
+class VendorViewSet(OwnerScopedViewSet):
+    """Vendors added by the owner."""
+    queryset = Vendor.objects.all()
+    serializer_class = VendorSerializer
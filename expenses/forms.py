@@ -115,7 +115,7 @@ class ExpenseFilterForm(forms.Form):
         widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'})
     )
     status = forms.ChoiceField(
-        choices=[('', 'All')] + list(Expense.EXPENSE_STATUS),
+        choices=[('', 'All')] + list(Expense.EXPENSE_STATUS) + [('overdue', 'Overdue')],
         required=False,
         widget=forms.Select(attrs={'class': 'form-select'})
     )
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+def backfill_expense_owner(apps, schema_editor):
+    """Copy the owner of each expense's property onto the expense."""
+    from properties.owners import backfill_owners
+
+    backfill_owners(apps.get_model('expenses', 'Expense'), apps.get_model('properties', 'Property'))
+
+
+class Migration(migrations.Migration):
+    # Each batch of the backfill commits on its own, so large tables are not
+    # locked for the whole migration
+    atomic = False
+
+    dependencies = [
+        ('expenses', '0003_expense_owner'),
+        ('properties', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_expense_owner, migrations.RunPython.noop),
+        # Indexes are built once the column is filled
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['owner', 'status', 'date'], name='expense_owner_status_date_idx'),
+        ),
+    ]
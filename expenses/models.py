@@ -2,10 +2,12 @@
 Models for the expenses app.
 """
 from django.db import models
+from django.db.models import BooleanField, Case, Value, When
 from django.contrib.auth.models import User
 from django.utils import timezone
 from simple_history.models import HistoricalRecords
 from properties.models import Property
+from core.expressions import overdue_condition
 
 class ExpenseCategory(models.Model):
     """
@@ -37,6 +39,19 @@ class Vendor(models.Model):
     def __str__(self):
         return self.name
 
+class ExpenseQuerySet(models.QuerySet):
+    """
+    Expense queries with the computed properties of Expense available to
+    filter, sort and aggregate on in SQL.
+    """
+
+    def with_overdue(self, today=None):
+        """Annotate ``overdue``, the value of ``is_overdue`` on ``today`` (default: today)."""
+        today = today or timezone.now().date()
+        return self.annotate(
+            overdue=Case(When(overdue_condition(today), then=Value(True)), default=Value(False), output_field=BooleanField())
+        )
+
 class Expense(models.Model):
     """
     Expenses related to properties.
@@ -74,16 +89,33 @@ class Expense(models.Model):
     notes = models.TextField(blank=True, null=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_expenses')
     date_created = models.DateTimeField(default=timezone.now)
+    # Copy of rental_property.owner, so owner-scoped queries skip the property join
+    owner = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, editable=False, db_index=False, related_name='owned_expenses'
+    )
     history = HistoricalRecords()
     
+    objects = ExpenseQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-date']
+        indexes = [
+            # Owner-scoped expense lists and paid expenses by date (dashboard)
+            models.Index(fields=['owner', 'status', 'date'], name='expense_owner_status_date_idx'),
+            # Property-scoped paid expenses by date (ledger)
+            models.Index(fields=['rental_property', 'status', 'date'], name='expense_prop_status_date_idx'),
+            # Expenses of a property by date regardless of status
+            models.Index(fields=['rental_property', 'date'], name='expense_prop_date_idx'),
+        ]
     
     def __str__(self):
         return f"${self.amount} - {self.description} - {self.property.name}"
     
     @property
     def is_overdue(self):
+        # Use the value annotated by Expense.objects.with_overdue() when present
+        if hasattr(self, 'overdue'):
+            return self.overdue
         if self.status == 'paid' or not self.due_date:
             return False
         return self.due_date < timezone.now().date()
@@ -0,0 +1,30 @@
+"""
+API serializers for the expenses app.
+"""
+from rest_framework import serializers
+from core.api import OwnerScopedSerializer
+from .models import Expense, Vendor
+
+class ExpenseSerializer(OwnerScopedSerializer):
+    property_name = serializers.CharField(source='rental_property.name', read_only=True)
+    category_name = serializers.CharField(source='category.name', read_only=True, allow_null=True)
+    vendor_name = serializers.CharField(source='vendor.name', read_only=True, allow_null=True)
+    
+    class Meta:
+        model = Expense
+        fields = [
+            'id', 'rental_property', 'property_name', 'category', 'category_name', 'vendor', 'vendor_name',
+            'amount', 'date', 'due_date', 'payment_date', 'payment_method', 'reference_number',
+            'description', 'status', 'is_recurring', 'recurring_frequency', 'tax_deductible', 'notes',
+            'created_by', 'date_created',
+        ]
+        read_only_fields = ['created_by', 'date_created']
+
+class VendorSerializer(OwnerScopedSerializer):
+    class Meta:
+        model = Vendor
+        fields = [
+            'id', 'name', 'contact_person', 'email', 'phone', 'address', 'website', 'notes',
+            'created_by', 'date_created',
+        ]
+        read_only_fields = ['created_by', 'date_created']
@@ -7,7 +7,8 @@ from django.contrib.auth.models import User
 from properties.models import Property, PropertyType
 from .models import Expense, ExpenseCategory, Vendor
 from decimal import Decimal
-from datetime import date
+from datetime import date, timedelta
+from django.utils import timezone
 
 class ExpenseModelTests(TestCase):
     """Tests for the Expense model."""
@@ -237,3 +238,50 @@ class ExpenseViewTests(TestCase):
         
         # Check that the expense is deleted
         self.assertEqual(Expense.objects.count(), 0)
+
+class ExpenseOverdueAnnotationTests(TestCase):
+    """Tests for computing overdue expenses in SQL."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+        
+        self.property = Property.objects.create(
+            owner=self.user,
+            property_type=PropertyType.objects.create(name='Apartment'),
+            name='Test Property',
+            address='123 Test St',
+            city='Test City',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00')
+        )
+        
+        today = timezone.now().date()
+        for due_date, status in [(today - timedelta(days=5), 'pending'), (today - timedelta(days=5), 'paid'),
+                                 (today + timedelta(days=5), 'pending'), (None, 'pending')]:
+            Expense.objects.create(
+                rental_property=self.property,
+                amount=Decimal('100.00'),
+                due_date=due_date,
+                description=f'{status} expense',
+                status=status,
+                created_by=self.user
+            )
+    
+    def test_annotation_matches_property(self):
+        """Test that the annotated value equals the Python property."""
+        expenses = list(Expense.objects.with_overdue().order_by('pk'))
+        plain = list(Expense.objects.order_by('pk'))
+        
+        self.assertEqual([expense.overdue for expense in expenses], [expense.is_overdue for expense in plain])
+        self.assertEqual([expense.is_overdue for expense in expenses], [True, False, False, False])
+    
+    def test_expense_list_overdue_filter(self):
+        """Test filtering the expense list to overdue expenses."""
+        response = self.client.get(reverse('expense_list'), {'status': 'overdue'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([expense.description for expense in response.context['expenses']], ['pending expense'])
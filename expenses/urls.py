@@ -3,6 +3,7 @@ URL Configuration for the expenses app.
 """
 from django.urls import path
 from . import views
+from core.views import import_records
 
 urlpatterns = [
     # Expense CRUD
@@ -11,6 +12,7 @@ urlpatterns = [
     path('create/', views.ExpenseCreateView.as_view(), name='expense_create'),
     path('<int:pk>/update/', views.ExpenseUpdateView.as_view(), name='expense_update'),
     path('<int:pk>/delete/', views.ExpenseDeleteView.as_view(), name='expense_delete'),
+    path('import/', import_records, {'kind': 'expenses'}, name='import_expenses'),
     
     # Expense documents
     path('<int:pk>/add-document/', views.add_expense_document, name='add_expense_document'),
@@ -11,8 +11,10 @@ from django.db.models import Sum, Count, Q
 from django.utils import timezone
 from .models import Expense, ExpenseCategory, Vendor, ExpenseDocument
 from .forms import ExpenseForm, ExpenseCategoryForm, VendorForm, ExpenseDocumentForm, ExpenseFilterForm
+from core.summary import get_owner_summary
+from core.pagination import KeysetPaginationMixin
 
-class ExpenseListView(LoginRequiredMixin, ListView):
+class ExpenseListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """
     Display a list of expenses with filtering options.
     """
@@ -23,7 +25,9 @@ class ExpenseListView(LoginRequiredMixin, ListView):
     
     def get_queryset(self):
         """Filter expenses based on query parameters."""
-        queryset = Expense.objects.filter(rental_property__owner=self.request.user)
+        queryset = Expense.objects.with_overdue().filter(owner=self.request.user).select_related(
+            'rental_property', 'category', 'vendor'
+        )
         
         # Get filter form
         self.form = ExpenseFilterForm(self.request.GET or None, user=self.request.user)
@@ -53,7 +57,9 @@ class ExpenseListView(LoginRequiredMixin, ListView):
             if data.get('max_amount'):
                 queryset = queryset.filter(amount__lte=data['max_amount'])
             
-            if data.get('status'):
+            if data.get('status') == 'overdue':
+                queryset = queryset.filter(overdue=True)
+            elif data.get('status'):
                 queryset = queryset.filter(status=data['status'])
             
             if data.get('tax_deductible') is not None:
@@ -75,19 +81,8 @@ class ExpenseListView(LoginRequiredMixin, ListView):
         # Add filter form to context
         context['form'] = self.form
         
-        # Add total expenses
-        total_expenses = Expense.objects.filter(
-            rental_property__owner=self.request.user,
-            status='paid'
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        context['total_expenses'] = total_expenses
-        
-        # Add expenses by category
-        expenses_by_category = Expense.objects.filter(
-            rental_property__owner=self.request.user,
-            status='paid'
-        ).values('category__name').annotate(total=Sum('amount')).order_by('-total')
-        context['expenses_by_category'] = expenses_by_category
+        # Add total expenses and expenses by category
+        context.update(get_owner_summary(self.request.user, 'expenses'))
         
         return context
 
@@ -101,7 +96,7 @@ class ExpenseDetailView(LoginRequiredMixin, DetailView):
     
     def get_queryset(self):
         """Ensure user can only view their own expenses."""
-        return Expense.objects.filter(rental_property__owner=self.request.user)
+        return Expense.objects.filter(owner=self.request.user)
     
     def get_context_data(self, **kwargs):
         """Add additional context data."""
@@ -159,7 +154,7 @@ class ExpenseUpdateView(LoginRequiredMixin, UpdateView):
     
     def get_queryset(self):
         """Ensure user can only update their own expenses."""
-        return Expense.objects.filter(rental_property__owner=self.request.user)
+        return Expense.objects.filter(owner=self.request.user)
     
     def get_form_kwargs(self):
         """Pass the current user to the form."""
@@ -192,7 +187,7 @@ class ExpenseDeleteView(LoginRequiredMixin, DeleteView):
     
     def get_queryset(self):
         """Ensure user can only delete their own expenses."""
-        return Expense.objects.filter(rental_property__owner=self.request.user)
+        return Expense.objects.filter(owner=self.request.user)
     
     def delete(self, request, *args, **kwargs):
         """Handle expense deletion."""
@@ -204,7 +199,7 @@ def add_expense_document(request, pk):
     """
     Add a document to an expense.
     """
-    expense = get_object_or_404(Expense, pk=pk, rental_property__owner=request.user)
+    expense = get_object_or_404(Expense, pk=pk, owner=request.user)
     
     if request.method == 'POST':
         form = ExpenseDocumentForm(request.POST, request.FILES)
@@ -228,7 +223,7 @@ def delete_expense_document(request, pk):
     """
     Delete an expense document.
     """
-    document = get_object_or_404(ExpenseDocument, pk=pk, expense__rental_property__owner=request.user)
+    document = get_object_or_404(ExpenseDocument, pk=pk, expense__owner=request.user)
     expense_id = document.expense.id
     
     document.delete()
@@ -324,7 +319,7 @@ class VendorDetailView(LoginRequiredMixin, DetailView):
         # Get expenses for this vendor
         context['expenses'] = Expense.objects.filter(
             vendor=vendor,
-            rental_property__owner=self.request.user
+            owner=self.request.user
         ).order_by('-date')
         
         # Calculate total expense amount
@@ -2,7 +2,7 @@
 Admin configuration for the payments app.
 """
 from django.contrib import admin
-from .models import PaymentCategory, Payment, LateFee
+from .models import PaymentCategory, Payment, LateFee, BankDeposit
 
 class LateFeeInline(admin.TabularInline):
     """Inline admin for LateFee."""
@@ -53,3 +53,12 @@ class LateFeeAdmin(admin.ModelAdmin):
             'classes': ('collapse',),
         }),
     )
+
+@admin.register(BankDeposit)
+class BankDepositAdmin(admin.ModelAdmin):
+    """Admin configuration for the BankDeposit model."""
+    list_display = ('date', 'amount', 'description', 'owner', 'status', 'payment')
+    list_filter = ('status', 'date')
+    search_fields = ('description', 'reference_number')
+    date_hierarchy = 'date'
+    raw_id_fields = ('payment', 'candidates')
@@ -0,0 +1,18 @@
+"""
+API viewsets for the payments app.
+"""
+from core.api import OwnerScopedViewSet
+from reports.ledger import payment_ledger_keys
+from .models import Payment, LateFee
+from .serializers import PaymentSerializer, LateFeeSerializer
+
+class PaymentViewSet(OwnerScopedViewSet):
+    """Payments of the owner's properties."""
+    queryset = Payment.objects.select_related('rental_property', 'tenant', 'category').prefetch_related('late_fees')
+    serializer_class = PaymentSerializer
+    ledger_keys = staticmethod(payment_ledger_keys)
+
+class LateFeeViewSet(OwnerScopedViewSet):
+    """Late fees charged on the owner's payments."""
+    queryset = LateFee.objects.all()
+    serializer_class = LateFeeSerializer
@@ -3,8 +3,9 @@ Forms for the payments app.
 """
 from django import forms
 from .models import Payment, PaymentCategory, LateFee
+from .reconciliation import DATE_WINDOW_DAYS
 from properties.models import Property
-from tenants.models import Tenant, Lease
+from tenants.models import Tenant, Lease, owner_tenants
 
 class PaymentForm(forms.ModelForm):
     """
@@ -35,38 +36,38 @@ class PaymentForm(forms.ModelForm):
         
         if user:
             # Filter properties to only show those owned by this user
-            self.fields['property'].queryset = Property.objects.filter(owner=user)
+            self.fields['rental_property'].queryset = Property.objects.filter(owner=user)
             
             # Filter tenants to only show those with leases on properties owned by this user
-            self.fields['tenant'].queryset = Tenant.objects.filter(leases__property__owner=user).distinct()
+            self.fields['tenant'].queryset = owner_tenants(user)
             
             # Filter leases to only show those on properties owned by this user
-            self.fields['lease'].queryset = Lease.objects.filter(property__owner=user)
+            self.fields['lease'].queryset = Lease.objects.filter(owner=user)
         
         if property_id:
             # If a property is pre-selected, filter tenants and leases
             self.fields['tenant'].queryset = Tenant.objects.filter(
-                leases__property_id=property_id
-            ).distinct()
+                pk__in=Lease.objects.filter(rental_property_id=property_id).values('tenant')
+            )
             self.fields['lease'].queryset = Lease.objects.filter(
-                property_id=property_id
+                rental_property_id=property_id
             )
         
         if tenant_id:
             # If a tenant is pre-selected, filter leases
-            self.fields['lease'].queryset = Lease.objects.filter(
+            self.fields['lease'].queryset = self.fields['lease'].queryset.filter(
                 tenant_id=tenant_id
             )
     
     def clean(self):
         cleaned_data = super().clean()
-        property = cleaned_data.get('property')
+        property = cleaned_data.get('rental_property')
         tenant = cleaned_data.get('tenant')
         lease = cleaned_data.get('lease')
         
         # Validate that the tenant has a lease for this property
         if property and tenant and not lease:
-            tenant_leases = Lease.objects.filter(property=property, tenant=tenant)
+            tenant_leases = Lease.objects.filter(rental_property=property, tenant=tenant)
             if not tenant_leases.exists():
                 self.add_error('tenant', 'This tenant does not have a lease for the selected property.')
         
@@ -114,6 +115,27 @@ class WaiveLateFeeForm(forms.ModelForm):
             'waived_reason': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
 
+class ReconciliationForm(forms.Form):
+    """
+    Form for uploading a bank statement to reconcile against open payments.
+    """
+    file = forms.FileField(
+        help_text="A .csv or .xlsx statement with date, amount and description columns.",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+    date_window = forms.IntegerField(
+        min_value=0,
+        max_value=31,
+        initial=DATE_WINDOW_DAYS,
+        label="Days between due date and deposit",
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        label="Preview the matches without recording them",
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
 class PaymentFilterForm(forms.Form):
     """
     Form for filtering payments.
@@ -164,7 +186,9 @@ class PaymentFilterForm(forms.Form):
         ('', '-- Any Status --'),
         ('paid', 'Paid'),
         ('pending', 'Pending'),
-        ('cancelled', 'Cancelled')
+        ('late', 'Late'),
+        ('cancelled', 'Cancelled'),
+        ('overdue', 'Overdue'),
     ]
     status = forms.ChoiceField(
         choices=STATUS_CHOICES,
@@ -180,6 +204,7 @@ class PaymentFilterForm(forms.Form):
         ('amount', 'Amount (lowest first)'),
         ('-payment_date', 'Payment Date (newest first)'),
         ('payment_date', 'Payment Date (oldest first)'),
+        ('-overdue_days', 'Days Overdue (most first)'),
     ]
     sort_by = forms.ChoiceField(
         choices=SORT_CHOICES, 
@@ -195,24 +220,5 @@ class PaymentFilterForm(forms.Form):
             # Update querysets to only show properties owned by this user
             self.fields['property'].queryset = Property.objects.filter(owner=user)
             
-            # Fix the tenant queryset filter that's causing the error
-            # Instead of using leases__property__owner which is causing the error,
-            # use a safer approach by getting the properties first
-            try:
-                # Get properties owned by this user
-                user_properties = Property.objects.filter(owner=user).values_list('id', flat=True)
-                
-                # Get tenants with leases for these properties
-                # Instead of complex filtering, use a safer approach
-                tenant_ids = set()
-                leases = Lease.objects.filter(property__id__in=user_properties)
-                
-                for lease in leases:
-                    if lease.tenant:
-                        tenant_ids.add(lease.tenant.id)
-                
-                self.fields['tenant'].queryset = Tenant.objects.filter(id__in=tenant_ids)
-            except Exception as e:
-                print(f"Error setting tenant queryset: {e}")
-                # Fallback to a safer default queryset
-                self.fields['tenant'].queryset = Tenant.objects.all()
\ No newline at end of file
+            # Only show tenants with leases on properties owned by this user
+            self.fields['tenant'].queryset = owner_tenants(user)
\ No newline at end of file
@@ -0,0 +1,106 @@
+"""
+Batch assessment of late fees.
+
+Pending payments whose due date plus the lease's grace period has passed
+are marked late and charged the lease's late fee. Candidates are read in
+pk-ordered chunks through the (status, due_date) index, and each chunk is
+written with one UPDATE, one bulk history insert and one bulk late fee
+insert, so only the payments that become late are touched.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from properties.models import Property
+from reports.ledger import rebuild_ledger
+from core.expressions import DaysBetween
+from core.summary import schedule_summary_invalidation, property_owner_ids
+from .models import Payment, LateFee
+
+def late_fee_candidates(as_of):
+    """Return the pending lease payments whose grace period has passed on ``as_of``."""
+    return Payment.objects.filter(
+        status='pending',
+        due_date__lt=as_of,
+        lease__isnull=False
+    ).annotate(
+        grace_period=F('lease__grace_period'),
+        lease_late_fee=F('lease__late_fee')
+    ).alias(
+        days_past_due=DaysBetween(as_of, 'due_date')
+    ).filter(days_past_due__gt=F('grace_period'))
+
+def _assess_chunk(payments, as_of, batch_size):
+    """
+    Mark one chunk of overdue payments late and charge their late fees.
+
+    Returns the number of payments marked late and of fees created.
+    """
+    with transaction.atomic():
+        # Payments paid or reconciled since the chunk was read are left alone
+        pending = set(Payment.objects.select_for_update().filter(
+            pk__in=[payment.pk for payment in payments],
+            status='pending'
+        ).values_list('pk', flat=True))
+        payments = [payment for payment in payments if payment.pk in pending]
+        if not payments:
+            return 0, 0
+
+        # Payments already charged by hand keep their fee
+        charged = set(LateFee.objects.filter(
+            payment__in=pending,
+            waived=False
+        ).values_list('payment_id', flat=True))
+
+        Payment.objects.filter(pk__in=pending).update(status='late')
+        for payment in payments:
+            payment.status = 'late'
+        Payment.history.bulk_history_create(payments, batch_size=batch_size, update=True)
+
+        fees = [
+            LateFee(
+                payment=payment,
+                amount=payment.lease_late_fee,
+                date_applied=as_of,
+                reason=f'Unpaid {payment.grace_period} days after the due date of {payment.due_date}.'
+            )
+            for payment in payments
+            if payment.lease_late_fee > 0 and payment.pk not in charged
+        ]
+        LateFee.objects.bulk_create(fees, batch_size=batch_size)
+
+        # The status change moves payments between ledger counters and
+        # changes the owners' pending and overdue totals
+        property_ids = {payment.rental_property_id for payment in payments}
+        due_dates = [payment.due_date for payment in payments]
+        rebuild_ledger(
+            Property.objects.filter(pk__in=property_ids),
+            batch_size=batch_size,
+            start_date=min(due_dates),
+            end_date=max(due_dates)
+        )
+        schedule_summary_invalidation(property_owner_ids(property_ids))
+
+    return len(payments), len(fees)
+
+def assess_late_fees(as_of=None, batch_size=1000):
+    """
+    Mark pending payments late once their grace period has passed on
+    ``as_of`` (default: today) and create their late fees.
+
+    Returns a dict with the number of payments marked late and of late
+    fees created.
+    """
+    as_of = as_of or timezone.now().date()
+    candidates = late_fee_candidates(as_of).order_by('pk')
+
+    counts = {'late_payments': 0, 'late_fees': 0}
+    last_pk = 0
+    while True:
+        chunk = list(candidates.filter(pk__gt=last_pk)[:batch_size])
+        if not chunk:
+            return counts
+        last_pk = chunk[-1].pk
+
+        late_payments, late_fees = _assess_chunk(chunk, as_of, batch_size)
+        counts['late_payments'] += late_payments
+        counts['late_fees'] += late_fees
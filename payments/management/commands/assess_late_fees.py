@@ -0,0 +1,32 @@
+"""
+Mark overdue payments late and charge the late fees of their leases.
+"""
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from payments.late_fees import assess_late_fees
+
+class Command(BaseCommand):
+    help = 'Charge late fees on pending payments whose grace period has passed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help='Date to assess fees on, as YYYY-MM-DD (default: today).')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Payments per transaction (default: 1000).'
+        )
+
+    def handle(self, *args, **options):
+        as_of = None
+        if options['as_of']:
+            try:
+                as_of = datetime.strptime(options['as_of'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid date '{options['as_of']}', expected YYYY-MM-DD.")
+
+        counts = assess_late_fees(as_of=as_of, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Marked {counts['late_payments']} payments late and created {counts['late_fees']} late fees."
+        ))
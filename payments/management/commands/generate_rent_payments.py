@@ -0,0 +1,52 @@
+"""
+Generate the pending rent payments of active leases for one or more months.
+"""
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from payments.recurring import generate_rent_payments
+
+class Command(BaseCommand):
+    help = 'Create missing rent payments for every active lease, for all owners or a single one.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--due-date',
+            help='Due date of the first month, as YYYY-MM-DD (default: first day of next month).'
+        )
+        parser.add_argument('--months', type=int, default=1, help='Consecutive months to generate (default: 1).')
+        parser.add_argument('--owner', help='Username of the only owner to generate payments for.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows inserted per query (default: 1000).'
+        )
+
+    def handle(self, *args, **options):
+        if options['due_date']:
+            try:
+                due_date = datetime.strptime(options['due_date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid date '{options['due_date']}', expected YYYY-MM-DD.")
+        else:
+            due_date = timezone.now().date().replace(day=1) + relativedelta(months=1)
+
+        if options['months'] < 1:
+            raise CommandError('--months must be at least 1.')
+
+        owner = None
+        if options['owner']:
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f"Owner '{options['owner']}' does not exist.")
+
+        due_dates = [due_date + relativedelta(months=month) for month in range(options['months'])]
+        payments = generate_rent_payments(due_dates, owner=owner, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(payments)} rent payments due from {due_dates[0]} to {due_dates[-1]}.'
+        ))
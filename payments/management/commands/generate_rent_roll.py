@@ -0,0 +1,77 @@
+"""
+Generate the rent roll of every active lease up to a given month.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from payments.recurring import generate_rent_roll, rent_roll_leases, get_rent_category
+
+def generate_owner_rent_roll(owner_id, through, since, batch_size):
+    """Generate the rent roll of one owner; runs in a worker process."""
+    try:
+        return generate_rent_roll(through, since=since, owner_id=owner_id, batch_size=batch_size)
+    finally:
+        connections.close_all()
+
+class Command(BaseCommand):
+    help = 'Create the due rent payments of all active leases through a month, continuing from the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--through', required=True, help='Last month to generate, as YYYY-MM.')
+        parser.add_argument(
+            '--since',
+            help='First month for leases not generated before, as YYYY-MM (default: this month).'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Processes generating owners in parallel (default: 1).'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Leases per transaction (default: 1000).'
+        )
+
+    def parse_month(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise CommandError(f"Invalid month '{value}', expected YYYY-MM.")
+
+    def handle(self, *args, **options):
+        through = self.parse_month(options['through'])
+        since = self.parse_month(options['since']) if options['since'] else None
+        workers = options['workers']
+        batch_size = options['batch_size']
+
+        if workers > 1 and connection.vendor == 'sqlite':
+            # SQLite allows a single writer, so parallel workers only contend
+            self.stdout.write(self.style.WARNING('SQLite does not support parallel writers; using one process.'))
+            workers = 1
+
+        if workers < 2:
+            created = generate_rent_roll(through, since=since, batch_size=batch_size)
+        else:
+            owner_ids = list(
+                rent_roll_leases(through).values_list('owner_id', flat=True).distinct().order_by()
+            )
+
+            # Create the rent category up front so workers do not race for it,
+            # then let the worker processes open their own connections
+            get_rent_category()
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+                created = sum(pool.map(
+                    generate_owner_rent_roll,
+                    owner_ids,
+                    [through] * len(owner_ids),
+                    [since] * len(owner_ids),
+                    [batch_size] * len(owner_ids)
+                ))
+
+        self.stdout.write(self.style.SUCCESS(f'Created {created} rent payments through {through:%Y-%m}.'))
@@ -0,0 +1,45 @@
+"""
+Match the deposits of a bank statement to an owner's open payments.
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from payments.reconciliation import DATE_WINDOW_DAYS, reconcile_statement
+
+class Command(BaseCommand):
+    help = 'Reconcile a .csv or .xlsx bank statement against an owner\'s pending and late payments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path of the .csv or .xlsx statement.')
+        parser.add_argument('--owner', required=True, help='Username of the owner the account belongs to.')
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=DATE_WINDOW_DAYS,
+            help=f'Days a deposit may be from the due date of its payment (default: {DATE_WINDOW_DAYS}).'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Show the matches without recording them.')
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named '{options['owner']}'.")
+
+        try:
+            with open(options['path'], 'rb') as file:
+                result = reconcile_statement(
+                    owner, file, options['path'],
+                    window=options['window'],
+                    dry_run=options['dry_run']
+                )
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for row in result['errors']:
+            for column, message in row['errors'].items():
+                self.stderr.write(f"Row {row['row']}, {column}: {message}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['deposits']} new deposits: {result['matched']} matched, {result['review']} to review, "
+            f"{result['unmatched']} unmatched ({result['duplicates']} already reconciled)."
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payments', '0002_owner_time_range_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BankDeposit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('reference_number', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('matched', 'Matched'), ('review', 'Needs Review'), ('unmatched', 'Unmatched'), ('ignored', 'Ignored')], default='review', max_length=20)),
+                ('date_created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('candidates', models.ManyToManyField(blank=True, related_name='candidate_deposits', to='payments.payment')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bank_deposits', to=settings.AUTH_USER_MODEL)),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bank_deposits', to='payments.payment')),
+            ],
+            options={
+                'ordering': ['-date', '-id'],
+                'indexes': [models.Index(fields=['owner', 'status', 'date'], name='deposit_owner_status_date_idx')],
+            },
+        ),
+    ]
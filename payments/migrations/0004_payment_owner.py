@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('payments', '0003_bankdeposit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalpayment',
+            name='owner',
+            field=models.ForeignKey(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='owned_payments', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+def backfill_payment_owner(apps, schema_editor):
+    """Copy the owner of each payment's property onto the payment."""
+    from properties.owners import backfill_owners
+
+    backfill_owners(apps.get_model('payments', 'Payment'), apps.get_model('properties', 'Property'))
+
+
+class Migration(migrations.Migration):
+    # Each batch of the backfill commits on its own, so large tables are not
+    # locked for the whole migration
+    atomic = False
+
+    dependencies = [
+        ('payments', '0004_payment_owner'),
+        ('properties', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_payment_owner, migrations.RunPython.noop),
+        # Indexes are built once the column is filled
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['owner', 'status', 'due_date'], name='payment_owner_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['owner', 'status', 'payment_date'], name='payment_owner_status_paid_idx'),
+        ),
+    ]
@@ -2,11 +2,13 @@
 Models for the payments app.
 """
 from django.db import models
+from django.db.models import BooleanField, Case, Value, When
 from django.contrib.auth.models import User
 from django.utils import timezone
 from simple_history.models import HistoricalRecords
 from properties.models import Property
 from tenants.models import Tenant, Lease
+from core.expressions import DaysBetween, overdue_condition
 
 class PaymentCategory(models.Model):
     """
@@ -21,6 +23,24 @@ class PaymentCategory(models.Model):
     def __str__(self):
         return self.name
 
+class PaymentQuerySet(models.QuerySet):
+    """
+    Payment queries with the computed properties of Payment available to
+    filter, sort and aggregate on in SQL.
+    """
+
+    def with_overdue(self, today=None):
+        """
+        Annotate ``overdue`` and ``overdue_days``, the values of
+        ``is_overdue`` and ``days_overdue`` on ``today`` (default: today).
+        """
+        today = today or timezone.now().date()
+        overdue = overdue_condition(today)
+        return self.annotate(
+            overdue=Case(When(overdue, then=Value(True)), default=Value(False), output_field=BooleanField()),
+            overdue_days=Case(When(overdue, then=DaysBetween(today, 'due_date')), default=Value(0)),
+        )
+
 class Payment(models.Model):
     """
     Payments received from tenants.
@@ -33,6 +53,10 @@ class Payment(models.Model):
         ('declined', 'Declined'),
         ('refunded', 'Refunded'),
     )
+
+    # Statuses of payments still owed; the late fee job moves overdue
+    # pending payments to 'late'
+    OPEN_STATUSES = ('pending', 'late')
     
     PAYMENT_METHODS = (
         ('cash', 'Cash'),
@@ -58,22 +82,44 @@ class Payment(models.Model):
     notes = models.TextField(blank=True, null=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_payments')
     date_created = models.DateTimeField(default=timezone.now)
+    # Copy of rental_property.owner, so owner-scoped queries skip the property join
+    owner = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, editable=False, db_index=False, related_name='owned_payments'
+    )
     history = HistoricalRecords()
     
+    objects = PaymentQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-due_date', '-payment_date']
+        indexes = [
+            # Owner-scoped payment lists, income and upcoming and overdue payments (dashboard)
+            models.Index(fields=['owner', 'status', 'due_date'], name='payment_owner_status_due_idx'),
+            models.Index(fields=['owner', 'status', 'payment_date'], name='payment_owner_status_paid_idx'),
+            # Property-scoped income by payment date (ledger)
+            models.Index(fields=['rental_property', 'status', 'payment_date'], name='payment_prop_status_paid_idx'),
+            # Property-scoped upcoming and overdue payments
+            models.Index(fields=['rental_property', 'status', 'due_date'], name='payment_prop_status_due_idx'),
+            # Overdue payments across all owners
+            models.Index(fields=['status', 'due_date'], name='payment_status_due_idx'),
+        ]
     
     def __str__(self):
         return f"Payment of ${self.amount} - {self.tenant.full_name} - {self.rental_property.name}"
     
     @property
     def is_overdue(self):
+        # Use the value annotated by Payment.objects.with_overdue() when present
+        if hasattr(self, 'overdue'):
+            return self.overdue
         if self.status == 'paid' or not self.due_date:
             return False
         return self.due_date < timezone.now().date()
     
     @property
     def days_overdue(self):
+        if hasattr(self, 'overdue_days'):
+            return self.overdue_days
         if not self.is_overdue:
             return 0
         return (timezone.now().date() - self.due_date).days
@@ -95,3 +141,36 @@ class LateFee(models.Model):
     def __str__(self):
         status = "Waived" if self.waived else "Active"
         return f"Late Fee ${self.amount} for {self.payment} - {status}"
+
+class BankDeposit(models.Model):
+    """
+    A deposit read from a bank statement during reconciliation, with the
+    payment it was matched to or, when the match was not certain, the
+    candidate payments left for the owner to review.
+    """
+    STATUS_CHOICES = (
+        ('matched', 'Matched'),
+        ('review', 'Needs Review'),
+        ('unmatched', 'Unmatched'),
+        ('ignored', 'Ignored'),
+    )
+    
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bank_deposits')
+    date = models.DateField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    description = models.CharField(max_length=255, blank=True)
+    reference_number = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='review')
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name='bank_deposits')
+    candidates = models.ManyToManyField(Payment, blank=True, related_name='candidate_deposits')
+    date_created = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-date', '-id']
+        indexes = [
+            # Review queue
+            models.Index(fields=['owner', 'status', 'date'], name='deposit_owner_status_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Deposit of ${self.amount} on {self.date} - {self.get_status_display()}"
@@ -0,0 +1,311 @@
+"""
+Reconciliation of bank statements against open rent payments.
+
+The deposits of a statement file are matched to the owner's pending and
+late payments through an in-memory index built once per run: payments are
+keyed by reference number and by (amount, due date), so each deposit is
+matched with a few dictionary lookups instead of queries. A deposit is
+matched when its reference number, or its amount within the date window
+together with the tenant's name, points at exactly one payment; those
+payments are marked paid in bulk. Deposits with several or weaker
+candidates are kept for the owner to review.
+"""
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.urls import reverse
+from simple_history.utils import bulk_update_with_history
+from properties.models import Property
+from reports.ledger import rebuild_ledger
+from core.imports import normalize, read_rows
+from core.models import Notification
+from core.summary import schedule_summary_invalidation
+from .models import Payment, BankDeposit
+
+# Days a deposit may arrive before or after the due date of its payment
+DATE_WINDOW_DAYS = 5
+
+# Payments a deposit can settle
+OPEN_STATUSES = Payment.OPEN_STATUSES
+
+# Candidates kept for review per deposit
+MAX_CANDIDATES = 5
+
+# Row errors kept for the report; later errors are only counted
+MAX_REPORTED_ERRORS = 100
+
+# Accepted names of the statement columns, as written by common banks
+STATEMENT_COLUMNS = {
+    'date': ('date', 'posted_date', 'posting_date', 'transaction_date'),
+    'amount': ('amount', 'credit', 'deposit', 'deposits'),
+    'description': ('description', 'memo', 'details', 'payee', 'name'),
+    'reference': ('reference', 'reference_number', 'transaction_id', 'check_number'),
+}
+
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y')
+
+def statement_value(row, column):
+    """Return the value of the first of a column's accepted names present in ``row``."""
+    for name in STATEMENT_COLUMNS[column]:
+        if row.get(name) not in (None, ''):
+            return row[name]
+    return None
+
+def parse_date(value):
+    """Return a statement date as a date, or None if it cannot be read."""
+    if isinstance(value, datetime):
+        return value.date()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), date_format).date()
+        except ValueError:
+            pass
+    return None
+
+def parse_amount(value):
+    """Return a statement amount as a Decimal, or None if it cannot be read."""
+    if isinstance(value, (int, float)):
+        return Decimal(str(value)).quantize(Decimal('0.01'))
+    text = str(value).strip().replace('$', '').replace(',', '')
+    if text.startswith('(') and text.endswith(')'):
+        text = '-' + text[1:-1]
+    try:
+        return Decimal(text).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        return None
+
+def read_deposits(file, filename):
+    """
+    Read the deposits (positive amounts) of a CSV or Excel statement.
+
+    Returns the unsaved BankDeposits, the number of withdrawals skipped and
+    the errors of unreadable rows as ``{'row': number, 'errors': {column: message}}``.
+    Raises ValueError if the file cannot be read.
+    """
+    deposits, errors, withdrawals = [], [], 0
+    for number, row in read_rows(file, filename):
+        date_value = statement_value(row, 'date')
+        amount_value = statement_value(row, 'amount')
+        date, amount = parse_date(date_value), parse_amount(amount_value)
+
+        row_errors = {}
+        if date is None:
+            row_errors['date'] = f'Unreadable date "{date_value or ""}".'
+        if amount is None:
+            row_errors['amount'] = f'Unreadable amount "{amount_value or ""}".'
+        if row_errors:
+            errors.append({'row': number, 'errors': row_errors})
+            continue
+        if amount <= 0:
+            withdrawals += 1
+            continue
+
+        deposits.append(BankDeposit(
+            date=date,
+            amount=amount,
+            description=str(statement_value(row, 'description') or '').strip()[:255],
+            reference_number=str(statement_value(row, 'reference') or '').strip()[:100],
+        ))
+    return deposits, withdrawals, errors
+
+def deposit_key(date, amount, description, reference_number):
+    """Return what identifies a statement line, to skip lines reconciled before."""
+    return date, Decimal(amount), normalize(description), normalize(reference_number)
+
+def deposit_words(deposit):
+    """Return the lowercase words of a deposit's description and reference."""
+    return set(re.findall(r'\w+', f'{deposit.description} {deposit.reference_number}'.lower()))
+
+class PaymentIndex:
+    """
+    The owner's open payments due in a date range, indexed by reference
+    number and by (amount, due date), each loaded with one query.
+    """
+
+    def __init__(self, owner, start_date, end_date):
+        self.by_reference = defaultdict(list)
+        self.by_amount = defaultdict(list)
+        self.claimed = set()
+
+        payments = Payment.objects.filter(
+            owner=owner,
+            status__in=OPEN_STATUSES,
+            due_date__range=[start_date, end_date]
+        ).values('pk', 'amount', 'due_date', 'reference_number', 'tenant__last_name').order_by('due_date', 'pk')
+        for payment in payments.iterator():
+            payment['name_words'] = set(re.findall(r'\w+', (payment['tenant__last_name'] or '').lower()))
+            if payment['reference_number']:
+                self.by_reference[normalize(payment['reference_number'])].append(payment)
+            self.by_amount[payment['amount'], payment['due_date']].append(payment)
+
+    def open(self, payments):
+        return [payment for payment in payments if payment['pk'] not in self.claimed]
+
+    def with_reference(self, deposit, words):
+        """Return the open payments of the deposit's amount whose reference number it quotes."""
+        references = {normalize(deposit.reference_number)} | words
+        return [
+            payment
+            for reference in references if reference
+            for payment in self.open(self.by_reference.get(reference, []))
+            if payment['amount'] == deposit.amount
+        ]
+
+    def due_near(self, deposit, window):
+        """Return the open payments of the deposit's amount due within ``window`` days, closest first."""
+        payments = []
+        for offset in sorted(range(-window, window + 1), key=abs):
+            payments.extend(self.open(self.by_amount.get((deposit.amount, deposit.date + timedelta(days=offset)), [])))
+        return payments
+
+def match_deposit(deposit, index, window):
+    """
+    Return the status of a deposit and the payments it may settle: one
+    payment when 'matched', the candidates when 'review', none when
+    'unmatched'.
+    """
+    words = deposit_words(deposit)
+
+    by_reference = {payment['pk']: payment for payment in index.with_reference(deposit, words)}
+    if len(by_reference) == 1:
+        return 'matched', list(by_reference.values())
+
+    candidates = index.due_near(deposit, window)
+    named = [payment for payment in candidates if payment['name_words'] and payment['name_words'] <= words]
+    if len(named) == 1:
+        return 'matched', named
+    if named or candidates:
+        return 'review', (named or candidates)[:MAX_CANDIDATES]
+    return 'unmatched', []
+
+def mark_payments_paid(owner, paid_dates, batch_size=1000):
+    """
+    Mark the owner's payments with ids in ``paid_dates`` paid on the
+    mapped dates, with one bulk update and history insert per batch.
+
+    Returns the payments marked paid.
+    """
+    payments = list(Payment.objects.filter(
+        pk__in=list(paid_dates),
+        owner=owner
+    ).exclude(status='paid'))
+    if not payments:
+        return payments
+
+    dates = set()
+    for payment in payments:
+        dates.update(value for value in (payment.due_date, payment.payment_date) if value)
+        payment.status = 'paid'
+        payment.payment_date = paid_dates[payment.pk]
+        dates.add(payment.payment_date)
+
+    with transaction.atomic():
+        bulk_update_with_history(
+            payments, Payment, ['status', 'payment_date'], batch_size=batch_size, default_user=owner
+        )
+
+        # bulk_update skips the signals that keep the ledger and summaries up to date
+        rebuild_ledger(
+            Property.objects.filter(pk__in={payment.rental_property_id for payment in payments}),
+            batch_size=batch_size,
+            start_date=min(dates),
+            end_date=max(dates)
+        )
+        schedule_summary_invalidation([owner.pk])
+
+        total = sum(payment.amount for payment in payments)
+        Notification.objects.create(
+            user=owner,
+            notification_type='payment_received',
+            title=f'{len(payments)} Payments Reconciled',
+            message=f'Payments totalling ${total} were matched to bank deposits and marked as paid.',
+            related_link=reverse('payment_list')
+        )
+
+    return payments
+
+def reconcile_statement(owner, file, filename, window=DATE_WINDOW_DAYS, dry_run=False, batch_size=1000):
+    """
+    Match the deposits of a statement file to the owner's open payments.
+
+    Matched payments are marked paid, and every deposit is recorded with
+    its outcome so ambiguous ones can be reviewed and lines already
+    reconciled are skipped when a statement is uploaded again. With
+    ``dry_run`` nothing is written.
+
+    Returns a dict with the number of deposits per outcome, of duplicate
+    lines and withdrawals skipped, and the errors of unreadable rows.
+    Raises ValueError if the file cannot be read.
+    """
+    deposits, withdrawals, errors = read_deposits(file, filename)
+    result = {
+        'deposits': 0, 'matched': 0, 'review': 0, 'unmatched': 0, 'duplicates': 0,
+        'withdrawals': withdrawals, 'invalid': len(errors), 'errors': errors[:MAX_REPORTED_ERRORS],
+        'dry_run': dry_run,
+    }
+    if not deposits:
+        return result
+
+    start_date = min(deposit.date for deposit in deposits)
+    end_date = max(deposit.date for deposit in deposits)
+
+    # Each line recorded before accounts for one identical line of the file
+    recorded = Counter(
+        deposit_key(*values)
+        for values in BankDeposit.objects.filter(
+            owner=owner,
+            date__range=[start_date, end_date]
+        ).values_list('date', 'amount', 'description', 'reference_number').iterator()
+    )
+    new_deposits = []
+    for deposit in deposits:
+        key = deposit_key(deposit.date, deposit.amount, deposit.description, deposit.reference_number)
+        if recorded[key]:
+            recorded[key] -= 1
+            result['duplicates'] += 1
+        else:
+            new_deposits.append(deposit)
+
+    index = PaymentIndex(owner, start_date - timedelta(days=window), end_date + timedelta(days=window))
+    candidates, paid_dates = [], {}
+    for deposit in new_deposits:
+        deposit.owner = owner
+        deposit.status, payments = match_deposit(deposit, index, window)
+        if deposit.status == 'matched':
+            deposit.payment_id = payments[0]['pk']
+            paid_dates[deposit.payment_id] = deposit.date
+            index.claimed.add(deposit.payment_id)
+        candidates.append([payment['pk'] for payment in payments if deposit.status == 'review'])
+        result['deposits'] += 1
+        result[deposit.status] += 1
+
+    if dry_run:
+        return result
+
+    with transaction.atomic():
+        created = BankDeposit.objects.bulk_create(new_deposits, batch_size=batch_size)
+        BankDeposit.candidates.through.objects.bulk_create([
+            BankDeposit.candidates.through(bankdeposit_id=deposit.pk, payment_id=payment_id)
+            for deposit, payment_ids in zip(created, candidates)
+            for payment_id in payment_ids
+        ], batch_size=batch_size)
+        mark_payments_paid(owner, paid_dates, batch_size=batch_size)
+
+    return result
+
+def resolve_deposit(deposit, payment=None):
+    """
+    Settle a deposit under review: match it to ``payment`` (marking the
+    payment paid on the deposit date), or ignore it when no payment is given.
+    """
+    with transaction.atomic():
+        if payment is not None:
+            mark_payments_paid(deposit.owner, {payment.pk: deposit.date})
+            deposit.status = 'matched'
+        else:
+            deposit.status = 'ignored'
+        deposit.payment = payment
+        deposit.save(update_fields=['status', 'payment'])
+        deposit.candidates.clear()
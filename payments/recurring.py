@@ -0,0 +1,229 @@
+"""
+Set-based generation of recurring rent payments.
+
+Existing rent payments are fetched with one query per run, the missing
+(lease, month) pairs are computed in memory and inserted with
+``bulk_create`` together with their history rows, so a run costs the same
+handful of queries whether it covers ten leases or tens of thousands.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Q, F
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history
+from properties.models import Property
+from tenants.models import Lease
+from reports.ledger import month_start, month_end, rebuild_ledger
+from core.summary import schedule_summary_invalidation, property_owner_ids
+from .models import Payment, PaymentCategory
+
+def get_rent_category():
+    """Return the payment category used for rent, creating it if needed."""
+    rent_category, created = PaymentCategory.objects.get_or_create(
+        name='Rent',
+        defaults={'description': 'Monthly rent payment'}
+    )
+    return rent_category
+
+def active_leases(due_dates, owner=None, properties=None):
+    """
+    Return the active leases running on at least one of ``due_dates``,
+    optionally limited to an owner or to some properties.
+    """
+    running = Q()
+    for due_date in due_dates:
+        running |= Q(start_date__lte=due_date, end_date__gte=due_date)
+
+    leases = Lease.objects.filter(running, status='active')
+    if owner is not None:
+        leases = leases.filter(owner=owner)
+    if properties is not None:
+        leases = leases.filter(rental_property__in=properties)
+    return leases
+
+def existing_payment_keys(lease_ids, first_day, last_day):
+    """
+    Return the (lease id, property id, tenant id, month) keys of payments
+    already due between ``first_day`` and ``last_day`` for the given leases
+    (a list of ids or a ``values('pk')`` queryset).
+    """
+    rows = Payment.objects.filter(
+        lease__in=lease_ids,
+        due_date__range=[first_day, last_day]
+    ).values_list('lease_id', 'rental_property_id', 'tenant_id', 'due_date').order_by()
+    return {
+        (lease_id, property_id, tenant_id, month_start(due_date))
+        for lease_id, property_id, tenant_id, due_date in rows.iterator()
+    }
+
+def generate_rent_payments(due_dates, owner=None, properties=None, created_by=None, batch_size=1000):
+    """
+    Create the missing pending rent payments for every active lease.
+
+    A payment is created for each due date the lease is running on unless
+    the lease already has a payment due in that month. Payments are
+    recorded as created by ``created_by``, or by the property owner.
+    Returns the created payments.
+    """
+    due_dates = sorted(set(due_dates))
+    if not due_dates:
+        return []
+
+    first_day, last_day = month_start(due_dates[0]), month_end(due_dates[-1])
+    leases = active_leases(due_dates, owner=owner, properties=properties)
+
+    with transaction.atomic():
+        rent_category = get_rent_category()
+        existing = existing_payment_keys(leases.values('pk'), first_day, last_day)
+
+        payments = []
+        rows = leases.values_list(
+            'pk', 'rental_property_id', 'tenant_id', 'rent_amount', 'start_date', 'end_date',
+            'owner_id'
+        ).order_by('pk')
+        for lease_id, property_id, tenant_id, rent_amount, start_date, end_date, owner_id in rows.iterator():
+            for due_date in due_dates:
+                if not start_date <= due_date <= end_date:
+                    continue
+                if (lease_id, property_id, tenant_id, month_start(due_date)) in existing:
+                    continue
+
+                payments.append(Payment(
+                    rental_property_id=property_id,
+                    tenant_id=tenant_id,
+                    lease_id=lease_id,
+                    category=rent_category,
+                    amount=rent_amount,
+                    due_date=due_date,
+                    status='pending',
+                    created_by_id=created_by.pk if created_by else owner_id,
+                    owner_id=owner_id
+                ))
+
+        if payments:
+            bulk_create_with_history(payments, Payment, batch_size=batch_size, default_user=created_by)
+
+            # bulk_create skips the signals that keep the ledger and summaries up to date
+            properties = Property.objects.filter(pk__in=leases.values('rental_property'))
+            rebuild_ledger(properties, batch_size=batch_size, start_date=first_day, end_date=last_day)
+            schedule_summary_invalidation(property_owner_ids(properties.values('pk')))
+
+    return payments
+
+def rent_due_date(month, payment_day, start_date):
+    """
+    Return the rent due date of a lease in ``month``.
+
+    The payment day is capped at the length of the month, and rent for the
+    first month is never due before the lease starts.
+    """
+    due_date = month.replace(day=min(max(payment_day, 1), month_end(month).day))
+    return max(due_date, start_date)
+
+def rent_roll_leases(through, owner_id=None):
+    """
+    Return the active leases with rent left to generate up to ``through``.
+
+    Leases whose high-water mark already reaches ``through`` or their end
+    date are excluded, so a rerun only visits leases with new work.
+    """
+    through = month_end(through)
+    leases = Lease.objects.filter(status='active', start_date__lte=through).filter(
+        Q(rent_generated_through__isnull=True) |
+        Q(rent_generated_through__lt=through) & Q(rent_generated_through__lt=F('end_date'))
+    )
+    if owner_id is not None:
+        leases = leases.filter(owner_id=owner_id)
+    return leases
+
+def _generate_rent_roll_chunk(leases, rent_category, through, since, batch_size):
+    """
+    Create the rent payments of one chunk of lease rows and move their
+    high-water marks, in a single transaction.
+
+    Returns the number of payments created.
+    """
+    with transaction.atomic():
+        first_months = {}
+        for lease_id, *_, start_date, end_date, generated_through, owner_id in leases:
+            if generated_through:
+                first_months[lease_id] = month_start(generated_through + timedelta(days=1))
+            else:
+                first_months[lease_id] = max(since, month_start(start_date))
+
+        first_day = min(first_months.values())
+        existing = existing_payment_keys(list(first_months), first_day, through)
+
+        payments = []
+        marks = defaultdict(list)
+        for lease in leases:
+            lease_id, property_id, tenant_id, rent_amount, payment_day, start_date, end_date, _, owner_id = lease
+            last_month = month_start(min(through, end_date))
+
+            month = first_months[lease_id]
+            while month <= last_month:
+                due_date = rent_due_date(month, payment_day, start_date)
+                if due_date <= end_date and (lease_id, property_id, tenant_id, month) not in existing:
+                    payments.append(Payment(
+                        rental_property_id=property_id,
+                        tenant_id=tenant_id,
+                        lease_id=lease_id,
+                        category=rent_category,
+                        amount=rent_amount,
+                        due_date=due_date,
+                        status='pending',
+                        created_by_id=owner_id,
+                        owner_id=owner_id
+                    ))
+                month += relativedelta(months=1)
+
+            marks[min(through, month_end(end_date))].append(lease_id)
+
+        bulk_create_with_history(payments, Payment, batch_size=batch_size)
+        for generated_through, lease_ids in marks.items():
+            Lease.objects.filter(pk__in=lease_ids).update(rent_generated_through=generated_through)
+
+        if payments:
+            # bulk_create skips the signals that keep the ledger and summaries up to date
+            property_ids = {payment.rental_property_id for payment in payments}
+            rebuild_ledger(
+                Property.objects.filter(pk__in=property_ids),
+                batch_size=batch_size,
+                start_date=first_day,
+                end_date=through
+            )
+            schedule_summary_invalidation({owner_id for *_, owner_id in leases})
+
+    return len(payments)
+
+def generate_rent_roll(through, since=None, owner_id=None, batch_size=1000):
+    """
+    Create the pending rent payments of every active lease up to the month
+    of ``through``, ``batch_size`` leases per transaction.
+
+    Each lease remembers the last day its rent was generated for, so a
+    rerun continues where the previous one stopped. Leases seen for the
+    first time start in the month of ``since`` (default: this month) or
+    their start month, whichever is later; earlier months are not
+    back-filled. Months that already have a payment are skipped.
+    Returns the number of payments created.
+    """
+    through = month_end(through)
+    since = month_start(since or timezone.now().date())
+    rent_category = get_rent_category()
+    leases = rent_roll_leases(through, owner_id=owner_id).order_by('pk')
+
+    created = 0
+    last_pk = 0
+    while True:
+        chunk = list(leases.filter(pk__gt=last_pk).values_list(
+            'pk', 'rental_property_id', 'tenant_id', 'rent_amount', 'payment_day', 'start_date', 'end_date',
+            'rent_generated_through', 'owner_id'
+        )[:batch_size])
+        if not chunk:
+            return created
+
+        created += _generate_rent_roll_chunk(chunk, rent_category, through, since, batch_size)
+        last_pk = chunk[-1][0]
@@ -0,0 +1,30 @@
+"""
+API serializers for the payments app.
+"""
+from rest_framework import serializers
+from core.api import OwnerScopedSerializer
+from .models import Payment, LateFee
+
+class PaymentSerializer(OwnerScopedSerializer):
+    property_name = serializers.CharField(source='rental_property.name', read_only=True)
+    tenant_name = serializers.CharField(source='tenant.full_name', read_only=True)
+    category_name = serializers.CharField(source='category.name', read_only=True, allow_null=True)
+    late_fees = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    
+    class Meta:
+        model = Payment
+        fields = [
+            'id', 'rental_property', 'property_name', 'tenant', 'tenant_name', 'lease', 'category',
+            'category_name', 'amount', 'due_date', 'payment_date', 'payment_method', 'reference_number',
+            'status', 'notes', 'late_fees', 'created_by', 'date_created',
+        ]
+        read_only_fields = ['created_by', 'date_created']
+
+class LateFeeSerializer(OwnerScopedSerializer):
+    class Meta:
+        model = LateFee
+        fields = [
+            'id', 'payment', 'amount', 'date_applied', 'reason', 'waived', 'waived_by', 'waived_date',
+            'waived_reason', 'created_by',
+        ]
+        read_only_fields = ['waived_by', 'created_by']
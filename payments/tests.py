@@ -0,0 +1,525 @@
+"""
+Tests for the payments app.
+"""
+import tempfile
+from io import BytesIO, StringIO
+from django.test import TestCase, Client
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from datetime import date, timedelta
+from django.db.models import Max
+from django.utils import timezone
+from decimal import Decimal
+from properties.models import Property, PropertyType
+from tenants.models import Tenant, Lease
+from reports.models import MonthlyPropertyLedger
+from core.models import Notification
+from core.summary import payment_summary
+from .models import Payment, PaymentCategory, LateFee, BankDeposit
+from .late_fees import assess_late_fees, late_fee_candidates, _assess_chunk
+from .reconciliation import reconcile_statement
+from core.pagination import KeysetPaginator
+from .recurring import generate_rent_payments, generate_rent_roll, rent_roll_leases
+
+class PaymentTestMixin:
+    """Common fixtures for payment tests."""
+
+    def setUp(self):
+        # Create a user and login
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+
+        # Create a property
+        self.property = Property.objects.create(
+            owner=self.user,
+            property_type=PropertyType.objects.create(name='Apartment'),
+            name='Test Property',
+            address='123 Test St',
+            city='Test City',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00')
+        )
+
+        # Create a tenant
+        self.tenant = Tenant.objects.create(
+            first_name='John',
+            last_name='Doe',
+            email='john.doe@example.com',
+            phone='555-123-4567',
+            created_by=self.user
+        )
+
+        # Create a lease
+        self.lease = Lease.objects.create(
+            rental_property=self.property,
+            tenant=self.tenant,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            rent_amount=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00'),
+            status='active',
+            created_by=self.user
+        )
+
+        self.category = PaymentCategory.objects.create(name='Rent')
+
+class PaymentExportTests(PaymentTestMixin, TestCase):
+    """Tests for the payment CSV export."""
+
+    def test_export_payments_streams_csv(self):
+        """Test that payments are exported as a streamed CSV."""
+        Payment.objects.create(
+            rental_property=self.property,
+            tenant=self.tenant,
+            lease=self.lease,
+            category=self.category,
+            amount=Decimal('1000.00'),
+            due_date=date(2024, 3, 1),
+            payment_date=date(2024, 3, 2),
+            payment_method='bank_transfer',
+            reference_number='REF-1',
+            status='paid',
+            created_by=self.user
+        )
+
+        response = self.client.get(reverse('export_payments'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Property,Tenant,Category,Amount,Due Date,Payment Date,Status,Payment Method,Reference Number')
+        self.assertEqual(lines[1], 'Test Property,John Doe,Rent,1000.00,2024-03-01,2024-03-02,Paid,Bank Transfer,REF-1')
+
+class RecurringPaymentTests(PaymentTestMixin, TestCase):
+    """Tests for the set-based recurring rent generation."""
+
+    def add_lease(self, number):
+        """Create another active lease on a new property."""
+        rental_property = Property.objects.create(
+            owner=self.user,
+            property_type=self.property.property_type,
+            name=f'Property {number}',
+            address=f'{number} Test St',
+            city='Test City',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('800.00'),
+            security_deposit=Decimal('800.00')
+        )
+        return Lease.objects.create(
+            rental_property=rental_property,
+            tenant=self.tenant,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            rent_amount=Decimal('800.00'),
+            security_deposit=Decimal('800.00'),
+            status='active',
+            created_by=self.user
+        )
+
+    def test_view_creates_missing_payments(self):
+        """Test that the view creates one payment per lease and month only once."""
+        data = {'properties': [self.property.pk], 'due_date': '2024-05-01'}
+        self.client.post(reverse('create_recurring_payments'), data)
+        self.client.post(reverse('create_recurring_payments'), data)
+
+        payment = Payment.objects.get()
+        self.assertEqual(payment.lease, self.lease)
+        self.assertEqual(payment.amount, Decimal('1000.00'))
+        self.assertEqual(payment.status, 'pending')
+        self.assertEqual(payment.category.name, 'Rent')
+        self.assertEqual(payment.created_by, self.user)
+        self.assertEqual(payment.history.get().history_user, self.user)
+
+        ledger = MonthlyPropertyLedger.objects.get(rental_property=self.property, month=date(2024, 5, 1))
+        self.assertEqual(ledger.pending_count, 1)
+
+    def test_existing_payment_in_month_is_kept(self):
+        """Test that a lease with a payment due in the month is skipped."""
+        Payment.objects.create(
+            rental_property=self.property,
+            tenant=self.tenant,
+            lease=self.lease,
+            category=self.category,
+            amount=Decimal('1000.00'),
+            due_date=date(2024, 5, 3),
+            created_by=self.user
+        )
+        other_lease = self.add_lease(1)
+
+        created = generate_rent_payments([date(2024, 5, 1)])
+
+        self.assertEqual([payment.lease for payment in created], [other_lease])
+
+    def test_query_count_does_not_grow_with_leases(self):
+        """Test that generation runs a fixed number of queries."""
+        self.add_lease(1)
+        with CaptureQueriesContext(connection) as few:
+            generate_rent_payments([date(2024, 3, 1)])
+
+        for number in range(2, 12):
+            self.add_lease(number)
+        with CaptureQueriesContext(connection) as many:
+            created = generate_rent_payments([date(2024, 4, 1)])
+
+        self.assertEqual(len(created), 12)
+        self.assertEqual(len(many), len(few))
+
+    def test_command_generates_several_months(self):
+        """Test that the command stops at the end of each lease."""
+        stdout = StringIO()
+        call_command('generate_rent_payments', due_date='2024-11-01', months=3, stdout=stdout)
+
+        due_dates = list(Payment.objects.order_by('due_date').values_list('due_date', flat=True))
+        self.assertEqual(due_dates, [date(2024, 11, 1), date(2024, 12, 1)])
+        self.assertIn('Created 2 rent payments', stdout.getvalue())
+
+class RentRollTests(PaymentTestMixin, TestCase):
+    """Tests for the rent roll generator and its high-water mark."""
+
+    def due_dates(self):
+        return list(Payment.objects.order_by('due_date').values_list('due_date', flat=True))
+
+    def test_generates_months_up_to_through(self):
+        """Test that rent is due on the payment day, capped at the month end."""
+        self.lease.payment_day = 31
+        self.lease.save()
+
+        created = generate_rent_roll(date(2024, 4, 1), since=date(2024, 1, 1))
+
+        self.assertEqual(created, 4)
+        self.assertEqual(self.due_dates(), [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)])
+        self.lease.refresh_from_db()
+        self.assertEqual(self.lease.rent_generated_through, date(2024, 4, 30))
+        self.assertEqual(MonthlyPropertyLedger.objects.filter(rental_property=self.property).count(), 4)
+
+    def test_rerun_continues_from_high_water_mark(self):
+        """Test that reruns only create the months added since the last run."""
+        generate_rent_roll(date(2024, 2, 1), since=date(2024, 1, 1))
+        self.assertEqual(generate_rent_roll(date(2024, 2, 1), since=date(2024, 1, 1)), 0)
+
+        with CaptureQueriesContext(connection) as queries:
+            generate_rent_roll(date(2024, 2, 1))
+        self.assertEqual(len(queries), 2)
+
+        self.assertEqual(generate_rent_roll(date(2025, 6, 1)), 10)
+        self.assertEqual(self.due_dates()[-1], date(2024, 12, 1))
+        self.assertFalse(rent_roll_leases(date(2025, 6, 1)).exists())
+
+    def test_skips_months_with_payments(self):
+        """Test that months paid through another path are not duplicated."""
+        Payment.objects.create(
+            rental_property=self.property,
+            tenant=self.tenant,
+            lease=self.lease,
+            category=self.category,
+            amount=Decimal('1000.00'),
+            due_date=date(2024, 2, 5),
+            created_by=self.user
+        )
+
+        self.assertEqual(generate_rent_roll(date(2024, 3, 1), since=date(2024, 1, 1)), 2)
+        self.assertEqual(self.due_dates(), [date(2024, 1, 1), date(2024, 2, 5), date(2024, 3, 1)])
+
+    def test_command(self):
+        """Test that the command generates the rent roll through a month."""
+        stdout = StringIO()
+        call_command('generate_rent_roll', through='2024-03', since='2024-02', stdout=stdout)
+
+        self.assertEqual(self.due_dates(), [date(2024, 2, 1), date(2024, 3, 1)])
+        self.assertIn('Created 2 rent payments through 2024-03', stdout.getvalue())
+
+class LateFeeAssessmentTests(PaymentTestMixin, TestCase):
+    """Tests for the batch late fee engine."""
+
+    def setUp(self):
+        super().setUp()
+        self.lease.late_fee = Decimal('50.00')
+        self.lease.grace_period = 5
+        self.lease.save()
+
+    def create_payment(self, due_date, **kwargs):
+        return Payment.objects.create(
+            rental_property=self.property,
+            tenant=self.tenant,
+            lease=self.lease,
+            category=self.category,
+            amount=Decimal('1000.00'),
+            due_date=due_date,
+            created_by=self.user,
+            **kwargs
+        )
+
+    def test_payments_past_grace_period_are_charged(self):
+        """Test that only pending payments past their grace period become late."""
+        overdue = self.create_payment(date(2024, 3, 1))
+        in_grace = self.create_payment(date(2024, 3, 3))
+        paid = self.create_payment(date(2024, 2, 1), status='paid', payment_date=date(2024, 2, 1))
+        self.assertEqual(list(late_fee_candidates(date(2024, 3, 7))), [overdue])
+
+        counts = assess_late_fees(as_of=date(2024, 3, 7))
+
+        self.assertEqual(counts, {'late_payments': 1, 'late_fees': 1})
+        overdue.refresh_from_db()
+        in_grace.refresh_from_db()
+        paid.refresh_from_db()
+        self.assertEqual((overdue.status, in_grace.status, paid.status), ('late', 'pending', 'paid'))
+        self.assertEqual(overdue.late_fees.get().amount, Decimal('50.00'))
+        self.assertEqual(overdue.history.first().status, 'late')
+
+        ledger = MonthlyPropertyLedger.objects.get(rental_property=self.property, month=date(2024, 3, 1))
+        self.assertEqual((ledger.late_count, ledger.pending_count), (1, 1))
+
+        # Late payments are still owed
+        summary = payment_summary(self.user, date(2024, 3, 7))
+        self.assertEqual((summary['overdue_payments'], summary['pending_amount']), (2, Decimal('2000.00')))
+
+        # A second run has nothing left to do
+        self.assertEqual(assess_late_fees(as_of=date(2024, 3, 7)), {'late_payments': 0, 'late_fees': 0})
+
+    def test_manual_fee_is_not_duplicated(self):
+        """Test that payments charged by hand are marked late without a second fee."""
+        payment = self.create_payment(date(2024, 3, 1))
+        LateFee.objects.create(payment=payment, amount=Decimal('25.00'), created_by=self.user)
+
+        counts = assess_late_fees(as_of=date(2024, 4, 1))
+
+        self.assertEqual(counts, {'late_payments': 1, 'late_fees': 0})
+        self.assertEqual(payment.late_fees.count(), 1)
+
+    def test_payment_paid_after_read_is_skipped(self):
+        """Test that a payment paid between reading and writing a chunk is not charged."""
+        paid = self.create_payment(date(2024, 3, 1))
+        overdue = self.create_payment(date(2024, 3, 2))
+        chunk = list(late_fee_candidates(date(2024, 4, 1)).order_by('pk'))
+
+        Payment.objects.filter(pk=paid.pk).update(status='paid', payment_date=date(2024, 3, 30))
+        history_rows = paid.history.count()
+
+        self.assertEqual(_assess_chunk(chunk, date(2024, 4, 1), 1000), (1, 1))
+        self.assertEqual(paid.history.count(), history_rows)
+        self.assertFalse(paid.late_fees.exists())
+        self.assertEqual(overdue.late_fees.count(), 1)
+
+    def test_command(self):
+        """Test that the command reports what it assessed."""
+        self.create_payment(date(2024, 3, 1))
+        stdout = StringIO()
+        call_command('assess_late_fees', as_of='2024-04-01', stdout=stdout)
+
+        self.assertIn('Marked 1 payments late and created 1 late fees.', stdout.getvalue())
+
+class ReconciliationTests(PaymentTestMixin, TestCase):
+    """Tests for matching bank statement deposits to open payments."""
+
+    def setUp(self):
+        super().setUp()
+        self.other_tenant = Tenant.objects.create(
+            first_name='Jane',
+            last_name='Smith',
+            email='jane.smith@example.com',
+            phone='555-987-6543',
+            created_by=self.user
+        )
+        Lease.objects.create(
+            rental_property=self.property,
+            tenant=self.other_tenant,
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31),
+            rent_amount=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00'),
+            status='active',
+            created_by=self.user
+        )
+        self.john_rent = self.create_payment(self.tenant, date(2024, 3, 1))
+        self.jane_rent = self.create_payment(self.other_tenant, date(2024, 3, 1))
+        self.invoice = self.create_payment(self.tenant, date(2024, 4, 5), amount=Decimal('750.00'),
+                                           reference_number='INV-42', status='late')
+
+    def create_payment(self, tenant, due_date, **kwargs):
+        return Payment.objects.create(**dict({
+            'rental_property': self.property,
+            'tenant': tenant,
+            'category': self.category,
+            'amount': Decimal('1000.00'),
+            'due_date': due_date,
+            'created_by': self.user,
+        }, **kwargs))
+
+    def statement(self, lines):
+        return BytesIO(('Date,Description,Amount,Reference\n' + '\n'.join(lines)).encode())
+
+    STATEMENT = [
+        '2024-03-02,ZELLE FROM JOHN DOE,1000.00,',
+        '03/03/2024,MOBILE DEPOSIT,"$1,000.00",',
+        '2024-04-01,TRANSFER,750.00,inv-42',
+        '2024-03-10,ATM WITHDRAWAL,-200.00,',
+        '2024-03-11,INTEREST,0.50,',
+        'yesterday,CHECK,100.00,',
+    ]
+
+    def test_reconcile_statement(self):
+        """Test that certain matches are paid and the others are kept for review."""
+        result = reconcile_statement(self.user, self.statement(self.STATEMENT), 'statement.csv')
+
+        self.assertEqual(
+            [result[key] for key in ('deposits', 'matched', 'review', 'unmatched', 'withdrawals', 'invalid')],
+            [4, 2, 1, 1, 1, 1]
+        )
+        self.assertEqual(result['errors'], [{'row': 7, 'errors': {'date': 'Unreadable date "yesterday".'}}])
+
+        # Matched by tenant name and by reference number
+        self.john_rent.refresh_from_db()
+        self.invoice.refresh_from_db()
+        self.assertEqual((self.john_rent.status, self.john_rent.payment_date), ('paid', date(2024, 3, 2)))
+        self.assertEqual((self.invoice.status, self.invoice.payment_date), ('paid', date(2024, 4, 1)))
+        self.assertEqual(self.john_rent.history.first().status, 'paid')
+
+        # The second deposit of the same amount does not name a tenant
+        self.jane_rent.refresh_from_db()
+        self.assertEqual(self.jane_rent.status, 'pending')
+        deposit = BankDeposit.objects.get(status='review')
+        self.assertEqual(list(deposit.candidates.all()), [self.jane_rent])
+        self.assertEqual(BankDeposit.objects.get(payment=self.john_rent).description, 'ZELLE FROM JOHN DOE')
+
+        ledger = MonthlyPropertyLedger.objects.get(rental_property=self.property, month=date(2024, 3, 1))
+        self.assertEqual((ledger.income, ledger.paid_count, ledger.pending_count), (Decimal('1000.00'), 1, 1))
+        self.assertEqual(Notification.objects.get(user=self.user).title, '2 Payments Reconciled')
+
+        # Lines already reconciled are skipped when the statement is uploaded again
+        result = reconcile_statement(self.user, self.statement(self.STATEMENT), 'statement.csv')
+        self.assertEqual((result['deposits'], result['duplicates']), (0, 4))
+
+    def test_dry_run(self):
+        """Test that a dry run reports the matches without recording them."""
+        result = reconcile_statement(self.user, self.statement(self.STATEMENT), 'statement.csv', dry_run=True)
+
+        self.assertEqual((result['matched'], result['review']), (2, 1))
+        self.assertFalse(BankDeposit.objects.exists())
+        self.assertFalse(Payment.objects.filter(status='paid').exists())
+
+    def test_queries_do_not_grow_with_deposits(self):
+        """Test that deposits are matched in memory and written in bulk."""
+        for month in range(4, 13):
+            self.create_payment(self.tenant, date(2024, month, 1))
+        lines = [f'2024-{month:02d}-01,DOE RENT,1000.00,' for month in range(3, 13)]
+
+        with CaptureQueriesContext(connection) as one:
+            reconcile_statement(self.user, self.statement(lines[:1]), 'statement.csv')
+        with CaptureQueriesContext(connection) as many:
+            result = reconcile_statement(self.user, self.statement(lines[1:]), 'statement.csv')
+
+        self.assertEqual(result['matched'], 9)
+        self.assertEqual(len(many), len(one))
+
+    def test_review_views(self):
+        """Test uploading a statement and settling the deposits left for review."""
+        upload = SimpleUploadedFile('statement.csv', self.statement(self.STATEMENT).getvalue())
+        response = self.client.post(reverse('reconcile_payments'), {'file': upload, 'date_window': 5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result']['matched'], 2)
+
+        response = self.client.get(reverse('deposit_review'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['deposits']), 2)
+
+        deposit = BankDeposit.objects.get(status='review')
+        self.client.post(reverse('resolve_bank_deposit', args=[deposit.pk]), {'payment': self.jane_rent.pk})
+        deposit.refresh_from_db()
+        self.jane_rent.refresh_from_db()
+        self.assertEqual((deposit.status, deposit.payment), ('matched', self.jane_rent))
+        self.assertEqual((self.jane_rent.status, self.jane_rent.payment_date), ('paid', date(2024, 3, 3)))
+
+        unmatched = BankDeposit.objects.get(status='unmatched')
+        self.client.post(reverse('resolve_bank_deposit', args=[unmatched.pk]), {'ignore': '1'})
+        unmatched.refresh_from_db()
+        self.assertEqual(unmatched.status, 'ignored')
+
+    def test_command(self):
+        """Test that the command reports the outcome of each deposit."""
+        with tempfile.NamedTemporaryFile(suffix='.csv') as file:
+            file.write(self.statement(self.STATEMENT).getvalue())
+            file.flush()
+            stdout, stderr = StringIO(), StringIO()
+            call_command('reconcile_statement', file.name, owner='testuser', stdout=stdout, stderr=stderr)
+
+        self.assertIn('4 new deposits: 2 matched, 1 to review, 1 unmatched', stdout.getvalue())
+        self.assertIn('Row 7, date', stderr.getvalue())
+
+class OverdueAnnotationTests(PaymentTestMixin, TestCase):
+    """Tests for computing overdue status and days in SQL."""
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.now().date()
+        for due_days_ago, status in [(10, 'pending'), (3, 'late'), (20, 'paid'), (-5, 'pending'), (None, 'pending')]:
+            Payment.objects.create(
+                rental_property=self.property,
+                tenant=self.tenant,
+                amount=Decimal('1000.00'),
+                due_date=self.today - timedelta(days=due_days_ago) if due_days_ago is not None else None,
+                payment_date=self.today if status == 'paid' else None,
+                status=status,
+                created_by=self.user
+            )
+
+    def test_annotations_match_properties(self):
+        """Test that the annotated values equal the Python properties."""
+        payments = list(Payment.objects.with_overdue().order_by('pk'))
+        plain = list(Payment.objects.order_by('pk'))
+
+        self.assertEqual(
+            [(payment.overdue, payment.overdue_days) for payment in payments],
+            [(payment.is_overdue, payment.days_overdue) for payment in plain]
+        )
+        self.assertEqual([payment.overdue_days for payment in payments], [10, 3, 0, 0, 0])
+
+        # The properties reuse the annotation, here computed for a later day
+        later = Payment.objects.with_overdue(self.today + timedelta(days=30)).get(due_date=self.today + timedelta(days=5))
+        self.assertEqual((later.is_overdue, later.days_overdue), (True, 25))
+
+    def test_filter_order_and_aggregate(self):
+        """Test that overdue payments can be filtered, sorted and aggregated in the database."""
+        payments = Payment.objects.with_overdue()
+
+        self.assertEqual(payments.filter(overdue=True).count(), 2)
+        self.assertEqual(payments.order_by('-overdue_days').first().overdue_days, 10)
+        self.assertEqual(payments.aggregate(longest=Max('overdue_days'))['longest'], 10)
+        self.assertEqual(payments.filter(overdue_days__gt=5).get().status, 'pending')
+
+        # Keyset pages can be sorted by an annotation
+        paginator = KeysetPaginator(payments.order_by('-overdue_days'), 2)
+        first_page = paginator.page()
+        second_page = paginator.page(first_page.next_cursor)
+        self.assertEqual([payment.overdue_days for payment in first_page], [10, 3])
+        self.assertEqual([payment.overdue_days for payment in second_page], [0, 0])
+
+    def test_payment_list_overdue_filter(self):
+        """Test filtering the payment list to overdue payments, most overdue first."""
+        response = self.client.get(reverse('payment_list'), {'status': 'overdue', 'sort_by': '-overdue_days'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([payment.days_overdue for payment in response.context['payments']], [10, 3])
+
+    def test_payment_list_queries_do_not_grow_with_rows(self):
+        """Test that the property, tenant and category of each row are joined in."""
+        self.client.get(reverse('payment_list'))
+        with CaptureQueriesContext(connection) as one:
+            response = self.client.get(reverse('payment_list'), {'status': 'paid'})
+        self.assertEqual(len(response.context['payments']), 1)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(reverse('payment_list'))
+        self.assertEqual(len(response.context['payments']), 5)
+
+        self.assertEqual(len(many), len(one))
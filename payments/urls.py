@@ -4,10 +4,11 @@ URL Configuration for the payments app.
 from django.urls import path
 from django.contrib.auth.decorators import login_required
 from . import views
+from core.views import import_records
 
 @login_required
 def payment_debug(request):
-    queryset = Payment.objects.filter(rental_property__owner=request.user)
+    queryset = Payment.objects.filter(owner=request.user)
     form = PaymentFilterForm(request.GET or None, user=request.user)
     all_tenants = Tenant.objects.filter(leases__property__owner=request.user).distinct()
     
@@ -44,6 +45,12 @@ urlpatterns = [
     # Batch operations
     path('create-recurring/', views.create_recurring_payments, name='create_recurring_payments'),
     path('export/', views.export_payments, name='export_payments'),
+    path('import/', import_records, {'kind': 'payments'}, name='import_payments'),
+    
+    # Bank reconciliation
+    path('reconcile/', views.reconcile_payments, name='reconcile_payments'),
+    path('reconcile/review/', views.deposit_review, name='deposit_review'),
+    path('reconcile/<int:pk>/resolve/', views.resolve_bank_deposit, name='resolve_bank_deposit'),
     path('debug/', views.payment_debug, name='payment_debug'),
     path('emergency-debug/', views.payment_emergency_debug, name='payment_emergency_debug'),
 ]
@@ -13,16 +13,21 @@ from django.utils import timezone
 from django.http import HttpResponse
 from django.http import HttpResponse
 from django.contrib.auth.decorators import login_required
-import csv
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 from .models import Payment, PaymentCategory, LateFee
-from .forms import PaymentForm, PaymentCategoryForm, LateFeeForm, WaiveLateFeeForm, PaymentFilterForm
+from .forms import PaymentForm, PaymentCategoryForm, LateFeeForm, WaiveLateFeeForm, PaymentFilterForm, ReconciliationForm
 from properties.models import Property
-from tenants.models import Tenant, Lease
+from tenants.models import Tenant, Lease, owner_tenants
 from core.models import Notification
+from core.exports import stream_csv, EXPORT_CHUNK_SIZE
+from core.summary import get_owner_summary
+from core.pagination import KeysetPaginationMixin
+from .recurring import generate_rent_payments
+from .reconciliation import OPEN_STATUSES, reconcile_statement, resolve_deposit
+from .models import BankDeposit
 
-class PaymentListView(LoginRequiredMixin, ListView):
+class PaymentListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """
     Display a list of payments with filtering options.
     """
@@ -33,7 +38,11 @@ class PaymentListView(LoginRequiredMixin, ListView):
     
     def get_queryset(self):
         """Filter payments based on query parameters."""
-        queryset = Payment.objects.filter(rental_property__owner=self.request.user)
+        # Overdue status and days are computed in SQL to filter and sort on;
+        # the related rows shown on each line are joined in
+        queryset = Payment.objects.with_overdue().filter(owner=self.request.user).select_related(
+            'rental_property', 'tenant', 'category'
+        )
         
         # Get filter form
         self.form = PaymentFilterForm(self.request.GET or None, user=self.request.user)
@@ -63,7 +72,9 @@ class PaymentListView(LoginRequiredMixin, ListView):
             if data.get('max_amount'):
                 queryset = queryset.filter(amount__lte=data['max_amount'])
             
-            if data.get('status'):
+            if data.get('status') == 'overdue':
+                queryset = queryset.filter(overdue=True)
+            elif data.get('status'):
                 queryset = queryset.filter(status=data['status'])
             
             # Sort results - make sure we only sort by valid fields
@@ -82,35 +93,11 @@ class PaymentListView(LoginRequiredMixin, ListView):
         # Add filter form to context
         context['form'] = self.form
         
-        # Get user payments for statistics
-        all_user_payments = Payment.objects.filter(rental_property__owner=self.request.user)
-        
-        # Total collected
-        context['total_collected'] = all_user_payments.filter(status='paid').aggregate(total=models.Sum('amount'))['total'] or 0
-        
-        # Pending amount
-        context['pending_amount'] = all_user_payments.filter(status='pending').aggregate(total=models.Sum('amount'))['total'] or 0
-        
-        # Overdue payments
-        today = timezone.now().date()
-        overdue_payments = all_user_payments.filter(
-            status='pending',
-            due_date__lt=today
-        )
-        context['overdue_payments'] = overdue_payments.count()
-        context['overdue_amount'] = overdue_payments.aggregate(total=models.Sum('amount'))['total'] or 0
-        
-        # This month's income
-        start_of_month = today.replace(day=1)
-        end_of_month = (start_of_month + relativedelta(months=1)) - timedelta(days=1)
-        
-        context['month_income'] = all_user_payments.filter(
-            status='paid',
-            payment_date__range=[start_of_month, end_of_month]
-        ).aggregate(total=models.Sum('amount'))['total'] or 0
+        # Add owner-wide payment totals (collected, pending, overdue, this month)
+        context.update(get_owner_summary(self.request.user, 'payments'))
         
         # Add today's date for comparing due dates
-        context['today'] = today
+        context['today'] = timezone.now().date()
         
         return context
 
@@ -124,7 +111,7 @@ class PaymentDetailView(LoginRequiredMixin, DetailView):
     
     def get_queryset(self):
         """Ensure user can only view their own payments."""
-        return Payment.objects.filter(rental_property__owner=self.request.user)
+        return Payment.objects.filter(owner=self.request.user)
     
     def get_context_data(self, **kwargs):
         """Add additional context data."""
@@ -254,7 +241,7 @@ class PaymentUpdateView(LoginRequiredMixin, UpdateView):
     
     def get_queryset(self):
         """Ensure user can only update their own payments."""
-        return Payment.objects.filter(rental_property__owner=self.request.user)
+        return Payment.objects.filter(owner=self.request.user)
     
     def get_form_kwargs(self):
         """Pass the current user to the form."""
@@ -304,7 +291,7 @@ class PaymentDeleteView(LoginRequiredMixin, DeleteView):
     
     def get_queryset(self):
         """Ensure user can only delete their own payments."""
-        return Payment.objects.filter(rental_property__owner=self.request.user)
+        return Payment.objects.filter(owner=self.request.user)
     
     def delete(self, request, *args, **kwargs):
         """Handle payment deletion."""
@@ -316,7 +303,7 @@ def mark_payment_as_paid(request, pk):
     """
     Mark a pending payment as paid.
     """
-    payment = get_object_or_404(Payment, pk=pk, rental_property__owner=request.user)
+    payment = get_object_or_404(Payment, pk=pk, owner=request.user)
     
     if payment.status != 'paid':
         payment.status = 'paid'
@@ -343,7 +330,7 @@ def add_late_fee(request, pk):
     """
     Add a late fee to a payment.
     """
-    payment = get_object_or_404(Payment, pk=pk, rental_property__owner=request.user)
+    payment = get_object_or_404(Payment, pk=pk, owner=request.user)
     
     if request.method == 'POST':
         form = LateFeeForm(request.POST)
@@ -364,7 +351,7 @@ def waive_late_fee(request, pk):
     """
     Waive a late fee.
     """
-    late_fee = get_object_or_404(LateFee, pk=pk, payment__rental_property__owner=request.user)
+    late_fee = get_object_or_404(LateFee, pk=pk, payment__owner=request.user)
     
     if request.method == 'POST':
         form = WaiveLateFeeForm(request.POST, instance=late_fee)
@@ -457,45 +444,13 @@ def create_recurring_payments(request):
             messages.error(request, 'Invalid date format.')
             return redirect('payment_list')
         
-        # Get active leases for selected properties
-        active_leases = Lease.objects.filter(
-            rental_property_id__in=properties,
-            rental_property__owner=request.user,
-            status='active',
-            start_date__lte=timezone.now().date(),
-            end_date__gte=timezone.now().date()
-        )
-        
-        # Get rent payment category
-        rent_category, created = PaymentCategory.objects.get_or_create(
-            name='Rent',
-            defaults={'description': 'Monthly rent payment'}
-        )
-        
-        # Create payments
-        payments_created = 0
-        for lease in active_leases:
-            # Check if a payment already exists for this month and lease
-            existing_payment = Payment.objects.filter(
-                lease=lease,
-                rental_property=lease.rental_property,
-                tenant=lease.tenant,
-                due_date__year=due_date.year,
-                due_date__month=due_date.month
-            ).exists()
-            
-            if not existing_payment:
-                Payment.objects.create(
-                    rental_property=lease.rental_property,
-                    tenant=lease.tenant,
-                    lease=lease,
-                    category=rent_category,
-                    amount=lease.rent_amount,
-                    due_date=due_date,
-                    status='pending',
-                    created_by=request.user
-                )
-                payments_created += 1
+        # Create the missing payments in one set-based pass
+        payments_created = len(generate_rent_payments(
+            [due_date],
+            owner=request.user,
+            properties=properties,
+            created_by=request.user
+        ))
         
         if payments_created > 0:
             messages.success(request, f'{payments_created} recurring payments created successfully!')
@@ -516,38 +471,115 @@ def export_payments(request):
     """
     Export payments to CSV.
     """
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="payments.csv"'
-    
     # Get filtered queryset
-    form = PaymentFilterForm(request.GET or None, user=request.user)
-    if form.is_valid():
-        queryset = PaymentListView.get_queryset(request)
-    else:
-        queryset = Payment.objects.filter(rental_property__owner=request.user)
-    
-    # Create CSV writer
-    writer = csv.writer(response)
-    writer.writerow([
+    queryset = PaymentListView(request=request).get_queryset()
+    
+    status_labels = dict(Payment.PAYMENT_STATUS)
+    method_labels = dict(Payment.PAYMENT_METHODS)
+    
+    # Fetch the related names up front and stream rows in chunks
+    payments = queryset.values_list(
+        'rental_property__name', 'tenant__first_name', 'tenant__last_name', 'category__name',
+        'amount', 'due_date', 'payment_date', 'status', 'payment_method', 'reference_number'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    
+    rows = (
+        [
+            property_name,
+            f"{first_name} {last_name}",
+            category_name or '',
+            amount,
+            due_date,
+            payment_date or '',
+            status_labels.get(status, status),
+            method_labels.get(payment_method, payment_method) if payment_method else '',
+            reference_number or ''
+        ]
+        for (property_name, first_name, last_name, category_name, amount, due_date,
+             payment_date, status, payment_method, reference_number) in payments
+    )
+    
+    return stream_csv('payments.csv', [
         'Property', 'Tenant', 'Category', 'Amount', 'Due Date', 
         'Payment Date', 'Status', 'Payment Method', 'Reference Number'
-    ])
-    
-    # Add payment data
-    for payment in queryset:
-        writer.writerow([
-            payment.rental_property.name,
-            payment.tenant.full_name,
-            payment.category.name if payment.category else '',
-            payment.amount,
-            payment.due_date,
-            payment.payment_date if payment.payment_date else '',
-            payment.get_status_display(),
-            payment.get_payment_method_display() if payment.payment_method else '',
-            payment.reference_number if payment.reference_number else ''
-        ])
-    
-    return response
+    ], rows)
+
+@login_required
+def reconcile_payments(request):
+    """
+    Match the deposits of an uploaded bank statement to pending payments.
+    """
+    result = None
+    
+    if request.method == 'POST':
+        form = ReconciliationForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = reconcile_statement(
+                    request.user, upload, upload.name,
+                    window=form.cleaned_data['date_window'],
+                    dry_run=form.cleaned_data['dry_run']
+                )
+            except ValueError as exc:
+                form.add_error('file', str(exc))
+            else:
+                if not result['dry_run'] and result['matched']:
+                    messages.success(request, f"{result['matched']} payments marked as paid.")
+    else:
+        form = ReconciliationForm()
+    
+    context = {
+        'form': form,
+        'result': result,
+        'review_count': BankDeposit.objects.filter(owner=request.user, status__in=['review', 'unmatched']).count(),
+    }
+    
+    return render(request, 'payments/reconcile.html', context)
+
+@login_required
+def deposit_review(request):
+    """
+    List the deposits that could not be matched with certainty, with their
+    candidate payments.
+    """
+    deposits = BankDeposit.objects.filter(
+        owner=request.user,
+        status__in=['review', 'unmatched']
+    ).prefetch_related(
+        models.Prefetch(
+            'candidates',
+            queryset=Payment.objects.select_related('tenant', 'rental_property').order_by('due_date', 'pk')
+        )
+    ).order_by('date', 'pk')
+    
+    return render(request, 'payments/deposit_review.html', {'deposits': deposits})
+
+@login_required
+def resolve_bank_deposit(request, pk):
+    """
+    Match a deposit under review to one of the owner's open payments, or
+    ignore it.
+    """
+    deposit = get_object_or_404(BankDeposit, pk=pk, owner=request.user, status__in=['review', 'unmatched'])
+    
+    if request.method == 'POST':
+        if 'ignore' in request.POST:
+            resolve_deposit(deposit)
+            messages.success(request, 'Deposit ignored.')
+        elif not request.POST.get('payment', '').isdigit():
+            messages.error(request, 'Please choose the payment this deposit settles.')
+        else:
+            payment = get_object_or_404(
+                Payment,
+                pk=request.POST['payment'],
+                owner=request.user,
+                status__in=OPEN_STATUSES
+            )
+            resolve_deposit(deposit, payment)
+            messages.success(request, f'Payment of ${payment.amount} marked as paid.')
+    
+    return redirect('deposit_review')
 
 @login_required
 def payment_debug(request):
@@ -555,15 +587,13 @@ def payment_debug(request):
     Debug view for payment issues.
     Displays detailed information about payments, forms, and model relationships.
     """
-    queryset = Payment.objects.filter(rental_property__owner=request.user)
+    queryset = Payment.objects.filter(owner=request.user)
     
     # Get filter form
     form = PaymentFilterForm(request.GET or None, user=request.user)
     
     # Get all tenants with their leases for debugging
-    all_tenants = Tenant.objects.filter(
-        leases__property__owner=request.user
-    ).distinct().prefetch_related('leases', 'leases__property')
+    all_tenants = owner_tenants(request.user).prefetch_related('leases', 'leases__rental_property')
     
     # Get all properties owned by the user
     all_properties = Property.objects.filter(owner=request.user)
@@ -0,0 +1,12 @@
+"""
+API viewsets for the properties app.
+"""
+from core.api import OwnerScopedViewSet
+from .models import Property
+from .serializers import PropertySerializer
+
+class PropertyViewSet(OwnerScopedViewSet):
+    """The owner's properties."""
+    queryset = Property.objects.select_related('property_type')
+    serializer_class = PropertySerializer
+    owner_field = 'owner'
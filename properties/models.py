@@ -72,11 +72,12 @@ class Property(models.Model):
     @property
     def current_tenant(self):
         """Return the current tenant if property is rented."""
-        current_lease = self.leases.filter(
-            start_date__lte=timezone.now().date(),
-            end_date__gte=timezone.now().date(),
-            status='active'
-        ).first()
+        # Use the lease loaded by tenants.models.prefetch_current_lease when present
+        if hasattr(self, 'current_leases'):
+            return self.current_leases[0].tenant if self.current_leases else None
+        
+        # advance_leases keeps 'active' limited to leases running today
+        current_lease = self.leases.filter(status='active').order_by('pk').first()
         
         if current_lease:
             return current_lease.tenant
@@ -0,0 +1,32 @@
+"""
+The property owner copied onto leases, payments and expenses.
+
+Owner-scoped lists filter on each row's own ``owner`` column instead of
+joining ``properties_property``. The copy is set from the property when a
+row is saved (see core.signals), moved along when a property changes
+owner, and written directly by the bulk paths, which skip signals.
+"""
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+# Rows updated per statement by the backfill
+BACKFILL_BATCH_SIZE = 1000
+
+def backfill_owners(model, property_model, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Copy the owner of each row's property onto the rows of ``model``,
+    ``batch_size`` rows per UPDATE and transaction, in primary key order.
+
+    Takes the models as arguments so migrations can pass their historical
+    versions. Returns the number of rows updated.
+    """
+    owner = property_model.objects.filter(pk=OuterRef('rental_property_id')).values('owner_id')[:1]
+    updated, last_pk = 0, 0
+    while True:
+        ids = list(model.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return updated
+        last_pk = ids[-1]
+
+        with transaction.atomic():
+            updated += model.objects.filter(pk__in=ids).update(owner_id=Subquery(owner))
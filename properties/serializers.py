@@ -0,0 +1,19 @@
+"""
+API serializers for the properties app.
+"""
+from rest_framework import serializers
+from core.api import OwnerScopedSerializer
+from .models import Property
+
+class PropertySerializer(OwnerScopedSerializer):
+    property_type_name = serializers.CharField(source='property_type.name', read_only=True, allow_null=True)
+    
+    class Meta:
+        model = Property
+        fields = [
+            'id', 'name', 'property_type', 'property_type_name', 'address', 'city', 'state', 'zip_code',
+            'country', 'description', 'bedrooms', 'bathrooms', 'square_feet', 'monthly_rent',
+            'security_deposit', 'status', 'amenities', 'year_built', 'acquisition_date',
+            'acquisition_price', 'current_value', 'notes', 'owner', 'date_created',
+        ]
+        read_only_fields = ['owner', 'date_created']
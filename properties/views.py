@@ -12,8 +12,9 @@ from django.forms import modelformset_factory
 from django.http import JsonResponse
 from .models import Property, PropertyType, PropertyImage, PropertyDocument
 from .forms import PropertyForm, PropertyImageForm, PropertyDocumentForm
-from tenants.models import Lease
+from tenants.models import Lease, prefetch_current_lease
 from payments.models import Payment
+from core.summary import get_owner_summary
 
 class PropertyListView(LoginRequiredMixin, ListView):
     """
@@ -49,31 +50,18 @@ class PropertyListView(LoginRequiredMixin, ListView):
             else:
                 queryset = queryset.filter(bedrooms=bedrooms)
         
-        return queryset.order_by('name')
+        # Load every property's current tenant in one query
+        return prefetch_current_lease(queryset.order_by('name'))
     
     def get_context_data(self, **kwargs):
         """Add additional context data."""
         context = super().get_context_data(**kwargs)
         
-        # Get all properties for aggregate calculations
-        properties = Property.objects.filter(owner=self.request.user)
-        
         # Add property types for filter dropdown
         context['property_types'] = PropertyType.objects.all()
         
-        # Add cities for filter dropdown
-        context['cities'] = properties.values_list('city', flat=True).distinct().order_by('city')
-        
-        # Add count statistics
-        context['rented_count'] = properties.filter(status='rented').count()
-        context['available_count'] = properties.filter(status='available').count()
-        
-        # Monthly income from all properties
-        monthly_income = 0
-        for property in properties.filter(status='rented'):
-            monthly_income += property.monthly_rent
-        
-        context['monthly_income'] = monthly_income
+        # Add cities for filter dropdown, count statistics and monthly income
+        context.update(get_owner_summary(self.request.user, 'properties'))
         
         return context
 
@@ -107,7 +95,7 @@ class PropertyDetailView(LoginRequiredMixin, DetailView):
         # Get income and expenses for this property
         payments = Payment.objects.filter(property=property)
         context['total_income'] = payments.filter(status='paid').aggregate(total=Sum('amount'))['total'] or 0
-        context['pending_payments'] = payments.filter(status='pending').aggregate(total=Sum('amount'))['total'] or 0
+        context['pending_payments'] = payments.filter(status__in=Payment.OPEN_STATUSES).aggregate(total=Sum('amount'))['total'] or 0
         
         # Get income by year
         yearly_income = {}
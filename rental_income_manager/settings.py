@@ -46,6 +46,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Outside the session and auth middleware so their queries are counted
+    'core.middleware.QueryInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -117,6 +119,62 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Cache (owner summaries). Use a file-based cache to share it between
+# processes locally, e.g. 'django.core.cache.backends.filebased.FileBasedCache'
+# with LOCATION BASE_DIR / 'cache', and Redis or Memcached in production.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'rental-income-manager',
+    }
+}
+OWNER_SUMMARY_CACHE_TIMEOUT = 15 * 60  # seconds
+
+# JSON API (core.api)
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.APICursorPagination',
+    'PAGE_SIZE': 50,
+}
+
+# Full-text search (core.search); DatabaseSearchBackend works on any database
+SEARCH_BACKEND = 'core.search.SQLiteFTSBackend'
+
+# Report exports queued for the run_report_worker command
+REPORT_EXPORT_RETENTION_DAYS = 7
+REPORT_EXPORT_JOB_TIMEOUT = 30 * 60  # seconds
+
+# View benchmarks (manage.py benchmark_views)
+BENCHMARK_BASELINE = BASE_DIR / 'benchmarks' / 'baseline.json'
+BENCHMARK_THRESHOLDS = {
+    'queries': 0,  # extra queries per view
+}
+
+# Per-request SQL and timing instrumentation (core.middleware)
+QUERY_INSTRUMENTATION_ENABLED = False
+QUERY_INSTRUMENTATION_SAMPLE_RATE = 1.0  # e.g. 0.05 in production
+QUERY_INSTRUMENTATION_REPEAT_THRESHOLD = 5  # executions of the same SQL
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -6,17 +6,34 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
-from core.views import dashboard, home
+from rest_framework.routers import DefaultRouter
+from core.views import dashboard, home, search
+from properties.api import PropertyViewSet
+from tenants.api import TenantViewSet, LeaseViewSet
+from payments.api import PaymentViewSet, LateFeeViewSet
+from expenses.api import ExpenseViewSet, VendorViewSet
+
+# JSON API (see core.api)
+router = DefaultRouter()
+router.register('properties', PropertyViewSet)
+router.register('tenants', TenantViewSet)
+router.register('leases', LeaseViewSet)
+router.register('payments', PaymentViewSet)
+router.register('late-fees', LateFeeViewSet)
+router.register('expenses', ExpenseViewSet)
+router.register('vendors', VendorViewSet)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', home, name='home'),
     path('dashboard/', dashboard, name='dashboard'),
+    path('search/', search, name='search'),
     path('properties/', include('properties.urls')),
     path('tenants/', include('tenants.urls')),
     path('payments/', include('payments.urls')),
     path('expenses/', include('expenses.urls')),
     path('reports/', include('reports.urls')),
+    path('api/', include(router.urls)),
     
     # Authentication
     path('login/', auth_views.LoginView.as_view(template_name='core/login.html'), name='login'),
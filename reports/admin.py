@@ -2,4 +2,20 @@
 Admin configuration for the reports app.
 """
 from django.contrib import admin
-# The reports app doesn't have models to register
+from .models import MonthlyPropertyLedger, ReportExportJob
+
+@admin.register(MonthlyPropertyLedger)
+class MonthlyPropertyLedgerAdmin(admin.ModelAdmin):
+    """Admin configuration for the MonthlyPropertyLedger model."""
+    list_display = ('rental_property', 'month', 'income', 'expenses', 'payment_count', 'date_updated')
+    list_filter = ('month',)
+    search_fields = ('rental_property__name',)
+    date_hierarchy = 'month'
+
+@admin.register(ReportExportJob)
+class ReportExportJobAdmin(admin.ModelAdmin):
+    """Admin configuration for the ReportExportJob model."""
+    list_display = ('id', 'owner', 'report_type', 'export_format', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'report_type', 'export_format')
+    search_fields = ('owner__username', 'filename')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
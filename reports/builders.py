@@ -0,0 +1,240 @@
+"""
+Report data builders for the reports app.
+
+Each builder computes the data shown by a report view so that the same
+figures can be rendered in the browser or exported by a background job.
+"""
+from django.db.models import Sum
+from dateutil.relativedelta import relativedelta
+from properties.models import Property
+from tenants.models import tenant_scorecards
+from payments.models import Payment
+from expenses.models import Expense
+from .ledger import is_month_aligned, ledger_summary, transaction_summary
+
+def _owner_properties(owner, property_ids=None):
+    """Return the owner's properties, limited to ``property_ids`` if given."""
+    properties = Property.objects.filter(owner=owner)
+    if property_ids:
+        properties = properties.filter(id__in=property_ids)
+    return properties
+
+def build_income_report(owner, start_date, end_date, property_ids=None):
+    """
+    Build the income report for the owner's properties and date range.
+    """
+    properties = _owner_properties(owner, property_ids)
+
+    # Get all payments for selected date range and properties
+    payments = Payment.objects.filter(
+        rental_property__in=properties,
+        payment_date__range=[start_date, end_date],
+        status='paid'
+    ).select_related('rental_property', 'tenant', 'category')
+
+    if is_month_aligned(start_date, end_date):
+        # Whole months can be answered from the precomputed ledger
+        summary = ledger_summary(properties, start_date, end_date)
+    else:
+        summary = transaction_summary(payments=payments)
+
+    property_totals = {
+        property_id: totals['income'] for property_id, totals in summary['by_property'].items()
+    }
+    month_totals = {
+        month: totals['income'] for month, totals in summary['by_month'].items()
+    }
+
+    # Calculate total income
+    total_income = sum(property_totals.values())
+
+    # Group by property
+    property_income = {}
+    for rental_property in properties:
+        property_income[rental_property] = {
+            'total': property_totals.get(rental_property.id, 0)
+        }
+
+    # Generate income by category
+    income_by_category = payments.values('category__name').annotate(
+        total=Sum('amount')
+    ).order_by('-total')
+
+    # Generate report by month if date range spans multiple months
+    months_data = []
+    if (end_date.year - start_date.year) * 12 + end_date.month - start_date.month > 0:
+        current = start_date.replace(day=1)
+        while current <= end_date:
+            months_data.append({
+                'month': current.strftime('%B %Y'),
+                'total': month_totals.get(current, 0),
+            })
+
+            current = current + relativedelta(months=1)
+
+    return {
+        'selected_properties': properties,
+        'start_date': start_date,
+        'end_date': end_date,
+        'payments': payments,
+        'total_income': total_income,
+        'property_income': property_income,
+        'income_by_category': income_by_category,
+        'months_data': months_data,
+    }
+
+def build_expense_report(owner, start_date, end_date, property_ids=None):
+    """
+    Build the expense report for the owner's properties and date range.
+    """
+    properties = _owner_properties(owner, property_ids)
+
+    # Get all expenses for selected date range and properties
+    expenses = Expense.objects.filter(
+        rental_property__in=properties,
+        date__range=[start_date, end_date],
+        status='paid'
+    ).select_related('rental_property', 'category', 'vendor')
+
+    if is_month_aligned(start_date, end_date):
+        # Whole months can be answered from the precomputed ledger
+        summary = ledger_summary(properties, start_date, end_date)
+    else:
+        summary = transaction_summary(expenses=expenses)
+
+    property_totals = {
+        property_id: totals['expenses'] for property_id, totals in summary['by_property'].items()
+    }
+
+    # Calculate total expenses
+    total_expenses = sum(property_totals.values())
+
+    # Group by property
+    property_expenses = {}
+    for rental_property in properties:
+        property_expenses[rental_property] = {
+            'total': property_totals.get(rental_property.id, 0)
+        }
+
+    # Generate expenses by category
+    expenses_by_category = expenses.values('category__name').annotate(
+        total=Sum('amount')
+    ).order_by('-total')
+
+    return {
+        'selected_properties': properties,
+        'start_date': start_date,
+        'end_date': end_date,
+        'expenses': expenses,
+        'total_expenses': total_expenses,
+        'property_expenses': property_expenses,
+        'expenses_by_category': expenses_by_category,
+    }
+
+def build_profit_loss_report(owner, start_date, end_date, property_ids=None):
+    """
+    Build the profit and loss report for the owner's properties and date range.
+    """
+    properties = _owner_properties(owner, property_ids)
+
+    # Get all payments for selected date range and properties
+    payments = Payment.objects.filter(
+        rental_property__in=properties,
+        payment_date__range=[start_date, end_date],
+        status='paid'
+    ).select_related('rental_property', 'tenant', 'category')
+
+    # Get all expenses for selected date range and properties
+    expenses = Expense.objects.filter(
+        rental_property__in=properties,
+        date__range=[start_date, end_date],
+        status='paid'
+    ).select_related('rental_property', 'category', 'vendor')
+
+    if is_month_aligned(start_date, end_date):
+        # Whole months can be answered from the precomputed ledger
+        summary = ledger_summary(properties, start_date, end_date)
+    else:
+        summary = transaction_summary(payments=payments, expenses=expenses)
+
+    property_totals = summary['by_property']
+    month_totals = summary['by_month']
+
+    # Calculate totals
+    total_income = sum(totals['income'] for totals in property_totals.values())
+    total_expenses = sum(totals['expenses'] for totals in property_totals.values())
+    net_profit = total_income - total_expenses
+
+    # Calculate property-specific data
+    property_profit_loss = {}
+    for rental_property in properties:
+        totals = property_totals.get(rental_property.id, {'income': 0, 'expenses': 0})
+        property_profit = totals['income'] - totals['expenses']
+        property_profit_loss[rental_property] = {
+            'income': totals['income'],
+            'expenses': totals['expenses'],
+            'profit': property_profit,
+            'percentage': (totals['income'] / total_income * 100) if total_income > 0 else 0,
+            'roi': (property_profit / rental_property.acquisition_price * 100) if rental_property.acquisition_price else 0
+        }
+
+    # Generate monthly breakdown
+    monthly_data = []
+    current = start_date.replace(day=1)
+    while current <= end_date:
+        totals = month_totals.get(current, {'income': 0, 'expenses': 0})
+        monthly_data.append({
+            'month': current.strftime('%B %Y'),
+            'income': totals['income'],
+            'expenses': totals['expenses'],
+            'profit': totals['income'] - totals['expenses']
+        })
+
+        current = current + relativedelta(months=1)
+
+    # Generate income and expenses by category
+    income_by_category = payments.values('category__name').annotate(
+        total=Sum('amount')
+    ).order_by('-total')
+
+    expenses_by_category = expenses.values('category__name').annotate(
+        total=Sum('amount')
+    ).order_by('-total')
+
+    return {
+        'selected_properties': properties,
+        'start_date': start_date,
+        'end_date': end_date,
+        'total_income': total_income,
+        'total_expenses': total_expenses,
+        'net_profit': net_profit,
+        'profit_margin': (net_profit / total_income * 100) if total_income > 0 else 0,
+        'property_profit_loss': property_profit_loss,
+        'monthly_data': monthly_data,
+        'income_by_category': income_by_category,
+        'expenses_by_category': expenses_by_category,
+    }
+
+def build_tenant_report(owner, tenant_ids=None):
+    """
+    Build the tenant report including payment history, occupancy, etc.
+    """
+    # Default to all tenants; the payment stats are annotated in one query
+    tenants = tenant_scorecards(owner, tenant_ids)
+
+    tenant_data = {
+        tenant: {
+            'total_paid': tenant.total_paid,
+            'late_payments': tenant.late_payments,
+            'on_time_payments': tenant.on_time_payments,
+            'pending_payments': tenant.pending_payments,
+            'current_lease': tenant.current_lease,
+            'payment_reliability': tenant.payment_reliability,
+        }
+        for tenant in tenants
+    }
+
+    return {
+        'selected_tenants': tenants,
+        'tenant_data': tenant_data,
+    }
@@ -0,0 +1,258 @@
+"""
+Report export functions for the reports app.
+
+Every exporter takes the dict returned by the matching builder in
+``reports.builders`` and returns an HTTP response holding the file.
+"""
+from core.exports import (
+    stream_csv, stream_xlsx, render_pdf, EXPORT_CHUNK_SIZE,
+    XLSX_DATE, XLSX_CURRENCY, XLSX_INTEGER, XLSX_PERCENT
+)
+
+def _report_filename(name, report, extension):
+    """Return the download name of a dated report."""
+    return (
+        f'{name}_{report["start_date"].strftime("%Y%m%d")}_'
+        f'{report["end_date"].strftime("%Y%m%d")}.{extension}'
+    )
+
+def _report_title(name, report):
+    """Return the heading of a dated report."""
+    return (
+        f'{name} ({report["start_date"].strftime("%Y-%m-%d")} to '
+        f'{report["end_date"].strftime("%Y-%m-%d")})'
+    )
+
+def _payment_rows(payments):
+    """Yield (date, property, tenant, category, amount) rows for payments."""
+    for payment_date, property_name, first_name, last_name, category_name, amount in payments.values_list(
+        'payment_date', 'rental_property__name', 'tenant__first_name', 'tenant__last_name',
+        'category__name', 'amount'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [payment_date, property_name, f"{first_name} {last_name}", category_name or 'N/A', amount]
+
+def _expense_rows(expenses):
+    """Yield (date, property, category, vendor, description, amount) rows for expenses."""
+    for expense_date, property_name, category_name, vendor_name, description, amount in expenses.values_list(
+        'date', 'rental_property__name', 'category__name', 'vendor__name', 'description', 'amount'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [expense_date, property_name, category_name or 'N/A', vendor_name or '', description, amount]
+
+def _tenant_rows(tenant_data):
+    """Yield one summary row per tenant of the tenant report."""
+    for tenant, data in tenant_data.items():
+        yield [
+            tenant.full_name,
+            data['current_lease'].rental_property.name if data['current_lease'] else 'None',
+            data['total_paid'],
+            data['on_time_payments'],
+            data['late_payments'],
+            data['pending_payments'],
+            data['payment_reliability']
+        ]
+
+INCOME_HEADER = ['Date', 'Property', 'Tenant', 'Category', 'Amount']
+EXPENSE_HEADER = ['Date', 'Property', 'Category', 'Vendor', 'Description', 'Amount']
+TENANT_HEADER = ['Tenant', 'Current Property', 'Total Paid', 'On-time Payments', 'Late Payments',
+                 'Pending Amount', 'Payment Reliability (%)']
+
+def export_income_pdf(report):
+    """Generate PDF for income report."""
+    rows = (
+        [payment_date.strftime('%Y-%m-%d'), property_name, tenant, category, f"${amount:.2f}"]
+        for payment_date, property_name, tenant, category, amount in _payment_rows(report['payments'])
+    )
+
+    return render_pdf(
+        _report_filename('income_report', report, 'pdf'),
+        _report_title('Income Report', report),
+        [f"Total Income: ${report['total_income']:.2f}"],
+        [(None, INCOME_HEADER, rows)]
+    )
+
+def export_expense_pdf(report):
+    """Generate PDF for expense report."""
+    rows = (
+        [expense_date.strftime('%Y-%m-%d'), property_name, category, vendor, description, f"${amount:.2f}"]
+        for expense_date, property_name, category, vendor, description, amount in _expense_rows(report['expenses'])
+    )
+
+    return render_pdf(
+        _report_filename('expense_report', report, 'pdf'),
+        _report_title('Expense Report', report),
+        [f"Total Expenses: ${report['total_expenses']:.2f}"],
+        [(None, EXPENSE_HEADER, rows)]
+    )
+
+def export_profit_loss_pdf(report):
+    """Generate PDF for profit and loss report."""
+    property_rows = (
+        [rental_property.name, f"${data['income']:.2f}", f"${data['expenses']:.2f}", f"${data['profit']:.2f}"]
+        for rental_property, data in report['property_profit_loss'].items()
+    )
+    month_rows = (
+        [month_data['month'], f"${month_data['income']:.2f}", f"${month_data['expenses']:.2f}",
+         f"${month_data['profit']:.2f}"]
+        for month_data in report['monthly_data']
+    )
+
+    return render_pdf(
+        _report_filename('profit_loss_report', report, 'pdf'),
+        _report_title('Profit & Loss Report', report),
+        [
+            f"Total Income: ${report['total_income']:.2f}",
+            f"Total Expenses: ${report['total_expenses']:.2f}",
+            f"Net Profit: ${report['net_profit']:.2f}",
+        ],
+        [
+            ('By Property', ['Property', 'Income', 'Expenses', 'Profit'], property_rows),
+            ('By Month', ['Month', 'Income', 'Expenses', 'Profit'], month_rows),
+        ]
+    )
+
+def export_tenant_pdf(report):
+    """Generate PDF for tenant report."""
+    rows = (
+        [name, property_name, f"${total_paid:.2f}", on_time, late, f"${pending:.2f}", f"{reliability:.1f}"]
+        for name, property_name, total_paid, on_time, late, pending, reliability in _tenant_rows(report['tenant_data'])
+    )
+
+    return render_pdf(
+        'tenant_report.pdf',
+        'Tenant Report',
+        [],
+        [(None, TENANT_HEADER, rows)]
+    )
+
+def export_income_csv(report):
+    """Generate CSV for income report."""
+    rows = (
+        [payment_date.strftime('%Y-%m-%d'), property_name, tenant, category, amount]
+        for payment_date, property_name, tenant, category, amount in _payment_rows(report['payments'])
+    )
+
+    return stream_csv(_report_filename('income_report', report, 'csv'), INCOME_HEADER, rows)
+
+def export_expense_csv(report):
+    """Generate CSV for expense report."""
+    rows = (
+        [expense_date.strftime('%Y-%m-%d'), property_name, category, vendor, description, amount]
+        for expense_date, property_name, category, vendor, description, amount in _expense_rows(report['expenses'])
+    )
+
+    return stream_csv(_report_filename('expense_report', report, 'csv'), EXPENSE_HEADER, rows)
+
+def export_profit_loss_csv(report):
+    """Generate CSV for profit and loss report."""
+    def rows():
+        for rental_property, data in report['property_profit_loss'].items():
+            yield [rental_property.name, data['income'], data['expenses'], data['profit']]
+
+        yield []
+        yield ['Month', 'Income', 'Expenses', 'Profit']
+        for month_data in report['monthly_data']:
+            yield [month_data['month'], month_data['income'], month_data['expenses'], month_data['profit']]
+
+    return stream_csv(
+        _report_filename('profit_loss_report', report, 'csv'),
+        ['Property', 'Income', 'Expenses', 'Profit'],
+        rows()
+    )
+
+def export_tenant_csv(report):
+    """Generate CSV for tenant report."""
+    rows = (
+        [name, property_name, total_paid, on_time, late, pending, f"{reliability:.1f}"]
+        for name, property_name, total_paid, on_time, late, pending, reliability in _tenant_rows(report['tenant_data'])
+    )
+
+    return stream_csv('tenant_report.csv', TENANT_HEADER, rows)
+
+def export_income_excel(report):
+    """Generate Excel for income report."""
+    return stream_xlsx(
+        _report_filename('income_report', report, 'xlsx'),
+        [(
+            'Income Report',
+            INCOME_HEADER,
+            _payment_rows(report['payments']),
+            [XLSX_DATE, None, None, None, XLSX_CURRENCY]
+        )]
+    )
+
+def export_expense_excel(report):
+    """Generate Excel for expense report."""
+    return stream_xlsx(
+        _report_filename('expense_report', report, 'xlsx'),
+        [(
+            'Expense Report',
+            EXPENSE_HEADER,
+            _expense_rows(report['expenses']),
+            [XLSX_DATE, None, None, None, None, XLSX_CURRENCY]
+        )]
+    )
+
+def export_profit_loss_excel(report):
+    """Generate Excel for profit and loss report."""
+    property_rows = (
+        [rental_property.name, data['income'], data['expenses'], data['profit'], data['roi']]
+        for rental_property, data in report['property_profit_loss'].items()
+    )
+    month_rows = (
+        [month_data['month'], month_data['income'], month_data['expenses'], month_data['profit']]
+        for month_data in report['monthly_data']
+    )
+
+    return stream_xlsx(
+        _report_filename('profit_loss_report', report, 'xlsx'),
+        [
+            (
+                'By Property',
+                ['Property', 'Income', 'Expenses', 'Profit', 'ROI (%)'],
+                property_rows,
+                [None, XLSX_CURRENCY, XLSX_CURRENCY, XLSX_CURRENCY, XLSX_PERCENT]
+            ),
+            (
+                'By Month',
+                ['Month', 'Income', 'Expenses', 'Profit'],
+                month_rows,
+                [None, XLSX_CURRENCY, XLSX_CURRENCY, XLSX_CURRENCY]
+            ),
+        ]
+    )
+
+def export_tenant_excel(report):
+    """Generate Excel for tenant report."""
+    return stream_xlsx(
+        'tenant_report.xlsx',
+        [(
+            'Tenant Report',
+            TENANT_HEADER,
+            _tenant_rows(report['tenant_data']),
+            [None, None, XLSX_CURRENCY, XLSX_INTEGER, XLSX_INTEGER, XLSX_CURRENCY, XLSX_PERCENT]
+        )]
+    )
+
+# Exporters by report type and format
+REPORT_EXPORTERS = {
+    'income': {
+        'pdf': export_income_pdf,
+        'csv': export_income_csv,
+        'excel': export_income_excel,
+    },
+    'expense': {
+        'pdf': export_expense_pdf,
+        'csv': export_expense_csv,
+        'excel': export_expense_excel,
+    },
+    'profit_loss': {
+        'pdf': export_profit_loss_pdf,
+        'csv': export_profit_loss_csv,
+        'excel': export_profit_loss_excel,
+    },
+    'tenant': {
+        'pdf': export_tenant_pdf,
+        'csv': export_tenant_csv,
+        'excel': export_tenant_excel,
+    },
+}
@@ -0,0 +1,168 @@
+"""
+Database-backed queue for report exports.
+
+Views enqueue a ``ReportExportJob`` and return immediately; the
+``run_report_worker`` management command claims queued jobs, builds the
+report and stores the exported file under MEDIA_ROOT.
+"""
+import logging
+import re
+import tempfile
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db.models import F
+from django.utils import timezone
+from .builders import (
+    build_income_report, build_expense_report, build_profit_loss_report, build_tenant_report
+)
+from .exports import REPORT_EXPORTERS
+from .models import ReportExportJob
+
+logger = logging.getLogger(__name__)
+
+# Builders by report type
+REPORT_BUILDERS = {
+    'income': build_income_report,
+    'expense': build_expense_report,
+    'profit_loss': build_profit_loss_report,
+    'tenant': build_tenant_report,
+}
+
+# Report parameters stored as ISO dates in the job
+DATE_PARAMETERS = ('start_date', 'end_date')
+
+# Times a job is retried after its worker stopped responding
+MAX_ATTEMPTS = 3
+
+def retention_period():
+    """Return how long finished jobs and their files are kept."""
+    return timedelta(days=getattr(settings, 'REPORT_EXPORT_RETENTION_DAYS', 7))
+
+def job_timeout():
+    """Return how long a job may run before it is considered abandoned."""
+    return timedelta(seconds=getattr(settings, 'REPORT_EXPORT_JOB_TIMEOUT', 30 * 60))
+
+def enqueue_export(owner, report_type, export_format, **parameters):
+    """
+    Queue an export of ``report_type`` in ``export_format`` for ``owner``.
+
+    Date parameters are stored as ISO strings; every other parameter must
+    already be JSON serializable.
+    """
+    for name in DATE_PARAMETERS:
+        if isinstance(parameters.get(name), date):
+            parameters[name] = parameters[name].isoformat()
+
+    return ReportExportJob.objects.create(
+        owner=owner,
+        report_type=report_type,
+        export_format=export_format,
+        parameters=parameters
+    )
+
+def claim_next_job():
+    """
+    Mark the oldest queued job as running and return it.
+
+    The status update only succeeds for one worker, so several workers can
+    poll the same table without a broker. Returns None if nothing is queued.
+    """
+    while True:
+        job = ReportExportJob.objects.filter(status='queued').order_by('created_at', 'pk').first()
+        if job is None:
+            return None
+
+        now = timezone.now()
+        claimed = ReportExportJob.objects.filter(pk=job.pk, status='queued').update(
+            status='running',
+            started_at=now,
+            attempts=F('attempts') + 1
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+def _attachment_filename(response):
+    """Return the file name of an attachment response, if it has one."""
+    match = re.search(r'filename="([^"]+)"', response.get('Content-Disposition', ''))
+    return match.group(1) if match else None
+
+def run_job(job):
+    """Build and export the report of a claimed job, recording the outcome."""
+    try:
+        parameters = dict(job.parameters)
+        for name in DATE_PARAMETERS:
+            if parameters.get(name):
+                parameters[name] = date.fromisoformat(parameters[name])
+
+        report = REPORT_BUILDERS[job.report_type](job.owner, **parameters)
+        response = REPORT_EXPORTERS[job.report_type][job.export_format](report)
+        filename = _attachment_filename(response) or f'{job.report_type}_report_{job.pk}'
+
+        # Copy the response body to storage without holding it in memory
+        with tempfile.TemporaryFile() as output:
+            for chunk in response:
+                output.write(chunk)
+            response.close()
+            output.seek(0)
+            job.file.save(filename, File(output), save=False)
+
+        job.filename = filename
+        job.status = 'completed'
+        job.error = None
+    except Exception as exc:
+        logger.exception("Report export job %s failed", job.pk)
+        job.status = 'failed'
+        job.error = str(exc)
+
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+def process_jobs(limit=None):
+    """
+    Run queued jobs until the queue is empty or ``limit`` jobs have run.
+
+    Returns the number of jobs processed.
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+def requeue_stale_jobs():
+    """
+    Requeue running jobs whose worker stopped responding.
+
+    Jobs that have used up their attempts are marked as failed instead.
+    Returns the number of jobs requeued.
+    """
+    stale = ReportExportJob.objects.filter(
+        status='running',
+        started_at__lt=timezone.now() - job_timeout()
+    )
+
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status='failed',
+        error='The export did not finish in time.',
+        finished_at=timezone.now()
+    )
+    return stale.filter(attempts__lt=MAX_ATTEMPTS).update(status='queued', started_at=None)
+
+def cleanup_jobs():
+    """
+    Delete finished jobs older than the retention period.
+
+    Their files are removed by the ``post_delete`` handler in
+    ``reports.signals``. Returns the number of jobs deleted.
+    """
+    deleted, _ = ReportExportJob.objects.filter(
+        status__in=('completed', 'failed'),
+        finished_at__lt=timezone.now() - retention_period()
+    ).delete()
+    return deleted
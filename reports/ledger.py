@@ -0,0 +1,253 @@
+"""
+Maintenance and lookup helpers for the monthly property ledger.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from dateutil.relativedelta import relativedelta
+from django.db import models, transaction
+from django.db.models import Sum, Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from payments.models import Payment
+from expenses.models import Expense
+from .models import MonthlyPropertyLedger
+
+# Payment statuses tracked by a dedicated ledger counter
+STATUS_COUNT_FIELDS = {
+    'paid': 'paid_count',
+    'pending': 'pending_count',
+    'partial': 'partial_count',
+    'late': 'late_count',
+}
+
+def _empty_fields():
+    """Return the ledger field values of a month without any activity."""
+    fields = {
+        'income': 0,
+        'expenses': 0,
+        'payment_count': 0,
+        'expense_count': 0,
+    }
+    fields.update({field: 0 for field in STATUS_COUNT_FIELDS.values()})
+    return fields
+
+def _as_date(value):
+    """Coerce a DateField value (date, aware datetime or string) to a date."""
+    return models.DateField().to_python(value)
+
+def month_start(value):
+    """Return the first day of the month containing ``value``."""
+    return _as_date(value).replace(day=1)
+
+def month_end(value):
+    """Return the last day of the month containing ``value``."""
+    return month_start(value) + relativedelta(months=1) - timedelta(days=1)
+
+def is_month_aligned(start_date, end_date):
+    """Check whether a date range covers whole calendar months only."""
+    return start_date.day == 1 and end_date == month_end(end_date)
+
+def payment_ledger_keys(payment):
+    """Return the (property id, month) ledger cells a payment contributes to."""
+    keys = set()
+    for value in (payment.payment_date, payment.due_date):
+        if value and payment.rental_property_id:
+            keys.add((payment.rental_property_id, month_start(value)))
+    return keys
+
+def expense_ledger_keys(expense):
+    """Return the (property id, month) ledger cells an expense contributes to."""
+    if expense.date and expense.rental_property_id:
+        return {(expense.rental_property_id, month_start(expense.date))}
+    return set()
+
+def compute_ledger_values(payments, expenses):
+    """
+    Compute ledger field values from raw payment and expense rows.
+
+    Runs one grouped query per measure and returns a dict keyed by
+    (property id, month).
+    """
+    values = defaultdict(_empty_fields)
+
+    income = payments.filter(
+        status='paid',
+        payment_date__isnull=False
+    ).annotate(
+        month=TruncMonth('payment_date')
+    ).values('rental_property', 'month').annotate(
+        total=Sum('amount')
+    ).order_by()
+    for row in income:
+        values[(row['rental_property'], row['month'])]['income'] = row['total'] or 0
+
+    status_counts = {
+        field: Count('id', filter=Q(status=status))
+        for status, field in STATUS_COUNT_FIELDS.items()
+    }
+    counts = payments.filter(
+        due_date__isnull=False
+    ).annotate(
+        month=TruncMonth('due_date')
+    ).values('rental_property', 'month').annotate(
+        payment_count=Count('id'),
+        **status_counts
+    ).order_by()
+    for row in counts:
+        cell = values[(row.pop('rental_property'), row.pop('month'))]
+        cell.update(row)
+
+    expense_totals = expenses.filter(
+        status='paid'
+    ).annotate(
+        month=TruncMonth('date')
+    ).values('rental_property', 'month').annotate(
+        total=Sum('amount'),
+        count=Count('id')
+    ).order_by()
+    for row in expense_totals:
+        cell = values[(row['rental_property'], row['month'])]
+        cell['expenses'] = row['total'] or 0
+        cell['expense_count'] = row['count']
+
+    return values
+
+def rebuild_ledger(properties=None, batch_size=1000, start_date=None, end_date=None):
+    """
+    Rebuild ledger rows from scratch, for all properties or the given ones.
+
+    With ``start_date`` and ``end_date`` only the months of that range are
+    rebuilt. Returns the number of ledger rows written.
+    """
+    payments = Payment.objects.all()
+    expenses = Expense.objects.all()
+    existing = MonthlyPropertyLedger.objects.all()
+
+    if properties is not None:
+        payments = payments.filter(rental_property__in=properties)
+        expenses = expenses.filter(rental_property__in=properties)
+        existing = existing.filter(rental_property__in=properties)
+
+    first_month = last_month = None
+    if start_date and end_date:
+        first_month, last_month = month_start(start_date), month_start(end_date)
+        last_day = month_end(end_date)
+        payments = payments.filter(
+            Q(payment_date__range=[first_month, last_day]) | Q(due_date__range=[first_month, last_day])
+        )
+        expenses = expenses.filter(date__range=[first_month, last_day])
+        existing = existing.filter(month__range=[first_month, last_month])
+
+    now = timezone.now()
+    entries = [
+        MonthlyPropertyLedger(rental_property_id=property_id, month=month, date_updated=now, **fields)
+        for (property_id, month), fields in compute_ledger_values(payments, expenses).items()
+        # Payments due in the range may have been paid outside of it
+        if first_month is None or first_month <= month <= last_month
+    ]
+
+    with transaction.atomic():
+        existing.delete()
+        MonthlyPropertyLedger.objects.bulk_create(entries, batch_size=batch_size)
+
+    return len(entries)
+
+def refresh_ledger(keys):
+    """
+    Recompute the given (property id, month) ledger cells from raw rows.
+
+    Cells left without any activity are removed.
+    """
+    for property_id, month in set(keys):
+        last_day = month_end(month)
+        payments = Payment.objects.filter(
+            Q(payment_date__range=[month, last_day]) | Q(due_date__range=[month, last_day]),
+            rental_property_id=property_id
+        )
+        expenses = Expense.objects.filter(
+            rental_property_id=property_id,
+            date__range=[month, last_day]
+        )
+
+        fields = compute_ledger_values(payments, expenses).get((property_id, month))
+        if fields:
+            MonthlyPropertyLedger.objects.update_or_create(
+                rental_property_id=property_id,
+                month=month,
+                defaults=dict(fields, date_updated=timezone.now())
+            )
+        else:
+            MonthlyPropertyLedger.objects.filter(rental_property_id=property_id, month=month).delete()
+
+def schedule_ledger_refresh(keys):
+    """Refresh the given ledger cells once the current transaction commits."""
+    keys = set(keys)
+    if keys:
+        transaction.on_commit(lambda: refresh_ledger(keys))
+
+def ledger_summary(properties, start_date, end_date):
+    """
+    Summarize ledger rows for the given properties and month range.
+
+    Returns per-property and per-month income and expense totals, each
+    computed with a single grouped query.
+    """
+    rows = MonthlyPropertyLedger.objects.filter(
+        rental_property__in=properties,
+        month__range=[month_start(start_date), month_start(end_date)]
+    )
+
+    by_property = rows.values('rental_property').annotate(
+        income=Sum('income'),
+        expenses=Sum('expenses')
+    ).order_by()
+
+    by_month = rows.values('month').annotate(
+        income=Sum('income'),
+        expenses=Sum('expenses')
+    ).order_by('month')
+
+    return {
+        'by_property': {
+            row['rental_property']: {'income': row['income'], 'expenses': row['expenses']}
+            for row in by_property
+        },
+        'by_month': {
+            row['month']: {'income': row['income'], 'expenses': row['expenses']}
+            for row in by_month
+        },
+    }
+
+def _grouped_totals(queryset, group_by, date_field=None):
+    """Sum ``amount`` per value of ``group_by`` (or per month of ``date_field``)."""
+    if date_field:
+        queryset = queryset.annotate(month=TruncMonth(date_field))
+    rows = queryset.values(group_by).annotate(total=Sum('amount')).order_by()
+    return {row[group_by]: row['total'] or 0 for row in rows}
+
+def transaction_summary(payments=None, expenses=None):
+    """
+    Summarize already filtered payment and expense querysets.
+
+    Returns the same shape as ``ledger_summary`` for date ranges the ledger
+    cannot answer, using one per-property and one per-month grouped query
+    for each queryset given.
+    """
+    by_property = defaultdict(lambda: {'income': 0, 'expenses': 0})
+    by_month = defaultdict(lambda: {'income': 0, 'expenses': 0})
+
+    for queryset, measure, date_field in (
+        (payments, 'income', 'payment_date'),
+        (expenses, 'expenses', 'date'),
+    ):
+        if queryset is None:
+            continue
+        for property_id, total in _grouped_totals(queryset, 'rental_property').items():
+            by_property[property_id][measure] = total
+        for month, total in _grouped_totals(queryset, 'month', date_field).items():
+            by_month[month][measure] = total
+
+    return {
+        'by_property': dict(by_property),
+        'by_month': dict(by_month),
+    }
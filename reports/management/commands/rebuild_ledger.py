@@ -0,0 +1,34 @@
+"""
+Rebuild the monthly property ledger from raw payments and expenses.
+"""
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from properties.models import Property
+from reports.ledger import rebuild_ledger
+
+class Command(BaseCommand):
+    help = 'Rebuild the monthly property ledger from payments and expenses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--owner',
+            help='Only rebuild ledger rows for properties owned by this username.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of ledger rows inserted per query (default: 1000).'
+        )
+
+    def handle(self, *args, **options):
+        properties = None
+        if options['owner']:
+            try:
+                owner = User.objects.get(username=options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f"User '{options['owner']}' does not exist.")
+            properties = Property.objects.filter(owner=owner)
+
+        count = rebuild_ledger(properties=properties, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} ledger rows.'))
@@ -0,0 +1,56 @@
+"""
+Process queued report export jobs.
+"""
+import time
+from django.core.management.base import BaseCommand
+from reports.jobs import process_jobs, requeue_stale_jobs, cleanup_jobs
+
+# Seconds between housekeeping passes of a long-running worker
+CLEANUP_INTERVAL = 60 * 60
+
+class Command(BaseCommand):
+    help = 'Run the worker that processes queued report exports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs currently queued and exit instead of polling.'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Seconds to wait between polls of an empty queue (default: 5).'
+        )
+
+    def housekeeping(self):
+        requeued = requeue_stale_jobs()
+        deleted = cleanup_jobs()
+        if requeued or deleted:
+            self.stdout.write(f'Requeued {requeued} stale jobs, deleted {deleted} expired jobs.')
+
+    def handle(self, *args, **options):
+        self.housekeeping()
+        last_cleanup = time.monotonic()
+
+        if options['once']:
+            processed = process_jobs()
+            self.stdout.write(self.style.SUCCESS(f'Processed {processed} export jobs.'))
+            return
+
+        self.stdout.write('Waiting for report export jobs...')
+        try:
+            while True:
+                processed = process_jobs()
+                if processed:
+                    self.stdout.write(f'Processed {processed} export jobs.')
+
+                if time.monotonic() - last_cleanup >= CLEANUP_INTERVAL:
+                    self.housekeeping()
+                    last_cleanup = time.monotonic()
+
+                if not processed:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Worker stopped.')
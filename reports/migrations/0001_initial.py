@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-17 01:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('properties', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyPropertyLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('income', models.DecimalField(decimal_places=2, default=0, help_text='Paid payments by payment date', max_digits=12)),
+                ('expenses', models.DecimalField(decimal_places=2, default=0, help_text='Paid expenses by expense date', max_digits=12)),
+                ('payment_count', models.PositiveIntegerField(default=0, help_text='Payments due in the month')),
+                ('paid_count', models.PositiveIntegerField(default=0)),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('partial_count', models.PositiveIntegerField(default=0)),
+                ('late_count', models.PositiveIntegerField(default=0)),
+                ('expense_count', models.PositiveIntegerField(default=0, help_text='Paid expenses in the month')),
+                ('date_updated', models.DateTimeField(default=django.utils.timezone.now)),
+                ('rental_property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='properties.property')),
+            ],
+            options={
+                'verbose_name_plural': 'Monthly Property Ledger',
+                'ordering': ['month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='monthlypropertyledger',
+            constraint=models.UniqueConstraint(fields=('rental_property', 'month'), name='unique_ledger_property_month'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def populate_ledger(apps, schema_editor):
+    """Build ledger rows for payments and expenses recorded before the ledger existed."""
+    from reports.ledger import compute_ledger_values
+
+    Payment = apps.get_model('payments', 'Payment')
+    Expense = apps.get_model('expenses', 'Expense')
+    MonthlyPropertyLedger = apps.get_model('reports', 'MonthlyPropertyLedger')
+
+    values = compute_ledger_values(Payment.objects.all(), Expense.objects.all())
+    MonthlyPropertyLedger.objects.bulk_create(
+        [
+            MonthlyPropertyLedger(rental_property_id=property_id, month=month, **fields)
+            for (property_id, month), fields in values.items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        ('payments', '0001_initial'),
+        ('expenses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_ledger, migrations.RunPython.noop),
+    ]
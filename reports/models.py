@@ -0,0 +1,94 @@
+"""
+Models for the reports app.
+"""
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils import timezone
+from properties.models import Property
+
+class MonthlyPropertyLedger(models.Model):
+    """
+    Precomputed monthly income, expense and payment status totals per property.
+
+    Rows are maintained by the signal handlers in ``reports.signals`` and can be
+    rebuilt in bulk with the ``rebuild_ledger`` management command.
+    """
+    rental_property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='ledger_entries')
+    month = models.DateField(help_text="First day of the month")
+    income = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                 help_text="Paid payments by payment date")
+    expenses = models.DecimalField(max_digits=12, decimal_places=2, default=0,
+                                   help_text="Paid expenses by expense date")
+    payment_count = models.PositiveIntegerField(default=0, help_text="Payments due in the month")
+    paid_count = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    partial_count = models.PositiveIntegerField(default=0)
+    late_count = models.PositiveIntegerField(default=0)
+    expense_count = models.PositiveIntegerField(default=0, help_text="Paid expenses in the month")
+    date_updated = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name_plural = "Monthly Property Ledger"
+        ordering = ['month']
+        constraints = [
+            models.UniqueConstraint(fields=['rental_property', 'month'], name='unique_ledger_property_month'),
+        ]
+
+    def __str__(self):
+        return f"{self.rental_property.name} - {self.month.strftime('%B %Y')}"
+
+    @property
+    def net_income(self):
+        return self.income - self.expenses
+
+class ReportExportJob(models.Model):
+    """
+    A queued PDF or Excel report export.
+
+    Jobs are processed by the ``run_report_worker`` management command and
+    the finished file is stored under MEDIA_ROOT until it expires.
+    """
+    REPORT_TYPES = (
+        ('income', 'Income Report'),
+        ('expense', 'Expense Report'),
+        ('profit_loss', 'Profit & Loss Report'),
+        ('tenant', 'Tenant Report'),
+    )
+
+    EXPORT_FORMATS = (
+        ('pdf', 'PDF'),
+        ('excel', 'Excel'),
+    )
+
+    JOB_STATUS = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='report_export_jobs')
+    report_type = models.CharField(max_length=20, choices=REPORT_TYPES)
+    export_format = models.CharField(max_length=10, choices=EXPORT_FORMATS)
+    parameters = models.JSONField(default=dict, blank=True, help_text="Report filters")
+    status = models.CharField(max_length=10, choices=JOB_STATUS, default='queued')
+    file = models.FileField(upload_to='report_exports/%Y/%m/%d/', blank=True, null=True)
+    filename = models.CharField(max_length=255, blank=True, help_text="Download file name")
+    error = models.TextField(blank=True, null=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='report_job_status_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} ({self.get_export_format_display()}) - {self.get_status_display()}"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
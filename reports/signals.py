@@ -0,0 +1,49 @@
+"""
+Signal handlers for the reports app.
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from payments.models import Payment
+from expenses.models import Expense
+from .models import ReportExportJob
+from .ledger import payment_ledger_keys, expense_ledger_keys, schedule_ledger_refresh
+
+LEDGER_KEY_FUNCTIONS = {
+    Payment: payment_ledger_keys,
+    Expense: expense_ledger_keys,
+}
+
+@receiver(pre_save, sender=Payment)
+@receiver(pre_save, sender=Expense)
+def capture_previous_ledger_keys(sender, instance, raw=False, **kwargs):
+    """Remember the ledger cells a row belonged to before it is changed."""
+    instance._previous_ledger_keys = set()
+    if raw or not instance.pk:
+        return
+
+    previous = sender.objects.filter(pk=instance.pk).first()
+    if previous:
+        instance._previous_ledger_keys = LEDGER_KEY_FUNCTIONS[sender](previous)
+
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=Expense)
+def update_ledger_on_save(sender, instance, raw=False, **kwargs):
+    """Refresh the ledger cells touched by a saved payment or expense."""
+    if raw:
+        return
+
+    keys = LEDGER_KEY_FUNCTIONS[sender](instance)
+    keys |= getattr(instance, '_previous_ledger_keys', set())
+    schedule_ledger_refresh(keys)
+
+@receiver(post_delete, sender=Payment)
+@receiver(post_delete, sender=Expense)
+def update_ledger_on_delete(sender, instance, **kwargs):
+    """Refresh the ledger cells a deleted payment or expense belonged to."""
+    schedule_ledger_refresh(LEDGER_KEY_FUNCTIONS[sender](instance))
+
+@receiver(post_delete, sender=ReportExportJob)
+def delete_export_file(sender, instance, **kwargs):
+    """Remove the exported file of a deleted report export job."""
+    if instance.file:
+        instance.file.delete(save=False)
@@ -0,0 +1,450 @@
+"""
+Tests for the reports app.
+"""
+import shutil
+import tempfile
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.utils import timezone
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO, BytesIO
+from openpyxl import load_workbook
+from properties.models import Property, PropertyType
+from tenants.models import Tenant, Lease
+from payments.models import Payment
+from expenses.models import Expense
+from .models import MonthlyPropertyLedger, ReportExportJob
+from .ledger import rebuild_ledger
+from .jobs import enqueue_export, process_jobs, requeue_stale_jobs, cleanup_jobs
+
+class LedgerTestMixin:
+    """Common fixtures for ledger and report tests."""
+
+    def setUp(self):
+        # Create a user
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+
+        # Create a property
+        self.property = Property.objects.create(
+            owner=self.user,
+            property_type=PropertyType.objects.create(name='Apartment'),
+            name='Test Property',
+            address='123 Test St',
+            city='Test City',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00')
+        )
+
+        # Create a tenant
+        self.tenant = Tenant.objects.create(
+            first_name='John',
+            last_name='Doe',
+            phone='555-123-4567',
+            created_by=self.user
+        )
+
+    def create_payment(self, **kwargs):
+        """Create a payment and run the ledger refresh it schedules."""
+        values = {
+            'rental_property': self.property,
+            'tenant': self.tenant,
+            'amount': Decimal('1000.00'),
+            'due_date': date(2024, 3, 1),
+            'payment_date': date(2024, 3, 3),
+            'status': 'paid',
+            'created_by': self.user,
+        }
+        values.update(kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            return Payment.objects.create(**values)
+
+    def create_expense(self, **kwargs):
+        """Create an expense and run the ledger refresh it schedules."""
+        values = {
+            'rental_property': self.property,
+            'amount': Decimal('200.00'),
+            'date': date(2024, 3, 10),
+            'description': 'Repair',
+            'status': 'paid',
+            'created_by': self.user,
+        }
+        values.update(kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            return Expense.objects.create(**values)
+
+    def ledger(self, month):
+        return MonthlyPropertyLedger.objects.get(rental_property=self.property, month=month)
+
+    def use_temporary_media_root(self):
+        """Store exported files in a temporary MEDIA_ROOT for this test."""
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+class MonthlyPropertyLedgerTests(LedgerTestMixin, TestCase):
+    """Tests for the incrementally maintained monthly property ledger."""
+
+    def test_payment_and_expense_update_ledger(self):
+        """Test that saving payments and expenses updates the month's row."""
+        self.create_payment()
+        self.create_payment(amount=Decimal('50.00'), status='pending', payment_date=None)
+        self.create_expense()
+
+        entry = self.ledger(date(2024, 3, 1))
+        self.assertEqual(entry.income, Decimal('1000.00'))
+        self.assertEqual(entry.expenses, Decimal('200.00'))
+        self.assertEqual(entry.net_income, Decimal('800.00'))
+        self.assertEqual(entry.payment_count, 2)
+        self.assertEqual(entry.paid_count, 1)
+        self.assertEqual(entry.pending_count, 1)
+        self.assertEqual(entry.expense_count, 1)
+
+    def test_moving_payment_refreshes_both_months(self):
+        """Test that changing a payment date updates the old and new months."""
+        payment = self.create_payment()
+
+        payment.due_date = date(2024, 4, 1)
+        payment.payment_date = date(2024, 4, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.save()
+
+        self.assertFalse(MonthlyPropertyLedger.objects.filter(month=date(2024, 3, 1)).exists())
+        self.assertEqual(self.ledger(date(2024, 4, 1)).income, Decimal('1000.00'))
+
+    def test_delete_removes_empty_month(self):
+        """Test that deleting the last row of a month removes its ledger row."""
+        expense = self.create_expense()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            expense.delete()
+
+        self.assertFalse(MonthlyPropertyLedger.objects.exists())
+
+    def test_delete_property_with_ledger(self):
+        """Test that deleting a property cascades cleanly through the ledger."""
+        self.create_payment()
+        self.create_expense()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.property.delete()
+
+        self.assertFalse(MonthlyPropertyLedger.objects.exists())
+
+    def test_rebuild_ledger(self):
+        """Test that a bulk rebuild matches the incrementally maintained rows."""
+        self.create_payment()
+        self.create_payment(due_date=date(2024, 5, 1), payment_date=date(2024, 5, 1))
+        self.create_expense()
+        MonthlyPropertyLedger.objects.update(income=0, expenses=0)
+
+        self.assertEqual(rebuild_ledger(), 2)
+        self.assertEqual(self.ledger(date(2024, 3, 1)).income, Decimal('1000.00'))
+        self.assertEqual(self.ledger(date(2024, 3, 1)).expenses, Decimal('200.00'))
+        self.assertEqual(self.ledger(date(2024, 5, 1)).income, Decimal('1000.00'))
+
+    def test_rebuild_ledger_command(self):
+        """Test the rebuild_ledger management command."""
+        self.create_payment()
+        MonthlyPropertyLedger.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_ledger', owner='testuser', stdout=out)
+
+        self.assertIn('Rebuilt 1 ledger rows', out.getvalue())
+        self.assertEqual(self.ledger(date(2024, 3, 1)).income, Decimal('1000.00'))
+
+class ReportViewTests(LedgerTestMixin, TestCase):
+    """Tests for the report views."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+
+        self.create_payment()
+        self.create_payment(due_date=date(2024, 4, 1), payment_date=date(2024, 4, 20))
+        self.create_expense()
+
+    def test_income_report_whole_months(self):
+        """Test the income report for a month-aligned range."""
+        response = self.client.post(reverse('income_report'), {
+            'start_date': '2024-03-01',
+            'end_date': '2024-04-30',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_income'], Decimal('2000.00'))
+        self.assertEqual(response.context['property_income'][self.property]['total'], Decimal('2000.00'))
+        self.assertEqual([month['total'] for month in response.context['months_data']],
+                         [Decimal('1000.00'), Decimal('1000.00')])
+
+    def test_income_report_partial_months(self):
+        """Test the income report for a range that splits a month."""
+        response = self.client.post(reverse('income_report'), {
+            'start_date': '2024-03-01',
+            'end_date': '2024-04-15',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_income'], Decimal('1000.00'))
+
+    def test_report_queries_do_not_grow_with_properties(self):
+        """Test that per-property totals are computed in grouped queries."""
+        data = {'start_date': '2024-03-05', 'end_date': '2024-04-25'}
+        reports = ['income_report', 'expense_report', 'profit_loss_report']
+
+        def count_queries():
+            counts = []
+            for name in reports:
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.post(reverse(name), data)
+                counts.append(len(context))
+            return counts, response
+
+        single_property, _response = count_queries()
+
+        for index in range(3):
+            self.property = Property.objects.create(
+                owner=self.user,
+                name=f'Extra Property {index}',
+                address='456 Test St',
+                city='Test City',
+                state='TS',
+                zip_code='12345',
+                monthly_rent=Decimal('1000.00'),
+                security_deposit=Decimal('1000.00')
+            )
+            self.create_payment(payment_date=date(2024, 3, 20))
+            self.create_expense()
+
+        many_properties, response = count_queries()
+
+        self.assertEqual(many_properties, single_property)
+        self.assertEqual(response.context['total_income'], Decimal('4000.00'))
+        self.assertEqual(response.context['total_expenses'], Decimal('800.00'))
+
+    def test_tenant_report_queries_do_not_grow_with_tenants(self):
+        """Test that the tenant report computes every scorecard in one query."""
+        Lease.objects.create(
+            rental_property=self.property, tenant=self.tenant, start_date=date(2024, 1, 1),
+            end_date=date(2024, 12, 31), rent_amount=Decimal('1000.00'), security_deposit=Decimal('1000.00'),
+            status='active', created_by=self.user
+        )
+
+        with CaptureQueriesContext(connection) as one_tenant:
+            response = self.client.get(reverse('tenant_report'))
+        self.assertEqual(response.status_code, 200)
+
+        for index in range(3):
+            self.tenant = Tenant.objects.create(
+                first_name='Extra', last_name=str(index), phone='555-123-4567', created_by=self.user
+            )
+            Lease.objects.create(
+                rental_property=self.property, tenant=self.tenant, start_date=date(2023, 1, 1),
+                end_date=date(2023, 12, 31), rent_amount=Decimal('1000.00'),
+                security_deposit=Decimal('1000.00'), status='completed', created_by=self.user
+            )
+            self.create_payment(status='pending', payment_date=None)
+
+        with CaptureQueriesContext(connection) as many_tenants:
+            response = self.client.get(reverse('tenant_report'))
+
+        self.assertEqual(len(many_tenants), len(one_tenant))
+        data = {tenant.last_name: values for tenant, values in response.context['tenant_data'].items()}
+        self.assertEqual(len(data), 4)
+        self.assertEqual(
+            [data['Doe'][key] for key in ('total_paid', 'on_time_payments', 'late_payments', 'payment_reliability')],
+            [Decimal('2000.00'), 0, 2, 0]
+        )
+        self.assertEqual((data['0']['pending_payments'], data['0']['current_lease']), (Decimal('1000.00'), None))
+
+    def test_income_report_csv_export(self):
+        """Test that the income report is exported as a streamed CSV."""
+        response = self.client.post(reverse('income_report'), {
+            'start_date': '2024-03-01',
+            'end_date': '2024-04-30',
+            'export': 'csv',
+        })
+
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Date,Property,Tenant,Category,Amount')
+        self.assertEqual(sorted(lines[1:]), [
+            '2024-03-03,Test Property,John Doe,N/A,1000.00',
+            '2024-04-20,Test Property,John Doe,N/A,1000.00',
+        ])
+
+    def download_export(self, response):
+        """Run the export job queued by ``response`` and download its file."""
+        job = ReportExportJob.objects.get()
+        self.assertRedirects(response, reverse('export_job_detail', args=[job.pk]))
+        self.assertEqual(process_jobs(), 1)
+        return self.client.get(reverse('export_job_download', args=[job.pk]))
+
+    def test_income_report_excel_export(self):
+        """Test that the income report Excel export has typed cells."""
+        self.use_temporary_media_root()
+        response = self.download_export(self.client.post(reverse('income_report'), {
+            'start_date': '2024-03-01',
+            'end_date': '2024-03-31',
+            'export': 'excel',
+        }))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('income_report_20240301_20240331.xlsx', response['Content-Disposition'])
+        ws = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = list(ws.values)
+        self.assertEqual(rows[0], ('Date', 'Property', 'Tenant', 'Category', 'Amount'))
+        self.assertEqual(rows[1][0].date(), date(2024, 3, 3))
+        self.assertEqual(rows[1][1:], ('Test Property', 'John Doe', 'N/A', 1000))
+        self.assertEqual(ws['E2'].number_format, '#,##0.00')
+
+    def test_profit_loss_excel_export(self):
+        """Test that the P&L Excel export has a sheet per breakdown."""
+        self.use_temporary_media_root()
+        response = self.download_export(self.client.post(reverse('profit_loss_report'), {
+            'start_date': '2024-01-01',
+            'end_date': '2024-12-31',
+            'export': 'excel',
+        }))
+
+        wb = load_workbook(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(wb.sheetnames, ['By Property', 'By Month'])
+        self.assertEqual(wb['By Property']['D2'].value, 1800)
+        self.assertEqual(wb['By Month'].max_row, 13)
+
+    def test_profit_loss_report(self):
+        """Test the profit and loss report totals."""
+        response = self.client.post(reverse('profit_loss_report'), {
+            'start_date': '2024-01-01',
+            'end_date': '2024-12-31',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_income'], Decimal('2000.00'))
+        self.assertEqual(response.context['total_expenses'], Decimal('200.00'))
+        self.assertEqual(response.context['net_profit'], Decimal('1800.00'))
+        self.assertEqual(len(response.context['monthly_data']), 12)
+        self.assertEqual(response.context['property_profit_loss'][self.property]['profit'], Decimal('1800.00'))
+
+class ReportExportJobTests(LedgerTestMixin, TestCase):
+    """Tests for the queued report exports."""
+
+    def setUp(self):
+        super().setUp()
+        self.use_temporary_media_root()
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+
+        self.create_payment()
+        self.create_expense()
+
+    def test_export_request_returns_job_id(self):
+        """Test that an AJAX export request queues a job and returns at once."""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('income_report'), {
+                'start_date': '2024-03-01',
+                'end_date': '2024-03-31',
+                'export': 'pdf',
+            }, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+        self.assertEqual(response.status_code, 202)
+        # The report is left to the worker rather than built in the request
+        self.assertFalse([query for query in context.captured_queries
+                          if MonthlyPropertyLedger._meta.db_table in query['sql']])
+        job = ReportExportJob.objects.get(pk=response.json()['id'])
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.parameters, {
+            'start_date': '2024-03-01',
+            'end_date': '2024-03-31',
+            'property_ids': [],
+        })
+        self.assertIsNone(response.json()['download_url'])
+
+    def test_status_and_download(self):
+        """Test polling a job and downloading its file once it has run."""
+        job = enqueue_export(self.user, 'profit_loss', 'pdf',
+                             start_date=date(2024, 1, 1), end_date=date(2024, 12, 31))
+        download_url = reverse('export_job_download', args=[job.pk])
+
+        self.assertEqual(self.client.get(download_url).status_code, 404)
+
+        process_jobs()
+        response = self.client.get(reverse('export_job_status', args=[job.pk]))
+        self.assertEqual(response.json()['status'], 'completed')
+        self.assertEqual(response.json()['download_url'], download_url)
+
+        response = self.client.get(download_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('profit_loss_report_20240101_20241231.pdf', response['Content-Disposition'])
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_jobs_are_scoped_to_owner(self):
+        """Test that other users cannot see or download a job."""
+        job = enqueue_export(self.user, 'tenant', 'excel')
+        process_jobs()
+
+        User.objects.create_user(username='other', password='testpassword')
+        self.client.login(username='other', password='testpassword')
+
+        self.assertEqual(self.client.get(reverse('export_job_status', args=[job.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('export_job_download', args=[job.pk])).status_code, 404)
+
+    def test_failed_job_records_error(self):
+        """Test that an export error marks the job as failed."""
+        job = enqueue_export(self.user, 'income', 'pdf', start_date='not a date')
+        process_jobs()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertTrue(job.error)
+
+    def test_stale_jobs_are_requeued(self):
+        """Test that a job abandoned by its worker is queued again."""
+        job = enqueue_export(self.user, 'income', 'excel')
+        ReportExportJob.objects.filter(pk=job.pk).update(
+            status='running', attempts=1, started_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+
+    def test_cleanup_removes_expired_jobs_and_files(self):
+        """Test that finished jobs past the retention period are deleted."""
+        job = enqueue_export(self.user, 'expense', 'excel',
+                             start_date=date(2024, 3, 1), end_date=date(2024, 3, 31))
+        process_jobs()
+        job.refresh_from_db()
+        storage, name = job.file.storage, job.file.name
+        self.assertTrue(storage.exists(name))
+
+        self.assertEqual(cleanup_jobs(), 0)
+        ReportExportJob.objects.filter(pk=job.pk).update(finished_at=timezone.now() - timedelta(days=30))
+
+        self.assertEqual(cleanup_jobs(), 1)
+        self.assertFalse(ReportExportJob.objects.exists())
+        self.assertFalse(storage.exists(name))
+
+    def test_run_report_worker_command(self):
+        """Test the run_report_worker management command."""
+        enqueue_export(self.user, 'tenant', 'pdf')
+
+        out = StringIO()
+        call_command('run_report_worker', once=True, stdout=out)
+
+        self.assertIn('Processed 1 export jobs', out.getvalue())
+        self.assertEqual(ReportExportJob.objects.get().status, 'completed')
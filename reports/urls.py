@@ -9,4 +9,7 @@ urlpatterns = [
     path('expenses/', views.expense_report, name='expense_report'),
     path('profit-loss/', views.profit_loss_report, name='profit_loss_report'),
     path('tenants/', views.tenant_report, name='tenant_report'),
+    path('exports/<int:pk>/', views.export_job_detail, name='export_job_detail'),
+    path('exports/<int:pk>/status/', views.export_job_status, name='export_job_status'),
+    path('exports/<int:pk>/download/', views.export_job_download, name='export_job_download'),
 ]
@@ -0,0 +1,25 @@
+"""
+API viewsets for the tenants app.
+"""
+from core.api import OwnerScopedViewSet
+from core.search import index_objects
+from .models import Tenant, Lease
+from .ownership import sync_tenant_ownership
+from .serializers import TenantSerializer, LeaseSerializer
+
+class TenantViewSet(OwnerScopedViewSet):
+    """Tenants leasing the owner's properties or added by the owner."""
+    queryset = Tenant.objects.all()
+    serializer_class = TenantSerializer
+
+class LeaseViewSet(OwnerScopedViewSet):
+    """Leases of the owner's properties."""
+    queryset = Lease.objects.select_related('rental_property', 'tenant')
+    serializer_class = LeaseSerializer
+    
+    def after_bulk_write(self, rows, previous_ledger_keys=()):
+        super().after_bulk_write(rows, previous_ledger_keys)
+        # Recomputed for the whole owner, as updated leases may have left a tenant
+        sync_tenant_ownership(owner_ids=[self.request.user.pk])
+        # New leases make their tenants searchable by the owner
+        index_objects('tenant', {row.tenant_id for row in rows})
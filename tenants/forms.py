@@ -3,7 +3,7 @@ Forms for the tenants app.
 """
 from django import forms
 from django.utils import timezone
-from .models import Tenant, Lease, LeaseDocument
+from .models import Tenant, Lease, LeaseDocument, owner_tenants
 from properties.models import Property
 
 class TenantForm(forms.ModelForm):
@@ -172,6 +172,8 @@ class LeaseFilterForm(forms.Form):
         ('-end_date', 'End Date (newest first)'),
         ('rent_amount', 'Rent Amount (lowest first)'),
         ('-rent_amount', 'Rent Amount (highest first)'),
+        ('days_to_expiration', 'Days Until Expiration (fewest first)'),
+        ('-term_months', 'Term (longest first)'),
     )
 
     property = forms.ModelChoiceField(
@@ -246,7 +248,7 @@ class LeaseFilterForm(forms.Form):
             self.fields['property'].queryset = Property.objects.filter(owner=user)
             
             # Only show tenants with leases on properties owned by this user
-            self.fields['tenant'].queryset = Tenant.objects.filter(leases__property__owner=user).distinct()
+            self.fields['tenant'].queryset = owner_tenants(user)
 
 class TenantFilterForm(forms.Form):
     """
@@ -0,0 +1,89 @@
+"""
+Nightly lease lifecycle transitions.
+
+Lease and property statuses are moved along with the calendar so that
+'active' always means "running today" and 'rented' always means "has an
+active lease": active leases past their end date become 'completed',
+pending leases whose start date has arrived become 'active' (and leases
+marked active ahead of their start go back to 'pending'), and properties
+are marked rented or available to match. Current-lease lookups can then
+filter on status alone.
+
+Every transition is set-based: rows are read in pk-ordered chunks through
+the status indexes and each chunk is written with one UPDATE and one bulk
+history insert.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from properties.models import Property
+from core.summary import schedule_summary_invalidation, property_owner_ids
+from .models import Lease
+
+def lease_transitions(today):
+    """Return ``(queryset, new status)`` for each lease transition due on ``today``."""
+    return [
+        (Lease.objects.filter(status='active', end_date__lt=today), 'completed'),
+        (Lease.objects.filter(status='active', start_date__gt=today), 'pending'),
+        (Lease.objects.filter(status='pending', start_date__lte=today, end_date__gte=today), 'active'),
+    ]
+
+def property_transitions():
+    """Return ``(queryset, new status)`` for the properties whose status no longer matches their leases."""
+    active_lease = Lease.objects.filter(rental_property=OuterRef('pk'), status='active')
+    return [
+        (Property.objects.filter(Exists(active_lease), status='available'), 'rented'),
+        (Property.objects.filter(~Exists(active_lease), status='rented'), 'available'),
+    ]
+
+def _apply(queryset, status, batch_size):
+    """
+    Set ``status`` on the rows of ``queryset``, ``batch_size`` at a time.
+
+    Returns the number of rows changed and the ids of their properties.
+    """
+    model = queryset.model
+    property_field = 'pk' if model is Property else 'rental_property_id'
+    queryset = queryset.order_by('pk')
+
+    changed, property_ids = 0, set()
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not chunk:
+            return changed, property_ids
+        last_pk = chunk[-1].pk
+
+        with transaction.atomic():
+            model.objects.filter(pk__in=[row.pk for row in chunk]).update(status=status)
+            for row in chunk:
+                row.status = status
+            model.history.bulk_history_create(chunk, batch_size=batch_size, update=True)
+
+        changed += len(chunk)
+        property_ids.update(getattr(row, property_field) for row in chunk)
+
+def advance_leases(today=None, batch_size=1000):
+    """
+    Apply the lease and property status transitions due on ``today``
+    (default: today).
+
+    Returns a dict with the number of leases completed, deferred and
+    activated and of properties marked rented and available.
+    """
+    today = today or timezone.now().date()
+    counts = {}
+    property_ids = set()
+
+    for (queryset, status), name in zip(lease_transitions(today), ('completed', 'deferred', 'activated')):
+        counts[name], changed = _apply(queryset, status, batch_size)
+        property_ids |= changed
+
+    # Properties are synced after the leases so they see the new statuses
+    for (queryset, status), name in zip(property_transitions(), ('rented', 'vacated')):
+        counts[name], changed = _apply(queryset, status, batch_size)
+        property_ids |= changed
+
+    # update() skips the save signals that drop the owners' cached summaries
+    schedule_summary_invalidation(property_owner_ids(property_ids))
+    return counts
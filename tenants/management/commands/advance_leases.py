@@ -0,0 +1,34 @@
+"""
+Move lease and property statuses along with the calendar.
+"""
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from tenants.lifecycle import advance_leases
+
+class Command(BaseCommand):
+    help = 'Complete expired leases, activate leases that have started and sync property statuses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help='Date to apply the transitions on, as YYYY-MM-DD (default: today).')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per transaction (default: 1000).'
+        )
+
+    def handle(self, *args, **options):
+        today = None
+        if options['as_of']:
+            try:
+                today = datetime.strptime(options['as_of'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Invalid date '{options['as_of']}', expected YYYY-MM-DD.")
+
+        counts = advance_leases(today=today, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Completed {counts['completed']} leases, activated {counts['activated']} "
+            f"and deferred {counts['deferred']}; marked {counts['rented']} properties rented "
+            f"and {counts['vacated']} available."
+        ))
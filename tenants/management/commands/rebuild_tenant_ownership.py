@@ -0,0 +1,23 @@
+"""
+Recompute which owners each tenant belongs to from the leases.
+"""
+from django.core.management.base import BaseCommand
+from tenants.ownership import rebuild_tenant_ownership
+
+class Command(BaseCommand):
+    help = 'Rebuild the tenant ownership rows used to scope tenant lists to their owners.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tenants recomputed per transaction (default: 1000).'
+        )
+
+    def handle(self, *args, **options):
+        created, deleted = rebuild_tenant_ownership(batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Added {created} and removed {deleted} tenant ownership rows.'
+        ))
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 02:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tenants', '0002_owner_time_range_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicallease',
+            name='rent_generated_through',
+            field=models.DateField(blank=True, editable=False, help_text='Last day covered by the rent payments generated by generate_rent_roll', null=True),
+        ),
+        migrations.AddField(
+            model_name='lease',
+            name='rent_generated_through',
+            field=models.DateField(blank=True, editable=False, help_text='Last day covered by the rent payments generated by generate_rent_roll', null=True),
+        ),
+    ]
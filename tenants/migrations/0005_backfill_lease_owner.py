@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+def backfill_lease_owner(apps, schema_editor):
+    """Copy the owner of each lease's property onto the lease."""
+    from properties.owners import backfill_owners
+
+    backfill_owners(apps.get_model('tenants', 'Lease'), apps.get_model('properties', 'Property'))
+
+
+class Migration(migrations.Migration):
+    # Each batch of the backfill commits on its own, so large tables are not
+    # locked for the whole migration
+    atomic = False
+
+    dependencies = [
+        ('tenants', '0004_lease_owner'),
+        ('properties', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_lease_owner, migrations.RunPython.noop),
+        # Indexes are built once the column is filled
+        migrations.AddIndex(
+            model_name='lease',
+            index=models.Index(fields=['owner', 'status', 'end_date'], name='lease_owner_status_end_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 03:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_tenant_ownership(apps, schema_editor):
+    """Record an ownership row for every (owner, tenant) pair with a lease."""
+    Lease = apps.get_model('tenants', 'Lease')
+    TenantOwnership = apps.get_model('tenants', 'TenantOwnership')
+
+    pairs = Lease.objects.filter(owner__isnull=False).values_list('owner_id', 'tenant_id').distinct().order_by()
+    TenantOwnership.objects.bulk_create(
+        [TenantOwnership(owner_id=owner_id, tenant_id=tenant_id) for owner_id, tenant_id in pairs.iterator()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tenants', '0005_backfill_lease_owner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TenantOwnership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tenant_ownerships', to=settings.AUTH_USER_MODEL)),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ownerships', to='tenants.tenant')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='tenantownership',
+            constraint=models.UniqueConstraint(fields=('owner', 'tenant'), name='tenant_ownership_owner_tenant_uniq'),
+        ),
+        migrations.RunPython(populate_tenant_ownership, migrations.RunPython.noop),
+    ]
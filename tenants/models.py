@@ -2,10 +2,13 @@
 Models for the tenants app.
 """
 from django.db import models
+from django.db.models import Prefetch, Q, F, Sum, Count, Value, Case, When, BooleanField, DecimalField, FloatField
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear, NullIf
 from django.contrib.auth.models import User
 from django.utils import timezone
 from simple_history.models import HistoricalRecords
 from properties.models import Property
+from core.expressions import DaysBetween
 
 class Tenant(models.Model):
     """
@@ -37,21 +40,50 @@ class Tenant(models.Model):
     @property
     def current_lease(self):
         """Return the current active lease for this tenant."""
-        today = timezone.now().date()
-        return self.leases.filter(
-            start_date__lte=today,
-            end_date__gte=today,
-            status='active'
-        ).first()
+        # Use the lease loaded by prefetch_current_lease when present
+        if hasattr(self, 'current_leases'):
+            return self.current_leases[0] if self.current_leases else None
+        
+        # advance_leases keeps 'active' limited to leases running today
+        return self.leases.filter(status='active').order_by('pk').first()
     
     @property
     def current_property(self):
         """Return the property where the tenant currently lives."""
         lease = self.current_lease
         if lease:
-            return lease.property
+            return lease.rental_property
         return None
 
+class LeaseQuerySet(models.QuerySet):
+    """
+    Lease queries with the computed properties of Lease available to
+    filter, sort and aggregate on in SQL.
+    """
+
+    def with_term(self, today=None):
+        """
+        Annotate ``active_now``, ``days_to_expiration`` and ``term_months``,
+        the values of ``is_active``, ``days_until_expiration`` and
+        ``lease_term_months`` on ``today`` (default: today).
+        """
+        today = today or timezone.now().date()
+        return self.annotate(
+            active_now=Case(
+                When(status='active', start_date__lte=today, end_date__gte=today, then=Value(True)),
+                default=Value(False),
+                output_field=BooleanField()
+            ),
+            days_to_expiration=Case(
+                When(status='active', end_date__gte=today, then=DaysBetween('end_date', today)),
+                default=Value(0)
+            ),
+            term_months=(
+                (ExtractYear('end_date') - ExtractYear('start_date')) * 12 +
+                ExtractMonth('end_date') - ExtractMonth('start_date')
+            ),
+        )
+
 class Lease(models.Model):
     """
     Lease agreement between property owner and tenant.
@@ -85,13 +117,37 @@ class Lease(models.Model):
     notes = models.TextField(blank=True, null=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_leases')
     date_created = models.DateTimeField(default=timezone.now)
+    rent_generated_through = models.DateField(
+        null=True, blank=True, editable=False,
+        help_text="Last day covered by the rent payments generated by generate_rent_roll"
+    )
+    # Copy of rental_property.owner, so owner-scoped queries skip the property join
+    owner = models.ForeignKey(
+        User, on_delete=models.CASCADE, null=True, editable=False, db_index=False, related_name='owned_leases'
+    )
     history = HistoricalRecords()
     
+    objects = LeaseQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # Owner-scoped lease lists and active and expiring leases
+            models.Index(fields=['owner', 'status', 'end_date'], name='lease_owner_status_end_idx'),
+            # Property-scoped active and expiring leases
+            models.Index(fields=['rental_property', 'status', 'end_date'], name='lease_prop_status_end_idx'),
+            # Leases expiring or starting across all owners
+            models.Index(fields=['status', 'end_date'], name='lease_status_end_idx'),
+            models.Index(fields=['status', 'start_date'], name='lease_status_start_idx'),
+        ]
+    
     def __str__(self):
         return f"Lease for {self.property.name} - {self.tenant.full_name}"
     
     @property
     def is_active(self):
+        # Use the values annotated by Lease.objects.with_term() when present
+        if hasattr(self, 'active_now'):
+            return self.active_now
         today = timezone.now().date()
         return (
             self.status == 'active' and 
@@ -102,6 +158,8 @@ class Lease(models.Model):
     @property
     def lease_term_months(self):
         """Calculate the lease term in months."""
+        if hasattr(self, 'term_months'):
+            return self.term_months
         months = (self.end_date.year - self.start_date.year) * 12
         months += (self.end_date.month - self.start_date.month)
         return months
@@ -109,6 +167,8 @@ class Lease(models.Model):
     @property
     def days_until_expiration(self):
         """Return the number of days until lease expires."""
+        if hasattr(self, 'days_to_expiration'):
+            return self.days_to_expiration
         if self.status != 'active':
             return 0
         
@@ -118,6 +178,101 @@ class Lease(models.Model):
         
         return (self.end_date - today).days
 
+def owner_tenants(owner):
+    """
+    Return the tenants with a lease on one of ``owner``'s properties.
+
+    Reads the TenantOwnership rows instead of joining the leases, so the
+    result needs no DISTINCT.
+    """
+    return Tenant.objects.filter(pk__in=TenantOwnership.objects.filter(owner=owner).values('tenant'))
+
+def current_leases():
+    """
+    Return the leases running today, oldest first.
+
+    These are the active leases: the nightly ``advance_leases`` job
+    completes them once they end and activates pending ones as they start.
+    Filter it on ``OuterRef('pk')`` to resolve current leases in a
+    ``Subquery``.
+    """
+    return Lease.objects.filter(status='active').order_by('pk')
+
+def prefetch_current_lease(queryset):
+    """
+    Prefetch the lease running today of every tenant or property in
+    ``queryset`` with a single extra query.
+
+    ``Tenant.current_lease``, ``Tenant.current_property`` and
+    ``Property.current_tenant`` then use the prefetched lease instead of
+    querying once per row.
+    """
+    leases = current_leases().select_related('rental_property', 'tenant')
+    return queryset.prefetch_related(Prefetch('leases', queryset=leases, to_attr='current_leases'))
+
+# Payment.OPEN_STATUSES, repeated as payments.models imports this module
+OPEN_PAYMENT_STATUSES = ('pending', 'late')
+
+def with_scorecard(queryset, owner):
+    """
+    Annotate each tenant in ``queryset`` with the totals of their payments
+    on ``owner``'s properties, computed in the same query:
+
+    ``total_paid`` and ``pending_payments`` (amounts), ``on_time_payments``
+    and ``late_payments`` (paid on or before / after the due date) and
+    ``payment_reliability`` (on-time share of those, in percent, 0 without
+    any).
+
+    ``queryset`` must not join leases or payments itself, or the totals
+    would be multiplied by the joined rows.
+    """
+    owned = Q(payments__owner=owner)
+    paid = owned & Q(payments__status='paid')
+    zero = Value(0, output_field=DecimalField(max_digits=12, decimal_places=2))
+    return queryset.annotate(
+        total_paid=Coalesce(Sum('payments__amount', filter=paid), zero),
+        pending_payments=Coalesce(Sum('payments__amount', filter=owned & Q(payments__status__in=OPEN_PAYMENT_STATUSES)), zero),
+        on_time_payments=Count('payments', filter=paid & Q(payments__payment_date__lte=F('payments__due_date'))),
+        late_payments=Count('payments', filter=paid & Q(payments__payment_date__gt=F('payments__due_date'))),
+    ).annotate(
+        payment_reliability=Coalesce(
+            F('on_time_payments') * 100.0 / NullIf(F('on_time_payments') + F('late_payments'), 0),
+            0.0,
+            output_field=FloatField()
+        )
+    )
+
+def tenant_scorecards(owner, tenant_ids=None):
+    """
+    Return the tenants leasing ``owner``'s properties (or those of them with
+    ids in ``tenant_ids``) with their payment scorecard annotated by
+    ``with_scorecard`` and their current lease prefetched: two queries for
+    any number of tenants.
+    """
+    tenants = owner_tenants(owner)
+    if tenant_ids:
+        tenants = tenants.filter(pk__in=tenant_ids)
+    return prefetch_current_lease(with_scorecard(tenants, owner))
+
+class TenantOwnership(models.Model):
+    """
+    An owner with at least one lease of a tenant.
+
+    Derived from the leases and kept in step by the lease signals (see
+    core.signals); ``rebuild_tenant_ownership`` recomputes it.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tenant_ownerships')
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='ownerships')
+    
+    class Meta:
+        constraints = [
+            # Also the index of owner-scoped tenant lookups and counts
+            models.UniqueConstraint(fields=['owner', 'tenant'], name='tenant_ownership_owner_tenant_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.tenant} - {self.owner}"
+
 class LeaseDocument(models.Model):
     """
     Documents associated with a lease (contract, addendums, etc.)
@@ -0,0 +1,59 @@
+"""
+Maintenance of the TenantOwnership rows.
+
+An owner owns a tenant while the owner has at least one lease, of any
+status, with the tenant. Rather than applying each lease change as a
+delta, the rows of the affected tenants or owners are recomputed from
+their leases, so the same function serves single saves, bulk writes and
+full rebuilds.
+"""
+from django.db import transaction
+from django.db.models import Q
+from .models import Tenant, Lease, TenantOwnership
+
+def sync_tenant_ownership(tenant_ids=(), owner_ids=()):
+    """
+    Make the TenantOwnership rows of the given tenants and owners match
+    their leases, with two reads and at most one insert and one delete.
+
+    Returns the number of rows created and deleted.
+    """
+    tenant_ids = {pk for pk in tenant_ids if pk is not None}
+    owner_ids = {pk for pk in owner_ids if pk is not None}
+    if not tenant_ids and not owner_ids:
+        return 0, 0
+
+    scope = Q(tenant__in=tenant_ids) | Q(owner__in=owner_ids)
+    wanted = set(
+        Lease.objects.filter(scope, owner__isnull=False).values_list('owner_id', 'tenant_id').distinct().order_by()
+    )
+    existing = {
+        (owner_id, tenant_id): pk
+        for pk, owner_id, tenant_id in TenantOwnership.objects.filter(scope).values_list('pk', 'owner_id', 'tenant_id')
+    }
+
+    with transaction.atomic():
+        created = TenantOwnership.objects.bulk_create(
+            [TenantOwnership(owner_id=owner_id, tenant_id=tenant_id) for owner_id, tenant_id in wanted - existing.keys()],
+            ignore_conflicts=True
+        )
+        stale = [pk for key, pk in existing.items() if key not in wanted]
+        deleted = TenantOwnership.objects.filter(pk__in=stale).delete()[0] if stale else 0
+    return len(created), deleted
+
+def rebuild_tenant_ownership(batch_size=1000):
+    """
+    Recompute the TenantOwnership rows of every tenant, ``batch_size``
+    tenants at a time. Returns the number of rows created and deleted.
+    """
+    created = deleted = 0
+    tenant_ids = Tenant.objects.order_by('pk').values_list('pk', flat=True)
+    last_pk = 0
+    while True:
+        chunk = list(tenant_ids.filter(pk__gt=last_pk)[:batch_size])
+        if not chunk:
+            return created, deleted
+        chunk_created, chunk_deleted = sync_tenant_ownership(tenant_ids=chunk)
+        created += chunk_created
+        deleted += chunk_deleted
+        last_pk = chunk[-1]
@@ -0,0 +1,37 @@
+"""
+API serializers for the tenants app.
+"""
+from rest_framework import serializers
+from core.api import OwnerScopedSerializer
+from .models import Tenant, Lease
+
+class TenantSerializer(OwnerScopedSerializer):
+    class Meta:
+        model = Tenant
+        fields = [
+            'id', 'first_name', 'last_name', 'email', 'phone', 'date_of_birth', 'ssn_last_four',
+            'emergency_contact_name', 'emergency_contact_phone', 'employment_status', 'employer',
+            'income', 'notes', 'created_by', 'date_created',
+        ]
+        read_only_fields = ['created_by', 'date_created']
+
+class LeaseSerializer(OwnerScopedSerializer):
+    property_name = serializers.CharField(source='rental_property.name', read_only=True)
+    tenant_name = serializers.CharField(source='tenant.full_name', read_only=True)
+    
+    class Meta:
+        model = Lease
+        fields = [
+            'id', 'rental_property', 'property_name', 'tenant', 'tenant_name', 'lease_type',
+            'start_date', 'end_date', 'rent_amount', 'security_deposit', 'status', 'payment_day',
+            'late_fee', 'grace_period', 'is_security_deposit_paid', 'notes', 'rent_generated_through',
+            'created_by', 'date_created',
+        ]
+        read_only_fields = ['created_by', 'date_created']
+    
+    def validate(self, data):
+        start_date = data.get('start_date', getattr(self.instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(self.instance, 'end_date', None))
+        if start_date and end_date and end_date <= start_date:
+            raise serializers.ValidationError({'end_date': 'End date must be after start date.'})
+        return data
@@ -1,13 +1,21 @@
 """
 Tests for the tenants app.
 """
-from django.test import TestCase, Client
+from io import StringIO
+from django.test import TestCase, Client, RequestFactory
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.utils import timezone
 from datetime import date, timedelta
 from properties.models import Property, PropertyType
-from .models import Tenant, Lease
+from payments.models import Payment
+from payments.forms import PaymentForm
+from .models import Tenant, Lease, TenantOwnership, prefetch_current_lease, tenant_scorecards
+from .views import TenantDetailView
+from .lifecycle import advance_leases
 from decimal import Decimal
 
 class TenantModelTests(TestCase):
@@ -449,3 +457,425 @@ class LeaseViewTests(TestCase):
         # Check that it has the updated values
         self.assertEqual(self.lease.rent_amount, Decimal('1100.00'))
         self.assertEqual(self.lease.grace_period, 7)
+
+class TenantExportTests(TestCase):
+    """Tests for the tenant and lease CSV exports."""
+    
+    def setUp(self):
+        # Create a user and login
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+        
+        # Create a property
+        self.property = Property.objects.create(
+            owner=self.user,
+            name='Test Property',
+            address='123 Test St',
+            city='Test City',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00')
+        )
+        
+        # Create a tenant with a current lease
+        self.tenant = Tenant.objects.create(
+            first_name='John',
+            last_name='Doe',
+            email='john.doe@example.com',
+            phone='555-123-4567',
+            created_by=self.user
+        )
+        self.today = timezone.now().date()
+        self.lease = Lease.objects.create(
+            rental_property=self.property,
+            tenant=self.tenant,
+            lease_type='fixed',
+            start_date=self.today - timedelta(days=30),
+            end_date=self.today + timedelta(days=335),
+            rent_amount=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00'),
+            status='active',
+            created_by=self.user
+        )
+    
+    def read_csv(self, response):
+        return b''.join(response.streaming_content).decode().splitlines()
+    
+    def test_export_tenants(self):
+        """Test that tenants are streamed with their current lease."""
+        response = self.client.get(reverse('export_tenants'))
+        
+        self.assertEqual(response.status_code, 200)
+        lines = self.read_csv(response)
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(
+            lines[1],
+            f'John,Doe,john.doe@example.com,555-123-4567,,,,'
+            f'{self.lease.start_date} to {self.lease.end_date},Test Property'
+        )
+    
+    def test_export_leases(self):
+        """Test that leases are streamed with display values."""
+        response = self.client.get(reverse('export_leases'))
+        
+        self.assertEqual(response.status_code, 200)
+        lines = self.read_csv(response)
+        self.assertEqual(
+            lines[1],
+            f'Test Property,John Doe,Fixed Term,{self.lease.start_date},{self.lease.end_date},'
+            f'Active,1000.00,1000.00,1'
+        )
+
+class CurrentLeaseTests(TestCase):
+    """Tests for resolving current leases in bulk."""
+    
+    def setUp(self):
+        # Create a user and login
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpassword'
+        )
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+        self.today = timezone.now().date()
+        self.add_tenants(2)
+    
+    def add_tenants(self, count):
+        """Create rented properties with a past and a current lease each."""
+        for number in range(count):
+            rental_property = Property.objects.create(
+                owner=self.user,
+                name=f'Property {Property.objects.count()}',
+                address='123 Test St',
+                city='Test City',
+                state='TS',
+                zip_code='12345',
+                monthly_rent=Decimal('1000.00'),
+                security_deposit=Decimal('1000.00'),
+                status='rented'
+            )
+            tenant = Tenant.objects.create(
+                first_name='Tenant',
+                last_name=str(Tenant.objects.count()),
+                phone='555-123-4567',
+                created_by=self.user
+            )
+            for start_date, status in [
+                (self.today - timedelta(days=400), 'completed'),
+                (self.today - timedelta(days=30), 'active'),
+            ]:
+                Lease.objects.create(
+                    rental_property=rental_property,
+                    tenant=tenant,
+                    start_date=start_date,
+                    end_date=start_date + timedelta(days=365),
+                    rent_amount=Decimal('1000.00'),
+                    security_deposit=Decimal('1000.00'),
+                    status=status,
+                    created_by=self.user
+                )
+    
+    def count_queries(self, url_name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+    
+    def test_prefetched_values_match_queries(self):
+        """Test that prefetched current leases match the per-row lookups."""
+        tenants = list(Tenant.objects.order_by('pk'))
+        prefetched = list(prefetch_current_lease(Tenant.objects.order_by('pk')))
+        properties = list(Property.objects.order_by('pk'))
+        prefetched_properties = list(prefetch_current_lease(Property.objects.order_by('pk')))
+        
+        with self.assertNumQueries(0):
+            current = [(tenant.current_lease, tenant.current_property) for tenant in prefetched]
+            current_tenants = [rental_property.current_tenant for rental_property in prefetched_properties]
+        
+        self.assertEqual(current, [(tenant.current_lease, tenant.current_property) for tenant in tenants])
+        self.assertEqual(current_tenants, [rental_property.current_tenant for rental_property in properties])
+        self.assertEqual(current[0][0].status, 'active')
+    
+    def test_list_views_use_constant_queries(self):
+        """Test that the tenant and property lists do not query per row."""
+        tenant_list = self.count_queries('tenant_list')
+        property_list = self.count_queries('property_list')
+        
+        self.add_tenants(5)
+        
+        self.assertEqual(self.count_queries('tenant_list'), tenant_list)
+        self.assertEqual(self.count_queries('property_list'), property_list)
+
+class TenantScorecardTests(CurrentLeaseTests):
+    """Tests for the annotated tenant payment scorecards."""
+    
+    def add_payment(self, tenant, due_date, payment_date=None, status='paid', amount='1000.00'):
+        return Payment.objects.create(
+            rental_property=tenant.leases.first().rental_property,
+            tenant=tenant,
+            amount=Decimal(amount),
+            due_date=due_date,
+            payment_date=payment_date,
+            status=status,
+            created_by=self.user
+        )
+    
+    def test_scorecard_totals(self):
+        """Test the totals of tenants with several leases and payments."""
+        first, second = Tenant.objects.order_by('pk')
+        self.add_payment(first, date(2024, 1, 1), date(2024, 1, 1))
+        self.add_payment(first, date(2024, 2, 1), date(2024, 2, 9))
+        self.add_payment(first, date(2024, 3, 1), date(2024, 2, 28))
+        self.add_payment(first, date(2024, 4, 1), status='pending', amount='500.00')
+        
+        # Another owner's payments do not count
+        other = User.objects.create_user(username='other', password='testpassword')
+        other_property = Property.objects.create(
+            owner=other, name='Other', address='1 Other St', city='Test City', state='TS',
+            zip_code='12345', monthly_rent=Decimal('900.00'), security_deposit=Decimal('900.00')
+        )
+        Payment.objects.create(rental_property=other_property, tenant=first, amount=Decimal('900.00'),
+                               due_date=date(2024, 1, 1), payment_date=date(2024, 1, 1), status='paid')
+        
+        with self.assertNumQueries(2):
+            scorecards = {tenant.pk: tenant for tenant in tenant_scorecards(self.user)}
+            self.assertEqual(scorecards[first.pk].current_lease.status, 'active')
+        
+        card = scorecards[first.pk]
+        self.assertEqual((card.total_paid, card.pending_payments), (Decimal('3000.00'), Decimal('500.00')))
+        self.assertEqual((card.on_time_payments, card.late_payments), (2, 1))
+        self.assertAlmostEqual(card.payment_reliability, 200 / 3)
+        
+        empty = scorecards[second.pk]
+        self.assertEqual((empty.total_paid, empty.on_time_payments, empty.payment_reliability), (0, 0, 0))
+        
+        self.assertEqual([tenant.pk for tenant in tenant_scorecards(self.user, [second.pk])], [second.pk])
+        self.assertFalse(tenant_scorecards(other).exists())
+    
+    def test_detail_view_uses_scorecard(self):
+        """Test that the tenant detail shows the scorecard figures."""
+        tenant = Tenant.objects.order_by('pk').first()
+        self.add_payment(tenant, date(2024, 1, 1), date(2024, 1, 5))
+        
+        # The detail template is not part of this repository, so build the context directly
+        request = RequestFactory().get(reverse('tenant_detail', args=[tenant.pk]))
+        request.user = self.user
+        view = TenantDetailView()
+        view.setup(request, pk=tenant.pk)
+        view.object = view.get_object()
+        context = view.get_context_data()
+        
+        self.assertEqual(context['total_paid'], Decimal('1000.00'))
+        self.assertEqual(context['on_time_percentage'], 0)
+        self.assertEqual(context['active_lease'].status, 'active')
+
+class LeaseLifecycleTests(TestCase):
+    """Tests for the nightly lease and property status transitions."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.today = date(2024, 6, 1)
+        self.tenant = Tenant.objects.create(
+            first_name='John',
+            last_name='Doe',
+            phone='555-123-4567',
+            created_by=self.user
+        )
+    
+    def add_lease(self, start_date, end_date, status, property_status='available'):
+        rental_property = Property.objects.create(
+            owner=self.user,
+            name=f'Property {Property.objects.count()}',
+            address='123 Test St',
+            city='Test City',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00'),
+            status=property_status
+        )
+        return Lease.objects.create(
+            rental_property=rental_property,
+            tenant=self.tenant,
+            start_date=start_date,
+            end_date=end_date,
+            rent_amount=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00'),
+            status=status,
+            created_by=self.user
+        )
+    
+    def test_transitions(self):
+        """Test that lease and property statuses follow the calendar."""
+        expired = self.add_lease(date(2023, 6, 1), date(2024, 5, 31), 'active', 'rented')
+        starting = self.add_lease(date(2024, 6, 1), date(2025, 5, 31), 'pending')
+        early = self.add_lease(date(2024, 7, 1), date(2025, 6, 30), 'active', 'rented')
+        running = self.add_lease(date(2024, 1, 1), date(2024, 12, 31), 'active', 'maintenance')
+        terminated = self.add_lease(date(2023, 1, 1), date(2023, 12, 31), 'terminated', 'rented')
+        
+        counts = advance_leases(today=self.today)
+        
+        self.assertEqual(counts, {'completed': 1, 'deferred': 1, 'activated': 1, 'rented': 1, 'vacated': 3})
+        statuses = [
+            (lease.status, lease.rental_property.status)
+            for lease in Lease.objects.filter(
+                pk__in=[expired.pk, starting.pk, early.pk, running.pk, terminated.pk]
+            ).select_related('rental_property').order_by('pk')
+        ]
+        self.assertEqual(statuses, [
+            ('completed', 'available'),
+            ('active', 'rented'),
+            ('pending', 'available'),
+            ('active', 'maintenance'),
+            ('terminated', 'available'),
+        ])
+        self.assertEqual(expired.history.first().status, 'completed')
+        self.assertEqual(starting.rental_property.history.first().status, 'rented')
+        self.assertEqual(self.tenant.current_lease, starting)
+        
+        # A second run has nothing left to do
+        self.assertFalse(any(advance_leases(today=self.today).values()))
+    
+    def test_queries_do_not_grow_with_leases(self):
+        """Test that each transition is applied in bulk."""
+        self.add_lease(date(2023, 6, 1), date(2024, 5, 31), 'active', 'rented')
+        with CaptureQueriesContext(connection) as one_lease:
+            advance_leases(today=self.today)
+        
+        for number in range(5):
+            self.add_lease(date(2023, 6, 1), date(2024, 5, 31), 'active', 'rented')
+        with CaptureQueriesContext(connection) as many_leases:
+            counts = advance_leases(today=self.today)
+        
+        self.assertEqual((counts['completed'], counts['vacated']), (5, 5))
+        self.assertEqual(len(many_leases), len(one_lease))
+    
+    def test_command(self):
+        """Test that the command reports the transitions it applied."""
+        self.add_lease(date(2023, 6, 1), date(2024, 5, 31), 'active', 'rented')
+        stdout = StringIO()
+        call_command('advance_leases', as_of='2024-06-01', stdout=stdout)
+        
+        self.assertIn('Completed 1 leases', stdout.getvalue())
+        self.assertIn('1 available', stdout.getvalue())
+
+class LeaseAnnotationTests(LeaseLifecycleTests):
+    """Tests for computing lease activity, expiration and term in SQL."""
+    
+    def test_annotations_match_properties(self):
+        """Test that the annotated values equal the Python properties."""
+        today = timezone.now().date()
+        self.add_lease(today - timedelta(days=30), today + timedelta(days=45), 'active')
+        self.add_lease(date(2023, 1, 15), date(2023, 12, 14), 'completed')
+        self.add_lease(today + timedelta(days=10), today + timedelta(days=375), 'pending')
+        
+        leases = list(Lease.objects.with_term().order_by('pk'))
+        plain = list(Lease.objects.order_by('pk'))
+        
+        self.assertEqual(
+            [(lease.active_now, lease.days_to_expiration, lease.term_months) for lease in leases],
+            [(lease.is_active, lease.days_until_expiration, lease.lease_term_months) for lease in plain]
+        )
+        self.assertEqual(leases[0].days_to_expiration, 45)
+        self.assertEqual(leases[1].term_months, 11)
+        
+        with self.assertNumQueries(1):
+            longest = Lease.objects.with_term().filter(active_now=False).order_by('-term_months').first()
+        self.assertEqual(longest.status, 'pending')
+
+class TenantOwnershipTests(TestCase):
+    """Tests for the owner-tenant rows that scope tenant lists."""
+    
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.other = User.objects.create_user(username='otheruser', password='testpassword')
+        self.client = Client()
+        self.client.login(username='testuser', password='testpassword')
+        
+        self.property = self.add_property(self.user)
+        self.other_property = self.add_property(self.other)
+        self.tenant = Tenant.objects.create(first_name='John', last_name='Doe', created_by=self.user)
+        self.other_tenant = Tenant.objects.create(first_name='Jane', last_name='Roe', created_by=self.other)
+    
+    def add_property(self, owner):
+        return Property.objects.create(
+            owner=owner,
+            name=f'Property {Property.objects.count()}',
+            address='123 Test St',
+            city='Test City',
+            state='TS',
+            zip_code='12345',
+            monthly_rent=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00')
+        )
+    
+    def add_lease(self, rental_property, tenant, start_date=date(2024, 1, 1)):
+        return Lease.objects.create(
+            rental_property=rental_property,
+            tenant=tenant,
+            start_date=start_date,
+            end_date=start_date + timedelta(days=364),
+            rent_amount=Decimal('1000.00'),
+            security_deposit=Decimal('1000.00'),
+            status='active',
+            created_by=rental_property.owner
+        )
+    
+    def ownerships(self):
+        return set(TenantOwnership.objects.values_list('owner__username', 'tenant__first_name'))
+    
+    def test_maintained_by_lease_signals(self):
+        """Test that the rows follow leases being added, moved and deleted."""
+        first = self.add_lease(self.property, self.tenant)
+        renewal = self.add_lease(self.property, self.tenant, date(2025, 1, 1))
+        self.add_lease(self.other_property, self.other_tenant)
+        self.assertEqual(self.ownerships(), {('testuser', 'John'), ('otheruser', 'Jane')})
+        
+        # The owner keeps the tenant until the last of their leases goes
+        first.delete()
+        self.assertEqual(self.ownerships(), {('testuser', 'John'), ('otheruser', 'Jane')})
+        renewal.tenant = self.other_tenant
+        renewal.save()
+        self.assertEqual(self.ownerships(), {('testuser', 'Jane'), ('otheruser', 'Jane')})
+        
+        # A property changing hands takes its tenants along
+        self.property.owner = self.other
+        self.property.save()
+        self.assertEqual(self.ownerships(), {('otheruser', 'Jane')})
+    
+    def test_scoped_without_distinct(self):
+        """Test that tenant lists, counts and forms only see the owner's tenants, each once."""
+        self.add_lease(self.property, self.tenant)
+        self.add_lease(self.property, self.tenant, date(2025, 1, 1))
+        self.add_lease(self.other_property, self.other_tenant)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('tenant_list'))
+        self.assertEqual(list(response.context['tenants']), [self.tenant])
+        self.assertFalse(any('DISTINCT' in query['sql'] for query in queries))
+        
+        self.assertEqual(self.client.get(reverse('tenant_detail', args=[self.other_tenant.pk])).status_code, 404)
+        self.assertEqual(list(PaymentForm(user=self.user).fields['tenant'].queryset), [self.tenant])
+        
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['tenant_count'], 1)
+    
+    def test_rebuild_command(self):
+        """Test that the command restores missing rows and drops stale ones."""
+        self.add_lease(self.property, self.tenant)
+        self.add_lease(self.other_property, self.other_tenant)
+        TenantOwnership.objects.all().delete()
+        TenantOwnership.objects.create(owner=self.user, tenant=self.other_tenant)
+        
+        stdout = StringIO()
+        call_command('rebuild_tenant_ownership', batch_size=1, stdout=stdout)
+        
+        self.assertIn('Added 2 and removed 1', stdout.getvalue())
+        self.assertEqual(self.ownerships(), {('testuser', 'John'), ('otheruser', 'Jane')})
@@ -7,13 +7,14 @@ from django.views.generic import ListView, DetailView, CreateView, UpdateView, D
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Sum, Count, Q
+from django.db.models import Sum, Count, Q, F, OuterRef, Subquery
 from django.utils import timezone
 from django.http import HttpResponse
-import csv
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
-from .models import Tenant, Lease, LeaseDocument
+from .models import (
+    Tenant, Lease, LeaseDocument, current_leases, prefetch_current_lease, tenant_scorecards, owner_tenants
+)
 from .forms import (
     TenantForm, LeaseForm, LeaseDocumentForm,
     TenantFilterForm, LeaseFilterForm
@@ -21,6 +22,10 @@ from .forms import (
 from properties.models import Property
 from payments.models import Payment
 from core.models import Notification
+from core.exports import stream_csv, EXPORT_CHUNK_SIZE
+from core.summary import get_owner_summary
+from core.pagination import KeysetPaginationMixin
+from core.search import search_object_ids
 
 class TenantListView(LoginRequiredMixin, ListView):
     """
@@ -34,7 +39,7 @@ class TenantListView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         """Filter tenants based on query parameters."""
         # Start with tenants who have leases on properties owned by the current user
-        queryset = Tenant.objects.filter(leases__rental_property__owner=self.request.user).distinct()
+        queryset = owner_tenants(self.request.user)
         
         # Get filter form
         self.form = TenantFilterForm(self.request.GET or None, user=self.request.user)
@@ -44,32 +49,20 @@ class TenantListView(LoginRequiredMixin, ListView):
             data = self.form.cleaned_data
             
             if data.get('search'):
-                search_term = data['search']
                 queryset = queryset.filter(
-                    Q(first_name__icontains=search_term) |
-                    Q(last_name__icontains=search_term) |
-                    Q(email__icontains=search_term) |
-                    Q(phone__icontains=search_term)
+                    pk__in=search_object_ids(self.request.user, 'tenant', data['search'])
                 )
             
             if data.get('property'):
-                queryset = queryset.filter(leases__rental_property=data['property']).distinct()
+                queryset = queryset.filter(
+                    pk__in=Lease.objects.filter(rental_property=data['property']).values('tenant')
+                )
             
+            active_tenant_ids = Lease.objects.filter(status='active').values('tenant')
             if data.get('has_active_lease') == 'yes':
-                today = timezone.now().date()
-                queryset = queryset.filter(
-                    leases__status='active',
-                    leases__start_date__lte=today,
-                    leases__end_date__gte=today
-                ).distinct()
+                queryset = queryset.filter(pk__in=active_tenant_ids)
             elif data.get('has_active_lease') == 'no':
-                today = timezone.now().date()
-                active_tenant_ids = Tenant.objects.filter(
-                    leases__status='active',
-                    leases__start_date__lte=today,
-                    leases__end_date__gte=today
-                ).values_list('id', flat=True)
-                queryset = queryset.exclude(id__in=active_tenant_ids)
+                queryset = queryset.exclude(pk__in=active_tenant_ids)
             
             # Sort results
             sort_by = data.get('sort_by') or 'last_name'
@@ -78,7 +71,8 @@ class TenantListView(LoginRequiredMixin, ListView):
             # Default sorting
             queryset = queryset.order_by('last_name')
         
-        return queryset
+        # Load every tenant's current lease and property in one query
+        return prefetch_current_lease(queryset)
     
     def get_context_data(self, **kwargs):
         """Add additional context data."""
@@ -87,27 +81,8 @@ class TenantListView(LoginRequiredMixin, ListView):
         # Add filter form to context
         context['form'] = self.form
         
-        # Add tenant stats
-        tenants = Tenant.objects.filter(leases__rental_property__owner=self.request.user).distinct()
-        
-        # Count of all tenants
-        context['total_tenants'] = tenants.count()
-        
-        # Count of active tenants
-        today = timezone.now().date()
-        context['active_tenants'] = tenants.filter(
-            leases__status='active',
-            leases__start_date__lte=today,
-            leases__end_date__gte=today
-        ).distinct().count()
-        
-        # Calculate tenants with leases expiring in the next 30 days
-        thirty_days_from_now = today + timedelta(days=30)
-        context['expiring_leases'] = Lease.objects.filter(
-            rental_property__owner=self.request.user,
-            status='active',
-            end_date__range=[today, thirty_days_from_now]
-        ).count()
+        # Add tenant stats (all, active, with leases expiring in 30 days)
+        context.update(get_owner_summary(self.request.user, 'tenants'))
         
         return context
 
@@ -121,17 +96,18 @@ class TenantDetailView(LoginRequiredMixin, DetailView):
     
     def get_queryset(self):
         """Ensure user can only view tenants with leases on their properties."""
-        return Tenant.objects.filter(leases__rental_property__owner=self.request.user).distinct()
+        # The tenant comes with its payment scorecard and current lease
+        return tenant_scorecards(self.request.user)
     
     def get_context_data(self, **kwargs):
         """Add additional context data."""
         context = super().get_context_data(**kwargs)
-        tenant = self.get_object()
+        tenant = self.object
         
         # Get tenant leases
         context['leases'] = Lease.objects.filter(
             tenant=tenant,
-            rental_property__owner=self.request.user
+            owner=self.request.user
         ).order_by('-start_date')
         
         # Get active lease
@@ -140,39 +116,22 @@ class TenantDetailView(LoginRequiredMixin, DetailView):
         # Get payment history
         context['payments'] = Payment.objects.filter(
             tenant=tenant,
-            rental_property__owner=self.request.user
+            owner=self.request.user
         ).order_by('-due_date')
         
-        # Calculate payment statistics
-        total_paid = context['payments'].filter(status='paid').aggregate(
-            total=Sum('amount'))['total'] or 0
-        context['total_paid'] = total_paid
-        
-        paid_on_time = context['payments'].filter(
-            status='paid', 
-            payment_date__lte=F('due_date')
-        ).count()
-        
-        paid_late = context['payments'].filter(
-            status='paid', 
-            payment_date__gt=F('due_date')
-        ).count()
-        
-        total_payments = paid_on_time + paid_late
-        if total_payments > 0:
-            context['on_time_percentage'] = (paid_on_time / total_payments) * 100
-        else:
-            context['on_time_percentage'] = 0
+        # Payment statistics from the scorecard
+        context['total_paid'] = tenant.total_paid
+        context['on_time_percentage'] = tenant.payment_reliability
         
         # Pending payments
         context['pending_payments'] = context['payments'].filter(
-            status='pending', 
+            status__in=Payment.OPEN_STATUSES,
             due_date__gte=timezone.now().date()
         )
         
         # Overdue payments
         context['overdue_payments'] = context['payments'].filter(
-            status='pending', 
+            status__in=Payment.OPEN_STATUSES,
             due_date__lt=timezone.now().date()
         )
         
@@ -212,7 +171,7 @@ class TenantUpdateView(LoginRequiredMixin, UpdateView):
     
     def get_queryset(self):
         """Ensure user can only update tenants with leases on their properties."""
-        return Tenant.objects.filter(leases__rental_property__owner=self.request.user).distinct()
+        return owner_tenants(self.request.user)
     
     def get_context_data(self, **kwargs):
         """Add context data."""
@@ -239,14 +198,14 @@ class TenantDeleteView(LoginRequiredMixin, DeleteView):
     
     def get_queryset(self):
         """Ensure user can only delete tenants with leases on their properties."""
-        return Tenant.objects.filter(leases__rental_property__owner=self.request.user).distinct()
+        return owner_tenants(self.request.user)
     
     def delete(self, request, *args, **kwargs):
         """Handle tenant deletion."""
         messages.success(request, 'Tenant deleted successfully!')
         return super().delete(request, *args, **kwargs)
 
-class LeaseListView(LoginRequiredMixin, ListView):
+class LeaseListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     """
     Display a list of leases with filtering options.
     """
@@ -257,7 +216,8 @@ class LeaseListView(LoginRequiredMixin, ListView):
     
     def get_queryset(self):
         """Filter leases based on query parameters."""
-        queryset = Lease.objects.filter(rental_property__owner=self.request.user)
+        # Activity, days to expiration and term are computed in SQL to sort on
+        queryset = Lease.objects.with_term().filter(owner=self.request.user)
         
         # Get filter form
         self.form = LeaseFilterForm(self.request.GET or None, user=self.request.user)
@@ -312,39 +272,8 @@ class LeaseListView(LoginRequiredMixin, ListView):
         # Add filter form to context
         context['form'] = self.form
         
-        # Add lease stats
-        today = timezone.now().date()
-        
-        # Active leases
-        context['active_leases'] = Lease.objects.filter(
-            rental_property__owner=self.request.user,
-            status='active',
-            start_date__lte=today,
-            end_date__gte=today
-        ).count()
-        
-        # Expiring soon (next 30 days)
-        thirty_days_from_now = today + timedelta(days=30)
-        context['expiring_soon'] = Lease.objects.filter(
-            rental_property__owner=self.request.user,
-            status='active',
-            end_date__range=[today, thirty_days_from_now]
-        ).count()
-        
-        # Recently started (last 30 days)
-        thirty_days_ago = today - timedelta(days=30)
-        context['recently_started'] = Lease.objects.filter(
-            rental_property__owner=self.request.user,
-            start_date__range=[thirty_days_ago, today]
-        ).count()
-        
-        # Monthly rent from active leases
-        context['monthly_rent'] = Lease.objects.filter(
-            rental_property__owner=self.request.user,
-            status='active',
-            start_date__lte=today,
-            end_date__gte=today
-        ).aggregate(total=Sum('rent_amount'))['total'] or 0
+        # Add lease stats (active, expiring soon, recently started, monthly rent)
+        context.update(get_owner_summary(self.request.user, 'leases'))
         
         return context
 
@@ -358,7 +287,7 @@ class LeaseDetailView(LoginRequiredMixin, DetailView):
     
     def get_queryset(self):
         """Ensure user can only view their own leases."""
-        return Lease.objects.filter(rental_property__owner=self.request.user)
+        return Lease.objects.filter(owner=self.request.user)
     
     def get_context_data(self, **kwargs):
         """Add additional context data."""
@@ -376,7 +305,7 @@ class LeaseDetailView(LoginRequiredMixin, DetailView):
             total=Sum('amount'))['total'] or 0
         
         context['pending_payments'] = context['payments'].filter(
-            status='pending'
+            status__in=Payment.OPEN_STATUSES
         ).order_by('due_date')
         
         context['pending_amount'] = context['pending_payments'].aggregate(
@@ -474,7 +403,7 @@ class LeaseUpdateView(LoginRequiredMixin, UpdateView):
     
     def get_queryset(self):
         """Ensure user can only update their own leases."""
-        return Lease.objects.filter(rental_property__owner=self.request.user)
+        return Lease.objects.filter(owner=self.request.user)
     
     def get_form_kwargs(self):
         """Pass the current user to the form."""
@@ -529,7 +458,7 @@ class LeaseDeleteView(LoginRequiredMixin, DeleteView):
     
     def get_queryset(self):
         """Ensure user can only delete their own leases."""
-        return Lease.objects.filter(rental_property__owner=self.request.user)
+        return Lease.objects.filter(owner=self.request.user)
     
     def delete(self, request, *args, **kwargs):
         """Handle lease deletion and property status update."""
@@ -556,7 +485,7 @@ def renew_lease(request, pk):
     """
     Renew a lease with updated terms.
     """
-    old_lease = get_object_or_404(Lease, pk=pk, rental_property__owner=request.user)
+    old_lease = get_object_or_404(Lease, pk=pk, owner=request.user)
     
     if request.method == 'POST':
         form = LeaseForm(request.POST, user=request.user)
@@ -620,7 +549,7 @@ def terminate_lease(request, pk):
     """
     Terminate a lease early.
     """
-    lease = get_object_or_404(Lease, pk=pk, rental_property__owner=request.user)
+    lease = get_object_or_404(Lease, pk=pk, owner=request.user)
     
     if request.method == 'POST':
         termination_date = request.POST.get('termination_date')
@@ -678,7 +607,7 @@ def add_lease_document(request, pk):
     """
     Add a document to a lease.
     """
-    lease = get_object_or_404(Lease, pk=pk, rental_property__owner=request.user)
+    lease = get_object_or_404(Lease, pk=pk, owner=request.user)
     
     if request.method == 'POST':
         form = LeaseDocumentForm(request.POST, request.FILES)
@@ -703,7 +632,7 @@ def delete_lease_document(request, pk):
     """
     Delete a lease document.
     """
-    document = get_object_or_404(LeaseDocument, pk=pk, lease__rental_property__owner=request.user)
+    document = get_object_or_404(LeaseDocument, pk=pk, lease__owner=request.user)
     lease_id = document.lease.id
     
     document.delete()
@@ -716,64 +645,73 @@ def export_tenants(request):
     """
     Export tenants to CSV.
     """
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="tenants.csv"'
-    
-    # Create CSV writer
-    writer = csv.writer(response)
-    writer.writerow([
+    # Resolve each tenant's current lease in the same query
+    tenant_leases = current_leases().filter(tenant=OuterRef('pk'))
+    
+    tenants = owner_tenants(request.user).annotate(
+        lease_start=Subquery(tenant_leases.values('start_date')[:1]),
+        lease_end=Subquery(tenant_leases.values('end_date')[:1]),
+        property_name=Subquery(tenant_leases.values('rental_property__name')[:1])
+    ).order_by('last_name', 'first_name', 'pk').values_list(
+        'first_name', 'last_name', 'email', 'phone', 'date_of_birth',
+        'emergency_contact_name', 'emergency_contact_phone',
+        'lease_start', 'lease_end', 'property_name'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    
+    rows = (
+        [
+            first_name,
+            last_name,
+            email or '',
+            phone or '',
+            date_of_birth.strftime('%Y-%m-%d') if date_of_birth else '',
+            emergency_contact_name or '',
+            emergency_contact_phone or '',
+            f"{lease_start} to {lease_end}" if lease_start else 'None',
+            property_name or 'None'
+        ]
+        for (first_name, last_name, email, phone, date_of_birth, emergency_contact_name,
+             emergency_contact_phone, lease_start, lease_end, property_name) in tenants
+    )
+    
+    return stream_csv('tenants.csv', [
         'First Name', 'Last Name', 'Email', 'Phone', 'Date of Birth',
         'Emergency Contact', 'Emergency Phone', 'Current Lease', 'Current Property'
-    ])
-    
-    # Add tenant data
-    tenants = Tenant.objects.filter(leases__rental_property__owner=request.user).distinct()
-    for tenant in tenants:
-        current_lease = tenant.current_lease
-        current_property = tenant.current_property
-        
-        writer.writerow([
-            tenant.first_name,
-            tenant.last_name,
-            tenant.email or '',
-            tenant.phone or '',
-            tenant.date_of_birth.strftime('%Y-%m-%d') if tenant.date_of_birth else '',
-            tenant.emergency_contact_name or '',
-            tenant.emergency_contact_phone or '',
-            f"{current_lease.start_date} to {current_lease.end_date}" if current_lease else 'None',
-            current_property.name if current_property else 'None'
-        ])
-    
-    return response
+    ], rows)
 
 @login_required
 def export_leases(request):
     """
     Export leases to CSV.
     """
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="leases.csv"'
-    
-    # Create CSV writer
-    writer = csv.writer(response)
-    writer.writerow([
+    lease_types = dict(Lease.LEASE_TYPES)
+    lease_statuses = dict(Lease.LEASE_STATUS)
+    
+    # Fetch the related names up front and stream rows in chunks
+    leases = Lease.objects.filter(
+        owner=request.user
+    ).order_by('pk').values_list(
+        'rental_property__name', 'tenant__first_name', 'tenant__last_name', 'lease_type',
+        'start_date', 'end_date', 'status', 'rent_amount', 'security_deposit', 'payment_day'
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    
+    rows = (
+        [
+            property_name,
+            f"{first_name} {last_name}",
+            lease_types.get(lease_type, lease_type),
+            start_date,
+            end_date,
+            lease_statuses.get(status, status),
+            rent_amount,
+            security_deposit,
+            payment_day
+        ]
+        for (property_name, first_name, last_name, lease_type, start_date, end_date,
+             status, rent_amount, security_deposit, payment_day) in leases
+    )
+    
+    return stream_csv('leases.csv', [
         'Property', 'Tenant', 'Type', 'Start Date', 'End Date',
         'Status', 'Rent Amount', 'Security Deposit', 'Payment Day'
-    ])
-    
-    # Add lease data
-    leases = Lease.objects.filter(property__owner=request.user)
-    for lease in leases:
-        writer.writerow([
-            lease.rental_property.name,
-            lease.tenant.full_name,
-            lease.get_lease_type_display(),
-            lease.start_date,
-            lease.end_date,
-            lease.get_status_display(),
-            lease.rent_amount,
-            lease.security_deposit,
-            lease.payment_day
-        ])
-    
-    return response
+    ], rows)